@@ -1,5 +1,11 @@
-from app.mongo import MongoConnect
-from flask import Flask, g
+from app.metrics import init_metrics
+from app.mongo import (
+    MONGO_SYNC_INDEXES,
+    MongoConnect,
+    reconcile_indexes_in_background,
+    sync_indexes_command,
+)
+from flask import Flask, g, jsonify
 from flask_cors import CORS
 
 
@@ -18,18 +24,33 @@ def create_app(config_name="development"):
         methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     )
 
+    # Time every request and serve GET /metrics
+    init_metrics(app)
+
     @app.before_request
     def before_request():
-        """Set up the MongoDB connection before each request."""
+        """Attach a handle over the shared MongoDB client pool to the request."""
         g.mongo = MongoConnect()
 
-    # Register after_request to close the MongoDB connection after each request
+    # Register teardown to release the MongoDB handle after each request
     @app.teardown_appcontext
     def close_mongo_connection(exception=None):
-        """Close the MongoDB connection after each request."""
+        """Release the MongoDB handle after each request."""
         if hasattr(g, "mongo"):
             g.mongo.close_connection()
 
+    @app.route("/health", methods=["GET"])
+    def health():
+        """Report whether the MongoDB deployment is reachable."""
+        if g.mongo.ping():
+            return jsonify({"status": "ok"}), 200
+        return jsonify({"status": "unavailable"}), 503
+
+    # Create any missing indexes declared in dataschema.json, when enabled
+    if MONGO_SYNC_INDEXES:
+        reconcile_indexes_in_background()
+    app.cli.add_command(sync_indexes_command)
+
     # Register blueprints (authentication, movies, etc.)
     from app.auth.routes import auth_bp
     from app.movies.routes import movie_bp
@@ -39,4 +60,12 @@ def create_app(config_name="development"):
     app.register_blueprint(movie_bp, url_prefix="/movies")
     app.register_blueprint(upload_bp, url_prefix="/upload")
 
+    from app.movies.backfill import backfill_sort_fields_command
+    from app.movies.facets import rebuild_facets_command
+    from app.movies.plans import check_query_plans_command
+
+    app.cli.add_command(backfill_sort_fields_command)
+    app.cli.add_command(check_query_plans_command)
+    app.cli.add_command(rebuild_facets_command)
+
     return app
@@ -0,0 +1,441 @@
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from functools import wraps
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from a2wsgi import WSGIMiddleware
+from app import create_app
+from app.auth.utils import AuthError, user_from_authorization
+from app.metrics import request_finished, request_started
+from app.mongo import AsyncMongoConnect, MongoConnect, create_async_client
+from app.movies.cache import page_cache
+from app.movies.counts import movie_counts
+from app.movies.dashboard import DashboardQuery
+from app.movies.export import (
+    EXPORT_BATCH_SIZE,
+    EXPORT_FORMATS,
+    csv_projection,
+    gzip_compressor,
+    iter_csv,
+    iter_ndjson,
+)
+from app.movies.facets import (
+    FACET_LIMIT,
+    FACET_READ_QUERY,
+    FACETS_COLLECTION,
+    facets_from_entries,
+)
+from app.movies.filters import SORT_FIELDS, build_filter_query
+from app.movies.routes import MOVIE_STREAM_THRESHOLD
+from app.movies.serializers import (
+    STREAM_CHUNK_SIZE,
+    dumps,
+    movie_projection,
+    resolve_fields,
+)
+from app.movies.suggest import SUGGEST_LIMIT, SUGGEST_MAX_LIMIT, title_index
+from app.upload.progress import iter_progress_events_async, read_progress_async
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Mount, Route
+
+# Threads serving the routes that stay on Flask: auth, uploads and ingestion
+ASGI_WSGI_WORKERS = int(os.getenv("ASGI_WSGI_WORKERS", "10"))
+ASGI_ORIGINS = ["http://localhost:3000", "http://127.0.0.1:3000"]
+
+
+def json_response(body: Any, status_code: int = 200) -> Response:
+    """
+    Summary: JSON response encoded like the Flask routes' bodies.
+    """
+    return Response(dumps(body), status_code=status_code, media_type="application/json")
+
+
+def token_required(endpoint):
+    """
+    Summary: Protect an async route with the JWT tokens issued by /auth/login.
+
+    Args:
+        endpoint: the route handler to wrap.
+    Return:
+        Wrapped handler answering 401 with the Flask routes' messages.
+    """
+
+    @wraps(endpoint)
+    async def decorator(request: Request):
+        try:
+            request.state.current_user_email = user_from_authorization(
+                request.headers.get("Authorization")
+            )
+        except AuthError as e:
+            return json_response({"message": str(e)}, 401)
+        return await endpoint(request)
+
+    return decorator
+
+
+def instrumented(path: str, endpoint):
+    """
+    Summary: Record the route latency and in-flight metrics of an async route.
+
+    Routes are labelled like their Flask rules, e.g. /movies/by_id/<show_id>, so
+    both serving modes report the same series.
+    """
+    label = path.replace("{", "<").replace("}", ">")
+
+    @wraps(endpoint)
+    async def handler(request: Request):
+        started, status = time.perf_counter(), 500
+        request_started(request.method, label)
+        try:
+            response = await endpoint(request)
+            status = response.status_code
+            return response
+        finally:
+            request_finished(
+                request.method, label, status, time.perf_counter() - started
+            )
+
+    return handler
+
+
+def _mongo(request: Request) -> AsyncMongoConnect:
+    return request.app.state.mongo
+
+
+async def _cache_get(key: str) -> Tuple[Optional[bytes], int]:
+    """
+    Summary: Read the page cache, off the event loop when it is shared through Redis.
+    """
+    if page_cache.backend == "redis":
+        return await run_in_threadpool(page_cache.get, key)
+    return page_cache.get(key)
+
+
+async def _cache_set(key: str, body: bytes, generation: int):
+    """
+    Summary: Write the page cache, off the event loop when it is shared through Redis.
+    """
+    if page_cache.backend == "redis":
+        await run_in_threadpool(page_cache.set, key, body, generation)
+    else:
+        page_cache.set(key, body, generation)
+
+
+async def _stream_movie_listing(
+    cursor, dashboard: DashboardQuery, total_movies: int, count_exact: bool
+) -> AsyncIterator[bytes]:
+    """
+    Summary: stream_movie_listing over an async cursor.
+    """
+    state: Dict[str, Any] = {"first": None, "last": None, "has_more": False}
+    yield b'{"movies":['
+    chunk, count = [], 0
+    async for document in cursor:
+        if count == dashboard.per_page:
+            state["has_more"] = True
+            break
+        if state["first"] is None:
+            state["first"] = document
+        state["last"] = document
+        chunk.append(dumps(document))
+        count += 1
+        if len(chunk) >= STREAM_CHUNK_SIZE:
+            yield (b"," if count > len(chunk) else b"") + b",".join(chunk)
+            chunk.clear()
+    if chunk:
+        yield (b"," if count > len(chunk) else b"") + b",".join(chunk)
+    pagination = dashboard.pagination(
+        total_movies, count_exact, state["first"], state["last"], state["has_more"]
+    )
+    yield b'],"pagination":' + dumps(pagination) + b"}"
+
+
+@token_required
+async def list_movies(request: Request) -> Response:
+    """
+    List movies with pagination and sorting, with the parameters of the Flask route.
+    """
+    try:
+        try:
+            dashboard = DashboardQuery(request.query_params)
+        except ValueError as e:
+            return json_response({"error": str(e)}, 400)
+
+        # Serve repeated page requests from the page cache
+        cached_body, generation = await _cache_get(dashboard.cache_key)
+        if cached_body is not None:
+            return Response(cached_body, media_type="application/json")
+
+        mongo = _mongo(request)
+        total_movies, count_exact = await movie_counts.count_async(
+            mongo, query=dashboard.filter_query
+        )
+        cursor = mongo.iter_documents(
+            "movies",
+            dashboard.query,
+            projection=dashboard.projection,
+            sort=dashboard.sort,
+            skip=dashboard.skip,
+            limit=dashboard.limit,
+        )
+
+        # Stream large pages straight from the cursor
+        if dashboard.per_page > MOVIE_STREAM_THRESHOLD and dashboard.forward:
+            return StreamingResponse(
+                _stream_movie_listing(cursor, dashboard, total_movies, count_exact),
+                media_type="application/json",
+            )
+
+        documents = await cursor.to_list()
+        body = dumps(dashboard.page_body(documents, total_movies, count_exact))
+        await _cache_set(dashboard.cache_key, body, generation)
+        return Response(body, media_type="application/json")
+
+    except Exception as e:
+        logging.error(f"Error in list_movies: {str(e)}")
+        return json_response({"error": "Internal server error"}, 500)
+
+
+@token_required
+async def export_movies(request: Request) -> Response:
+    """
+    Stream movies from an async cursor, with the parameters of the Flask route.
+    """
+    args = request.query_params
+    export_format = args.get("format", "ndjson")
+    if export_format not in EXPORT_FORMATS:
+        return json_response(
+            {"error": f"format must be one of {', '.join(EXPORT_FORMATS)}"}, 400
+        )
+
+    try:
+        filter_query = build_filter_query(args)
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
+
+    sort_by = args.get("sort_by")
+    if sort_by is not None and sort_by not in SORT_FIELDS:
+        return json_response({"error": f"Invalid sort_by: {sort_by}"}, 400)
+    sort_direction = 1 if args.get("sort_order", "asc") == "asc" else -1
+    sort_criteria = None
+    if sort_by:
+        sort_criteria = [(field, sort_direction) for field in SORT_FIELDS[sort_by]]
+        sort_criteria.append(("_id", sort_direction))
+
+    if export_format == "csv":
+        projection = csv_projection()
+        media_type = "text/csv"
+    else:
+        try:
+            fields = resolve_fields(args.get("view"), args.get("fields"))
+        except ValueError as e:
+            return json_response({"error": str(e)}, 400)
+        projection = movie_projection(fields)
+        media_type = "application/x-ndjson"
+
+    cursor = _mongo(request).iter_documents(
+        "movies",
+        filter_query,
+        projection=projection,
+        sort=sort_criteria,
+        batch_size=EXPORT_BATCH_SIZE,
+    )
+    compress = args.get("gzip", "").lower() in ("1", "true")
+
+    async def body() -> AsyncIterator[bytes]:
+        # Encode one driver batch at a time, so memory stays bounded
+        compressor = gzip_compressor() if compress else None
+        header = True
+        while cursor.alive:
+            batch = await cursor.to_list(EXPORT_BATCH_SIZE)
+            if not batch and not header:
+                break
+            if export_format == "csv":
+                chunks = iter_csv(batch, chunk_rows=len(batch) or 1, header=header)
+            else:
+                chunks = iter_ndjson(batch, chunk_rows=len(batch) or 1)
+            header = False
+            for chunk in chunks:
+                chunk = compressor.compress(chunk) if compressor else chunk
+                if chunk:
+                    yield chunk
+        if compressor:
+            yield compressor.flush()
+
+    file_name = f"movies.{export_format}"
+    if compress:
+        media_type = "application/gzip"
+        file_name += ".gz"
+
+    logging.info(f"Exporting movies as {file_name}")
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{file_name}"'},
+    )
+
+
+@token_required
+async def movie_facets(request: Request) -> Response:
+    """
+    Movie counts by genre, country, rating, type and release year.
+    """
+    try:
+        limit = int(request.query_params.get("limit", FACET_LIMIT))
+    except ValueError:
+        return json_response({"error": "limit must be an integer"}, 400)
+
+    cache_key = f"facets|{limit}"
+    cached_body, generation = await _cache_get(cache_key)
+    if cached_body is not None:
+        return Response(cached_body, media_type="application/json")
+
+    entries = await _mongo(request).find_documents(
+        FACETS_COLLECTION, FACET_READ_QUERY[0], projection=FACET_READ_QUERY[1]
+    )
+    body = dumps({"facets": facets_from_entries(entries, max(limit, 1))})
+    await _cache_set(cache_key, body, generation)
+    return Response(body, media_type="application/json")
+
+
+@token_required
+async def suggest_titles(request: Request) -> Response:
+    """
+    Suggest titles as the user types, ignoring case and accents.
+    """
+    try:
+        limit = int(request.query_params.get("limit", SUGGEST_LIMIT))
+    except ValueError:
+        return json_response({"error": "limit must be an integer"}, 400)
+    limit = min(max(limit, 1), SUGGEST_MAX_LIMIT)
+
+    # The first load reads every title, keep it off the event loop
+    if not title_index.loaded:
+        await run_in_threadpool(title_index.ensure_loaded, MongoConnect())
+    else:
+        title_index.ensure_loaded(MongoConnect())
+    suggestions = title_index.suggest(request.query_params.get("q", ""), limit)
+    return json_response({"suggestions": suggestions})
+
+
+@token_required
+async def get_movie(request: Request) -> Response:
+    """
+    Get one movie by its show_id.
+    """
+    try:
+        fields = resolve_fields(
+            request.query_params.get("view"), request.query_params.get("fields")
+        )
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
+
+    movie = await _mongo(request).find_document(
+        "movies",
+        {"show_id": request.path_params["show_id"]},
+        projection=movie_projection(fields),
+    )
+    if not movie:
+        return json_response({"error": "Movie not found"}, 404)
+
+    return json_response(movie)
+
+
+@token_required
+async def cache_stats(request: Request) -> Response:
+    """
+    Report hit and miss counters of the dashboard page cache.
+    """
+    return json_response(page_cache.stats())
+
+
+@token_required
+async def upload_progress(request: Request) -> Response:
+    """
+    Progress of an upload, from the ingesting job or a shared upload_status read.
+    """
+    progress = await read_progress_async(
+        _mongo(request), request.path_params["task_id"]
+    )
+    if not progress:
+        return json_response({"error": "Upload task not found"}, 404)
+    return json_response(progress)
+
+
+@token_required
+async def progress_stream(request: Request) -> Response:
+    """
+    Push the progress of an upload as Server-Sent Events until it completes or fails.
+    """
+    mongo, task_id = _mongo(request), request.path_params["task_id"]
+    if not await read_progress_async(mongo, task_id):
+        return json_response({"error": "Upload task not found"}, 404)
+
+    return StreamingResponse(
+        iter_progress_events_async(mongo, task_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: Starlette):
+    """
+    Summary: Open the async MongoDB client on the server's event loop, close it on shutdown.
+    """
+    client = create_async_client()
+    app.state.mongo = AsyncMongoConnect(client)
+    try:
+        yield
+    finally:
+        await client.close()
+
+
+def create_asgi_app(flask_app=None) -> Starlette:
+    """
+    Summary: Serve the read-heavy routes on asyncio, and everything else through Flask.
+
+    The dashboard, export, facets, suggest, movie and upload progress routes
+    keep their URLs, JWT checks and response bodies. Other requests are
+    handed to the Flask app in a thread pool, so logins, uploads and their
+    ingestion share this process and its tokens and progress broker.
+
+    Args:
+        flask_app (Flask, optional): app serving the other routes. Defaults to create_app().
+    Return:
+        Starlette: the ASGI application.
+    """
+    flask_app = flask_app or create_app()
+    async_routes = [
+        ("/movies/movie_dashboard", list_movies),
+        ("/movies/export", export_movies),
+        ("/movies/facets", movie_facets),
+        ("/movies/suggest", suggest_titles),
+        ("/movies/cache_stats", cache_stats),
+        ("/movies/by_id/{show_id}", get_movie),
+        ("/upload/upload_progress/{task_id}", upload_progress),
+        ("/upload/progress_stream/{task_id}", progress_stream),
+    ]
+    routes = [
+        Route(path, instrumented(path, endpoint), methods=["GET"])
+        for path, endpoint in async_routes
+    ]
+    # Everything else, including /metrics, is served by Flask
+    routes.append(Mount("", WSGIMiddleware(flask_app, workers=ASGI_WSGI_WORKERS)))
+    middleware = [
+        Middleware(
+            CORSMiddleware,
+            allow_origins=ASGI_ORIGINS,
+            allow_headers=["*"],
+            allow_credentials=True,
+            allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+        )
+    ]
+    return Starlette(routes=routes, middleware=middleware, lifespan=lifespan)
@@ -0,0 +1,155 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# werkzeug method and cost of new hashes, e.g. "scrypt:32768:8:1" or
+# "pbkdf2:sha256:600000". Stored hashes made with other settings are
+# replaced at the next successful login.
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt")
+# Threads hashing passwords, hashlib releases the GIL while it works
+PASSWORD_HASH_WORKERS = int(
+    os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1)))
+)
+# Hashes running or waiting at once, further requests are turned away
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+# Seconds a request waits for its hash
+PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
+
+
+class HashingBusy(Exception):
+    """
+    Summary: Raised when too many password hashes are already pending.
+    """
+
+
+class PasswordHasher:
+    """
+    Summary: Bounded thread pool computing password hashes off the request threads.
+
+    At most `workers` hashes run at once, so a burst of logins cannot take
+    every CPU from the other requests, and at most `max_pending` wait, so
+    the burst fails fast instead of piling up.
+    """
+
+    def __init__(
+        self,
+        method: str = PASSWORD_HASH_METHOD,
+        workers: int = PASSWORD_HASH_WORKERS,
+        max_pending: int = PASSWORD_HASH_MAX_PENDING,
+        timeout: float = PASSWORD_HASH_TIMEOUT,
+    ):
+        """
+        Summary: Initialise the pool.
+
+        Args:
+            method (str): werkzeug hash method and cost of new hashes.
+            workers (int): threads hashing at once.
+            max_pending (int): hashes running or queued before HashingBusy is raised.
+            timeout (float): seconds to wait for a hash.
+        """
+        self.method = method
+        self._timeout = timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hash"
+        )
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy("Too many password checks in progress, retry later.")
+        try:
+            future = self._executor.submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self._timeout)
+        except FutureTimeoutError:
+            # A hash still queued gives its slot back now, a running one when it ends
+            future.cancel()
+            raise HashingBusy("Password check timed out, retry later.")
+
+    def hash(self, password: str) -> str:
+        """
+        Summary: Hash a password with the configured method.
+
+        Args:
+            password (str): the password.
+        Return:
+            str: the werkzeug password hash.
+        Raises:
+            HashingBusy: if too many hashes are pending or the hash timed out.
+        """
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash: str, password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Summary: Check a password, and rehash it if the stored hash is outdated.
+
+        Args:
+            password_hash (str): stored hash.
+            password (str): password to check.
+        Return:
+            Tuple[bool, Optional[str]]: whether the password matches, and a new
+                                        hash to store if it was made with other settings.
+        Raises:
+            HashingBusy: if too many hashes are pending or the hash timed out.
+        """
+        if not self._run(check_password_hash, password_hash, password):
+            return False, None
+        if not self.needs_rehash(password_hash):
+            return True, None
+        return True, self.hash(password)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """
+        Summary: Whether a stored hash was made with another method or cost.
+        """
+        return password_hash.split("$", 1)[0] != method_prefix(self.method)
+
+    def shutdown(self):
+        """
+        Summary: Stop the threads once the pending hashes are done.
+        """
+        self._executor.shutdown(wait=True)
+
+
+@lru_cache(maxsize=None)
+def method_prefix(method: str) -> str:
+    """
+    Summary: Method part of the hashes a werkzeug method produces, with its cost filled in.
+
+    "scrypt" becomes "scrypt:32768:8:1", matching the hashes it makes.
+    """
+    return generate_password_hash("", method).split("$", 1)[0]
+
+
+_hasher: Optional[PasswordHasher] = None
+_hasher_pid: Optional[int] = None
+_hasher_lock = threading.Lock()
+
+
+def get_password_hasher() -> PasswordHasher:
+    """
+    Summary: Get the password hasher for this process, starting it on first use.
+
+    Return:
+        PasswordHasher: the shared hasher.
+    """
+    global _hasher, _hasher_pid
+
+    pid = os.getpid()
+    if _hasher is not None and _hasher_pid == pid:
+        return _hasher
+
+    with _hasher_lock:
+        if _hasher is None or _hasher_pid != pid:
+            _hasher = PasswordHasher()
+            _hasher_pid = pid
+    return _hasher
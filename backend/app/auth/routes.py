@@ -1,10 +1,10 @@
 from datetime import datetime, timezone
 
 from app import mongo
+from app.auth.hashing import HashingBusy, get_password_hasher
 from app.auth.utils import create_jwt_token, token_required
 from app.models import User
 from flask import Blueprint, g, jsonify, request
-from werkzeug.security import check_password_hash, generate_password_hash
 
 auth_bp = Blueprint("auth", __name__)
 
@@ -26,7 +26,10 @@ def signup():
         return jsonify({"error": "Email already registered"}), 400
 
     # Hash the password and create a new user document
-    hashed_password = generate_password_hash(password)
+    try:
+        hashed_password = get_password_hasher().hash(password)
+    except HashingBusy as e:
+        return jsonify({"error": str(e)}), 503
     new_user = User(
         email=email,
         password_hash=hashed_password,
@@ -36,7 +39,7 @@ def signup():
     )
 
     # Save the new user to MongoDB
-    g.mongo.insert_document("users", new_user.to_dict())  # Insert user into MongoDB
+    new_user.save()  # Insert user into MongoDB
 
     return jsonify({"message": "User registered successfully"}), 201
 
@@ -50,7 +53,11 @@ def login():
 
     # Retrieve the user from MongoDB
     user = User.find_by_email(email)  # Ensure `find_by_email` is defined properly
-    if user and user.check_password(password):
+    try:
+        authenticated = user is not None and user.check_password(password)
+    except HashingBusy as e:
+        return jsonify({"message": str(e)}), 503
+    if authenticated:
         token = create_jwt_token(user.email)  # Create token on successful login
         return jsonify({"token": token}), 200
 
@@ -1,20 +1,74 @@
+import logging
 import os
+import time
 from datetime import datetime, timedelta, timezone
 from functools import wraps
-from typing import Optional
+from typing import Any, Dict, Optional, Tuple
 
 import jwt
+from app.cache import TTLCache
 from flask import g, jsonify, request
 from werkzeug.utils import secure_filename
 
-# Secret key for encoding and decoding JWT tokens
-SECRET_KEY = os.urandom(32).hex()
+# Signing keys shared by every worker: a single bare secret, or comma separated
+# "kid=secret" entries. The first one signs new tokens, the others are still
+# accepted, so keys can be rotated without logging everyone out.
+JWT_SECRET_KEYS = os.getenv("JWT_SECRET_KEYS", "")
+# Key id of a bare secret, list it as "default=<secret>" to rotate away from it
+DEFAULT_KID = "default"
+# Verified tokens are cached until they expire, for at most this many seconds
+JWT_CACHE_TTL = float(os.getenv("JWT_CACHE_TTL", "300"))
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "10000"))
+
+
+def parse_secret_keys(value: str) -> Dict[str, str]:
+    """
+    Summary: Parse the JWT_SECRET_KEYS setting.
+
+    A value without a comma is one bare secret, whatever characters it
+    contains, so an existing single secret keeps verifying its tokens.
+
+    Args:
+        value (str): a bare secret, or comma separated "kid=secret" entries.
+    Return:
+        Dict[str, str]: secrets by key id, the signing key first.
+    """
+    value = value.strip()
+    if not value:
+        return {}
+    if "," not in value:
+        return {DEFAULT_KID: value}
+    keys = {}
+    for entry in value.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        kid, separator, secret = entry.partition("=")
+        if not separator or not kid or not secret:
+            raise ValueError(
+                "JWT_SECRET_KEYS entries must be kid=secret when several keys are set"
+            )
+        keys[kid] = secret
+    return keys
+
+
+SECRET_KEYS = parse_secret_keys(JWT_SECRET_KEYS)
+if not SECRET_KEYS:
+    logging.warning(
+        "JWT_SECRET_KEYS is not set, tokens are signed with a random key and "
+        "only accepted by this process"
+    )
+    SECRET_KEYS = {"local": os.urandom(32).hex()}
+SIGNING_KID = next(iter(SECRET_KEYS))
+
+# Claims of verified tokens, by token
+_verified_tokens = TTLCache(max_entries=JWT_CACHE_SIZE, ttl=JWT_CACHE_TTL)
 
 
 # Utility function to create a JWT token for authenticated users
 def create_jwt_token(email: str) -> str:
     """
-    Create a JWT token for the user.
+    Create a JWT token for the user, signed with the current signing key.
 
     Args:
         email (str): The email of the user to encode into the token.
@@ -26,10 +80,80 @@ def create_jwt_token(email: str) -> str:
         hours=1
     )  # Token expires in 1 hour
     payload = {"email": email, "exp": expiration}
-    token = jwt.encode(payload, SECRET_KEY, algorithm="HS256")
+    token = jwt.encode(
+        payload,
+        SECRET_KEYS[SIGNING_KID],
+        algorithm="HS256",
+        headers={"kid": SIGNING_KID},
+    )
     return token
 
 
+def _decode_token(token: str) -> Tuple[Dict[str, Any], float]:
+    """
+    Summary: Verify a token with the key named in its header.
+
+    Args:
+        token (str): the JWT token.
+    Return:
+        Tuple[Dict[str, Any], float]: the claims, and seconds until the token expires.
+    Raises:
+        jwt.InvalidTokenError: if the token is invalid, expired or signed with an unknown key.
+    """
+    kid = jwt.get_unverified_header(token).get("kid", SIGNING_KID)
+    if kid not in SECRET_KEYS:
+        raise jwt.InvalidTokenError(f"Unknown key id {kid}")
+    # Decode the token using the secret key
+    payload = jwt.decode(
+        token,
+        SECRET_KEYS[kid],
+        algorithms=["HS256"],
+        options={"require": ["exp", "email"]},
+    )
+    return payload, payload["exp"] - time.time()
+
+
+class AuthError(Exception):
+    """
+    Summary: Raised when a request does not carry a valid JWT token.
+    """
+
+
+def user_from_authorization(authorization: Optional[str]) -> str:
+    """
+    Verify the bearer token of an Authorization header.
+
+    Shared by the Flask routes and the ASGI app, so both accept the same tokens.
+    Verified claims are cached until the token expires, so repeated requests
+    skip the signature check.
+
+    Args:
+        authorization (str, optional): The Authorization header value.
+
+    Returns:
+        str: The email of the authenticated user.
+
+    Raises:
+        AuthError: If the token is missing, expired or invalid.
+    """
+    parts = (authorization or "").split(" ")
+    token = parts[1] if len(parts) > 1 else None
+    if not token:
+        raise AuthError("Token is missing!")
+    payload = _verified_tokens.get(token)
+    if payload is not None and payload["exp"] > time.time():
+        return payload["email"]
+
+    try:
+        payload, expires_in = _decode_token(token)
+    except jwt.ExpiredSignatureError:
+        raise AuthError("Token has expired!")
+    except jwt.InvalidTokenError:
+        raise AuthError("Invalid token!")
+    _verified_tokens.set(token, payload, ttl=min(expires_in, JWT_CACHE_TTL))
+    return payload["email"]
+
+
 # Utility function to verify JWT token (e.g., to protect routes)
 def token_required(f):
     """
@@ -44,20 +168,13 @@ def token_required(f):
 
     @wraps(f)
     def decorator(*args, **kwargs):
-        token = None
-        if "Authorization" in request.headers:
-            token = request.headers["Authorization"].split(" ")[1]
-        if not token:
-            return jsonify({"message": "Token is missing!"}), 401
         try:
-            # Decode the token using the secret key
-            payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-            current_user_email = payload["email"]
-            g.current_user_email = current_user_email  # Store email in g
-        except jwt.ExpiredSignatureError:
-            return jsonify({"message": "Token has expired!"}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({"message": "Invalid token!"}), 401
+            # Store email in g
+            g.current_user_email = user_from_authorization(
+                request.headers.get("Authorization")
+            )
+        except AuthError as e:
+            return jsonify({"message": str(e)}), 401
 
         # Call the original function
         return f(*args, **kwargs)
@@ -0,0 +1,182 @@
+import os
+import time
+
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from pymongo import monitoring
+
+# Set by gunicorn setups to aggregate the metrics of every worker
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time to produce a response, by route",
+    ["method", "endpoint", "status"],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Requests being handled, by route",
+    ["method", "endpoint"],
+    multiprocess_mode="livesum",
+)
+
+INGEST_ROWS_PARSED = Counter(
+    "ingest_rows_parsed_total",
+    "CSV rows parsed by ingestion, counted before they are written",
+)
+INGEST_ROWS_WRITTEN = Counter(
+    "ingest_rows_written_total",
+    "Movies written by ingestion, by outcome",
+    ["result"],
+)
+INGEST_BATCH_SECONDS = Histogram(
+    "ingest_batch_duration_seconds",
+    "Time to write one batch of movies and update the derived counts",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+INGEST_BYTES_READ = Counter(
+    "ingest_bytes_read_total", "Upload bytes read by ingestion, before decompression"
+)
+
+MONGO_COMMAND_SECONDS = Histogram(
+    "mongodb_command_duration_seconds",
+    "Round trip time of MongoDB commands, by command and collection",
+    ["command", "collection"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5),
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "mongodb_command_failures_total",
+    "MongoDB commands that failed, by command and collection",
+    ["command", "collection"],
+)
+
+# Children of the ingestion outcomes, resolved once instead of per batch
+INGEST_ROWS_BY_RESULT = {
+    result: INGEST_ROWS_WRITTEN.labels(result)
+    for result in ("inserted", "updated", "unchanged")
+}
+
+
+def request_started(method: str, endpoint: str):
+    """
+    Summary: Count a request as in flight.
+    """
+    REQUESTS_IN_PROGRESS.labels(method, endpoint).inc()
+
+
+def request_finished(method: str, endpoint: str, status: int, seconds: float):
+    """
+    Summary: Record the latency of a finished request and drop it from the in-flight gauge.
+    """
+    REQUESTS_IN_PROGRESS.labels(method, endpoint).dec()
+    REQUEST_SECONDS.labels(method, endpoint, str(status)).observe(seconds)
+
+
+def record_ingest_batch(counts: dict, seconds: float):
+    """
+    Summary: Record the outcome and write time of one ingested batch.
+
+    Args:
+        counts (dict): "inserted", "updated" and "unchanged" counts.
+        seconds (float): time spent writing the batch.
+    """
+    for result, counter in INGEST_ROWS_BY_RESULT.items():
+        if counts.get(result):
+            counter.inc(counts[result])
+    INGEST_BATCH_SECONDS.observe(seconds)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    Summary: Time every MongoDB command through pymongo's command monitoring.
+
+    The driver measures each round trip itself, the listener only remembers
+    the collection of a command between its started and finished events.
+    """
+
+    def __init__(self):
+        self._collections = {}
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        name = event.command_name
+        target = event.command.get("collection" if name == "getMore" else name)
+        self._collections[(event.connection_id, event.request_id)] = (
+            target if isinstance(target, str) else ""
+        )
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        collection = self._collections.pop((event.connection_id, event.request_id), "")
+        MONGO_COMMAND_SECONDS.labels(event.command_name, collection).observe(
+            event.duration_micros / 1e6
+        )
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        collection = self._collections.pop((event.connection_id, event.request_id), "")
+        MONGO_COMMAND_SECONDS.labels(event.command_name, collection).observe(
+            event.duration_micros / 1e6
+        )
+        MONGO_COMMAND_FAILURES.labels(event.command_name, collection).inc()
+
+
+mongo_command_metrics = MongoCommandMetrics()
+
+
+def metrics_response() -> Response:
+    """
+    Summary: Current metrics in the Prometheus text format.
+
+    Return:
+        Response: the exposition, merged across workers in multiprocess mode.
+    """
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        body = generate_latest(registry)
+    else:
+        body = generate_latest()
+    return Response(body, status=200, mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_metrics(app):
+    """
+    Summary: Time every request of a Flask app and serve GET /metrics.
+
+    Args:
+        app (Flask): the app to instrument.
+    """
+
+    @app.before_request
+    def start_request_timer():
+        """Count the request as in flight, labelled by its route."""
+        g.metrics_endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        g.metrics_started = time.perf_counter()
+        request_started(request.method, g.metrics_endpoint)
+
+    @app.after_request
+    def record_response_status(response):
+        """Keep the status for the latency histogram."""
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def observe_request(exception=None):
+        """Record the latency of the request, errors count as 500."""
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return
+        request_finished(
+            request.method,
+            g.metrics_endpoint,
+            g.pop("metrics_status", 500),
+            time.perf_counter() - started,
+        )
+
+    app.add_url_rule("/metrics", "metrics", metrics_response, methods=["GET"])
@@ -1,10 +1,23 @@
+import os
+import re
 from datetime import datetime
-from typing import List, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 
 from app import mongo  # Import your MongoDB connection
+from app.auth.hashing import get_password_hasher
+from app.cache import TTLCache
 from flask import g
-from pydantic import BaseModel, EmailStr
-from werkzeug.security import check_password_hash, generate_password_hash
+from pydantic import BaseModel, EmailStr, TypeAdapter, ValidationError
+from typing_extensions import TypedDict
+
+# users documents are cached by email, writes through User drop the entry
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+_users_by_email = TTLCache(max_entries=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+# Matches durations such as "106 min" or "2 Seasons"
+DURATION_PATTERN = re.compile(r"\s*(\d+)\s*(min|season)", re.IGNORECASE)
 
 
 class User(BaseModel):
@@ -39,29 +52,71 @@ class User(BaseModel):
         Args:
             password (str): password to set.
         """
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = get_password_hasher().hash(password)
 
     def check_password(self, password: str) -> bool:
         """
         Summary: Verify the password against the hashed value.
 
+        A matching password whose hash was made with other hashing settings
+        is rehashed, and the new hash is stored.
+
         Args:
             password (str): password to check.
+        Raises:
+            HashingBusy: if too many password hashes are pending.
         """
-        return check_password_hash(self.password_hash, password)
+        matches, new_hash = get_password_hasher().verify(self.password_hash, password)
+        if new_hash:
+            self.password_hash = new_hash
+            self.update(self.email, {"password_hash": new_hash})
+        return matches
 
     @classmethod
     def find_by_email(cls, email: str):
         """
         Fetch a user document from the database by email.
+
+        Found users are cached for USER_CACHE_TTL seconds; unknown emails are
+        not, so a signup is visible right away.
         """
-        user_data = g.mongo.find_document(
-            "users", {"email": email}
-        )  # Use your MongoDB connection here
+        user_data = _users_by_email.get(email)
+        if user_data is None:
+            user_data = g.mongo.find_document(
+                "users", {"email": email}
+            )  # Use your MongoDB connection here
+            if user_data:
+                _users_by_email.set(email, user_data)
         if user_data:
             return cls(**user_data)  # Return an instance of User
         return None  # Return None if no user found
 
+    def save(self):
+        """
+        Summary: Insert the user into the users collection.
+        """
+        g.mongo.insert_document("users", self.to_dict())
+        self.invalidate(self.email)
+
+    @staticmethod
+    def update(email: str, update_data: Dict[str, Any]):
+        """
+        Summary: Update fields of a stored user and drop its cached copy.
+
+        Args:
+            email (str): email of the user.
+            update_data (Dict[str, Any]): fields to set.
+        """
+        g.mongo.update_document("users", {"email": email}, update_data)
+        User.invalidate(email)
+
+    @staticmethod
+    def invalidate(email: str):
+        """
+        Summary: Drop the cached copy of a user, after it was written.
+        """
+        _users_by_email.delete(email)
+
 
 class Movie(BaseModel):
     """
@@ -80,6 +135,10 @@ class Movie(BaseModel):
     duration: str  # Duration (e.g., "106 min")
     listed_in: List[str]  # Genres or categories
     description: str  # Description of the movie/show
+    duration_minutes: Optional[int] = None  # Runtime of a movie, for sorting
+    season_count: Optional[int] = None  # Number of seasons of a TV show, for sorting
+    release_date: Optional[datetime] = None  # Start of the release year, for sorting
+    countries: List[str] = []  # Each country of origin, for filtering
 
     class Config:
         json_encoders = {datetime: lambda v: v.isoformat()}
@@ -88,44 +147,163 @@ class Movie(BaseModel):
         """Convert the Movie model instance to a dictionary."""
         return self.model_dump()
 
-    @classmethod
-    def from_csv(cls, row: dict) -> "Movie":
-        """Create a Movie instance from a CSV row."""
+    @staticmethod
+    def fields_from_csv(row: dict) -> Dict[str, Any]:
+        """Map a CSV row to Movie field values, before validation."""
 
         # Handle missing or empty values with default options
-        date_added = (
-            datetime.strptime(row["date_added"], "%B %d, %Y")
-            if row["date_added"]
-            else None
-        )
+        date_added = parse_date_added(row["date_added"]) if row["date_added"] else None
 
         # Optional fields: handle empty or missing data
         release_year = int(row["release_year"]) if row["release_year"] else None
         rating = row["rating"] if row["rating"] else None
         duration = row["duration"] if row["duration"] else None
+        duration_minutes, season_count = parse_duration(duration)
 
-        return cls(
-            show_id=row["show_id"],
-            movie_type=row["type"],  # 'type' is mapped to 'movie_type'
-            title=row["title"],
-            director=row["director"],
-            cast=(
+        return {
+            "show_id": row["show_id"],
+            "movie_type": row["type"],  # 'type' is mapped to 'movie_type'
+            "title": row["title"],
+            "director": row["director"],
+            "cast": (
                 [actor.strip() for actor in row["cast"].split(",")]
                 if row["cast"]
                 else []
             ),
-            country=row["country"],
-            date_added=date_added,
-            release_year=release_year,
-            rating=rating,
-            duration=duration,
-            listed_in=(
+            "country": row["country"],
+            "date_added": date_added,
+            "release_year": release_year,
+            "rating": rating,
+            "duration": duration,
+            "listed_in": (
                 [genre.strip() for genre in row["listed_in"].split(",")]
                 if row["listed_in"]
                 else []
             ),
-            description=row["description"],
-        )
+            "description": row["description"],
+            "duration_minutes": duration_minutes,
+            "season_count": season_count,
+            "release_date": release_date_from_year(release_year),
+            "countries": split_countries(row["country"]),
+        }
+
+    @classmethod
+    def from_csv(cls, row: dict) -> "Movie":
+        """Create a Movie instance from a CSV row."""
+        return cls(**cls.fields_from_csv(row))
+
+    @classmethod
+    def from_csv_batch(cls, rows: List[dict]) -> List[dict]:
+        """
+        Summary: Convert a batch of CSV rows straight into Mongo-ready dicts.
+
+        The whole batch is validated in one call without building a model per
+        row. If validation fails, the rows are replayed through from_csv so
+        the first invalid row raises exactly the error it always has.
+
+        Args:
+            rows (List[dict]): CSV rows as produced by csv.DictReader.
+        Return:
+            List[dict]: one document per row, same as from_csv(row).to_dict().
+        """
+        records = [cls.fields_from_csv(row) for row in rows]
+        try:
+            return _MOVIE_RECORDS.validate_python(records)
+        except ValidationError:
+            for row in rows:
+                cls.from_csv(row)
+            raise
+
+
+@lru_cache(maxsize=4096)
+def parse_date_added(value: str) -> datetime:
+    """
+    Summary: Parse a date_added value such as "September 2, 2021".
+
+    Catalogs only have a few hundred distinct values, so results are memoized.
+
+    Args:
+        value (str): date string from the CSV.
+    Return:
+        datetime: the parsed date.
+    """
+    return datetime.strptime(value, "%B %d, %Y")
+
+
+@lru_cache(maxsize=1024)
+def parse_duration(duration: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Summary: Split a duration such as "106 min" or "2 Seasons" into numbers.
+
+    Args:
+        duration (str, optional): duration string from the CSV.
+    Return:
+        Tuple[Optional[int], Optional[int]]: (minutes, seasons), with None for
+                                             the part that does not apply.
+    """
+    if not duration:
+        return None, None
+    match = DURATION_PATTERN.match(duration)
+    if not match:
+        return None, None
+    value = int(match.group(1))
+    if match.group(2).lower() == "min":
+        return value, None
+    return None, value
+
+
+def release_date_from_year(release_year: Optional[int]) -> Optional[datetime]:
+    """
+    Summary: Sortable release date for a release year, the CSV has no exact date.
+
+    Args:
+        release_year (int, optional): release year of the movie/show.
+    Return:
+        Optional[datetime]: January 1st of that year.
+    """
+    if not release_year:
+        return None
+    return datetime(release_year, 1, 1)
+
+
+def split_countries(country: Optional[str]) -> List[str]:
+    """
+    Summary: Split a country value such as "India, United States" into its countries.
+
+    Args:
+        country (str, optional): country string from the CSV.
+    Return:
+        List[str]: the countries, empty if none are given.
+    """
+    if not country:
+        return []
+    return [name.strip() for name in country.split(",") if name.strip()]
+
+
+class MovieRecord(TypedDict):
+    """
+    Summary: Mongo document shape of a movie, mirrors the Movie model fields.
+    """
+
+    show_id: str
+    movie_type: str
+    title: str
+    director: str
+    cast: List[str]
+    country: str
+    date_added: datetime
+    release_year: int
+    rating: str
+    duration: str
+    listed_in: List[str]
+    description: str
+    duration_minutes: Optional[int]
+    season_count: Optional[int]
+    release_date: Optional[datetime]
+    countries: List[str]
+
+
+_MOVIE_RECORDS = TypeAdapter(List[MovieRecord])
 
 
 class UploadStatus(BaseModel):
@@ -135,11 +313,16 @@ class UploadStatus(BaseModel):
 
     user_id: str  # ID of the user who uploaded the CSV
     file_name: str  # Name of the uploaded CSV file
-    status: str  # Status of the upload ("in_progress", "completed", "failed")
+    status: str  # Status of the upload ("queued", "in_progress", "completed", "failed")
     progress: float  # Progress percentage (0 to 100)
     timestamp: datetime  # Timestamp when the upload status was last updated
     total_rows: Optional[int] = 0  # Total number of rows in the CSV
     uploaded_rows: Optional[int] = 0  # Number of rows successfully uploaded
+    rows_per_second: Optional[float] = 0  # Average ingestion rate
+    write_mode: Optional[str] = "insert"  # "insert", "replace" or "merge"
+    inserted_rows: Optional[int] = 0  # Rows added as new movies
+    updated_rows: Optional[int] = 0  # Rows that changed an existing movie
+    unchanged_rows: Optional[int] = 0  # Rows matching an existing movie as is
     task_id: str
 
     class Config:
@@ -170,3 +353,27 @@ class MovieSortCriteria(BaseModel):
     def to_dict(self) -> dict:
         """Convert the MovieSortCriteria model instance to a dictionary."""
         return self.model_dump()
+
+
+class UploadSession(BaseModel):
+    """
+    Summary: Data model for a resumable upload, sent as numbered chunks.
+    """
+
+    session_id: str  # Unique identifier of the session
+    user_id: str  # ID of the user who started the upload
+    file_name: str  # Name of the uploaded CSV file
+    total_bytes: int  # Size of the whole file
+    chunk_size: int  # Size of every chunk but the last
+    received_chunks: List[int] = []  # Indexes of the chunks written to disk
+    status: str = "open"  # "open", "finalizing" or "finalized"
+    task_id: Optional[str] = None  # upload_status task, set on finalize
+    mode: str = "auto"  # Ingestion mode used on finalize
+    parallelism: Optional[int] = None  # Parser processes used on finalize
+    write_mode: str = "replace"  # Write mode used on finalize
+    created_at: datetime  # When the session was started
+    updated_at: datetime  # Last chunk received, sessions expire after a day idle
+
+    def to_dict(self) -> dict:
+        """Convert the UploadSession model instance to a dictionary."""
+        return self.model_dump()
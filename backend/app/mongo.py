@@ -1,6 +1,15 @@
+import atexit
+import json
+import logging
 import os
-from typing import Any, Dict, List, Optional, Tuple
-
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import click
+from app.metrics import mongo_command_metrics
+from pymongo import AsyncMongoClient, ReplaceOne, UpdateOne
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.asynchronous.cursor import AsyncCursor
 from pymongo.collection import Collection
 from pymongo.mongo_client import MongoClient
 from pymongo.server_api import ServerApi
@@ -8,24 +17,175 @@ from pymongo.server_api import ServerApi
 MONGO_URI = os.getenv("MONGO_URI")
 DATABASE = os.getenv("DATABASE_NAME")
 
+# Connection pool settings, shared by every request handled by this process
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(
+    os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")
+)
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "10000"))
+MONGO_HEARTBEAT_FREQUENCY_MS = int(os.getenv("MONGO_HEARTBEAT_FREQUENCY_MS", "10000"))
+
+# Index declarations, reconciled by `flask sync-indexes --apply`
+DATASCHEMA_PATH = os.getenv(
+    "DATASCHEMA_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "..", "dataschema.json"),
+)
+# Also reconcile on app startup, for single-process setups. Off by default so
+# every worker and CLI invocation does not race to build the same indexes.
+MONGO_SYNC_INDEXES = os.getenv("MONGO_SYNC_INDEXES", "false").lower() == "true"
+INDEX_OPTIONS = (
+    "unique",
+    "sparse",
+    "expireAfterSeconds",
+    "partialFilterExpression",
+    "collation",
+)
+
+_client: Optional[MongoClient] = None
+_client_pid: Optional[int] = None
+_client_lock = threading.Lock()
+
+
+def is_blank(value: Any) -> bool:
+    """
+    Summary: Whether a field value is empty: None, an empty string or an empty list.
+
+    A merge upsert leaves the stored value of blank fields in place.
+    """
+    return value is None or value == "" or value == []
+
+
+def _client_options() -> Dict[str, Any]:
+    """
+    Summary: Connection and pool settings shared by the sync and async clients.
+
+    Return:
+        Dict[str, Any]: keyword arguments for the client constructors.
+    """
+    return dict(
+        server_api=ServerApi("1"),
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+        connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+        serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        heartbeatFrequencyMS=MONGO_HEARTBEAT_FREQUENCY_MS,
+        # Times every command for the /metrics endpoint
+        event_listeners=[mongo_command_metrics],
+    )
+
+
+def _create_client() -> MongoClient:
+    """
+    Summary: Build a new MongoClient with the configured pool settings.
+
+    Return:
+        MongoClient: a lazily connecting client.
+    """
+    return MongoClient(MONGO_URI, **_client_options())
+
+
+def create_async_client() -> AsyncMongoClient:
+    """
+    Summary: Build a new AsyncMongoClient with the configured pool settings.
+
+    The client belongs to the event loop it is first used on, so the ASGI
+    app creates one at startup and closes it at shutdown.
+
+    Return:
+        AsyncMongoClient: a lazily connecting client.
+    """
+    return AsyncMongoClient(MONGO_URI, **_client_options())
+
+
+def get_client() -> MongoClient:
+    """
+    Summary: Get the process-wide MongoClient, creating it on first use.
+
+    The client is re-created after a fork, since pymongo clients must not be
+    shared between parent and child processes.
+
+    Return:
+        MongoClient: the shared client for this process.
+    """
+    global _client, _client_pid
+
+    pid = os.getpid()
+    if _client is not None and _client_pid == pid:
+        return _client
+
+    with _client_lock:
+        if _client is None or _client_pid != pid:
+            _client = _create_client()
+            _client_pid = pid
+    return _client
+
+
+def close_client():
+    """
+    Summary: Close the process-wide MongoClient, if one is open.
+    """
+    global _client, _client_pid
+
+    with _client_lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
+        _client_pid = None
+
+
+def _reset_client_after_fork():
+    """
+    Summary: Drop the inherited client reference in a forked child.
+    """
+    global _client, _client_pid, _client_lock
+
+    _client = None
+    _client_pid = None
+    _client_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_client_after_fork)
+
+atexit.register(close_client)
+
 
 class MongoConnect:
     """
     Summary: Connect with mongo with all required methods
     """
 
-    def __init__(self):
+    def __init__(self, client: Optional[MongoClient] = None):
         """
         Summary: Initialise the object.
+
+        Args:
+            client (MongoClient, optional): client to use. Defaults to the
+                                            shared process-wide client.
         """
-        self._CLIENT = MongoClient(MONGO_URI, server_api=ServerApi("1"))
+        self._CLIENT = client if client is not None else get_client()
         self._db = self._CLIENT[DATABASE]
 
+    def ping(self) -> bool:
+        """
+        Summary: Check that the deployment is reachable.
+
+        Return:
+            bool: True if the server answered the ping.
+        """
         try:
             self._CLIENT.admin.command("ping")
-            print("Pinged the deployment. You are successfully connected to MongoDB!")
+            return True
         except Exception as e:
-            print(f"Error occured: {e}")
+            logging.error(f"MongoDB ping failed: {e}")
+            return False
 
     def get_collection(self, collection_name: str) -> Collection:
         """
@@ -55,7 +215,10 @@ class MongoConnect:
         return str(result.inserted_id)
 
     def insert_many_documents(
-        self, collection_name: str, documents: List[Dict[str, Any]]
+        self,
+        collection_name: str,
+        documents: List[Dict[str, Any]],
+        ordered: bool = True,
     ) -> List[str]:
         """
         Summary: Insert multiple documents into the specified collection.
@@ -63,14 +226,189 @@ class MongoConnect:
         Args:
             collection_name (str): The name of the collection.
             documents (List[Dict[str, Any]]): A list of dictionaries representing the documents to insert.
+            ordered (bool, optional): Stop at the first failed insert. Unordered inserts let the
+                                      server apply the batch in parallel. Defaults to True.
 
         Return:
             List[str]: A list of inserted document IDs.
         """
         collection = self.get_collection(collection_name)
-        result = collection.insert_many(documents)
+        result = collection.insert_many(documents, ordered=ordered)
         return [str(doc_id) for doc_id in result.inserted_ids]
 
+    def bulk_upsert_documents(
+        self,
+        collection_name: str,
+        documents: List[Dict[str, Any]],
+        key: str,
+        merge: bool = False,
+        ordered: bool = False,
+    ) -> Dict[str, int]:
+        """
+        Summary: Upsert multiple documents in one bulk write, matched on a key field.
+
+        Args:
+            collection_name (str): The name of the collection.
+            documents (List[Dict[str, Any]]): documents to upsert, each containing the key field.
+            key (str): field used to match existing documents, should have a unique index.
+            merge (bool, optional): update only the given, non-blank fields instead
+                                    of replacing the whole document. Defaults to False.
+            ordered (bool, optional): Stop at the first failed write. Defaults to False.
+
+        Return:
+            Dict[str, int]: counts of "inserted", "updated" and "unchanged" documents.
+        """
+        if merge:
+            operations = []
+            for doc in documents:
+                update = {"$set": {f: v for f, v in doc.items() if not is_blank(v)}}
+                blank = {f: v for f, v in doc.items() if is_blank(v)}
+                if blank:
+                    # New documents still get every field
+                    update["$setOnInsert"] = blank
+                operations.append(UpdateOne({key: doc[key]}, update, upsert=True))
+        else:
+            operations = [
+                ReplaceOne({key: doc[key]}, doc, upsert=True) for doc in documents
+            ]
+
+        collection = self.get_collection(collection_name)
+        result = collection.bulk_write(operations, ordered=ordered)
+        return {
+            "inserted": result.upserted_count,
+            "updated": result.modified_count,
+            "unchanged": result.matched_count - result.modified_count,
+        }
+
+    def bulk_update_documents(
+        self,
+        collection_name: str,
+        updates: List[Tuple[Dict[str, Any], Dict[str, Any]]],
+        ordered: bool = False,
+    ) -> int:
+        """
+        Summary: Apply many $set updates in one bulk write.
+
+        Args:
+            collection_name (str): The name of the collection.
+            updates (List[Tuple[Dict[str, Any], Dict[str, Any]]]): (query, update_data) pairs.
+            ordered (bool, optional): Stop at the first failed write. Defaults to False.
+
+        Return:
+            int: count of data modified.
+        """
+        if not updates:
+            return 0
+        collection = self.get_collection(collection_name)
+        result = collection.bulk_write(
+            [UpdateOne(query, {"$set": data}) for query, data in updates],
+            ordered=ordered,
+        )
+        return result.modified_count
+
+    def bulk_increment_documents(
+        self,
+        collection_name: str,
+        increments: List[Tuple[Dict[str, Any], Dict[str, int]]],
+        ordered: bool = False,
+    ) -> int:
+        """
+        Summary: Apply many $inc updates in one bulk write, creating missing documents.
+
+        Args:
+            collection_name (str): The name of the collection.
+            increments (List[Tuple[Dict[str, Any], Dict[str, int]]]): (query, increments)
+                pairs, the query fields are set on documents that get created.
+            ordered (bool, optional): Stop at the first failed update. Defaults to False.
+
+        Return:
+            int: number of documents modified or created.
+        """
+        if not increments:
+            return 0
+        collection = self.get_collection(collection_name)
+        result = collection.bulk_write(
+            [
+                UpdateOne(query, {"$inc": amounts}, upsert=True)
+                for query, amounts in increments
+            ],
+            ordered=ordered,
+        )
+        return result.modified_count + result.upserted_count
+
+    def aggregate(
+        self, collection_name: str, pipeline: List[Dict[str, Any]]
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Summary: Run an aggregation pipeline.
+
+        Args:
+            collection_name (str): Name of the collection.
+            pipeline (List[Dict[str, Any]]): the pipeline stages.
+        Return:
+            Iterator[Dict[str, Any]]: a cursor over the results.
+        """
+        collection = self.get_collection(collection_name)
+        return collection.aggregate(pipeline, allowDiskUse=True)
+
+    def create_index(
+        self, collection_name: str, keys: List[Tuple[str, int]], **kwargs: Any
+    ) -> str:
+        """
+        Summary: Create an index if it does not exist yet.
+
+        Args:
+            collection_name (str): name of the collection.
+            keys (List[Tuple[str, int]]): (field_name, direction) pairs.
+            **kwargs: index options such as unique or name.
+        Return:
+            str: name of the index.
+        """
+        collection = self.get_collection(collection_name)
+        return collection.create_index(keys, **kwargs)
+
+    def list_indexes(self, collection_name: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Summary: Get the indexes of a collection.
+
+        Args:
+            collection_name (str): name of the collection.
+        Return:
+            Dict[str, Dict[str, Any]]: index information keyed by index name.
+        """
+        collection = self.get_collection(collection_name)
+        return collection.index_information()
+
+    def drop_index(self, collection_name: str, index_name: str):
+        """
+        Summary: Drop an index by name.
+
+        Args:
+            collection_name (str): name of the collection.
+            index_name (str): name of the index.
+        """
+        collection = self.get_collection(collection_name)
+        collection.drop_index(index_name)
+
+    def drop_collection(self, collection_name: str):
+        """
+        Summary: Drop a collection and its indexes, if it exists.
+
+        Args:
+            collection_name (str): name of the collection.
+        """
+        self.get_collection(collection_name).drop()
+
+    def rename_collection(self, collection_name: str, new_name: str):
+        """
+        Summary: Rename a collection in one step, replacing any collection named new_name.
+
+        Args:
+            collection_name (str): current name of the collection.
+            new_name (str): name it is renamed to.
+        """
+        self.get_collection(collection_name).rename(new_name, dropTarget=True)
+
     def count_documents(self, collection_name: str, query: Dict[str, Any]) -> int:
         """
         Summary: give count of result for a particular query.
@@ -84,8 +422,23 @@ class MongoConnect:
         collection = self.get_collection(collection_name)
         return collection.count_documents(query)
 
+    def estimated_document_count(self, collection_name: str) -> int:
+        """
+        Summary: Give the approximate size of a collection from its metadata.
+
+        Args:
+            collection_name (str): name of the collection.
+        Return:
+            int: estimated count of documents, without scanning the collection.
+        """
+        collection = self.get_collection(collection_name)
+        return collection.estimated_document_count()
+
     def find_document(
-        self, collection_name: str, query: Dict[str, Any]
+        self,
+        collection_name: str,
+        query: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
     ) -> Optional[Dict[str, Any]]:
         """
         Summary: Find a single document in the specified collection.
@@ -93,11 +446,12 @@ class MongoConnect:
         Args:
             collection_name (str): name of the collection.
             query (Dict[str, Any]): query to get data.
+            projection (Dict[str, Any], optional): Fields to include, exclude or compute.
         Return:
             Optional[Dict[str, Any]]: Returns dictionary of data.
         """
         collection = self.get_collection(collection_name)
-        return collection.find_one(query)
+        return collection.find_one(query, projection)
 
     def find_documents(
         self,
@@ -106,6 +460,7 @@ class MongoConnect:
         sort: Optional[List[Tuple[str, int]]] = None,
         skip: int = 0,
         limit: int = 0,
+        projection: Optional[Dict[str, Any]] = None,
     ) -> List[Dict[str, Any]]:
         """
         Summary: Find multiple documents in the specified collection with pagination and sorting.
@@ -117,37 +472,85 @@ class MongoConnect:
                                                     (field_name, sort_order) where sort_order is 1 for ascending and -1 for descending.
             skip (int, optional): Number of documents to skip. Defaults to 0.
             limit (int, optional): Number of documents to limit the result to. Defaults to 0 (no limit).
+            projection (Dict[str, Any], optional): Fields to include, exclude or compute. Defaults to whole documents.
 
         Returns:
             List: A list of documents matching the query criteria, with pagination and sorting applied.
         """
-        # Default the query if it's None
-        if query is None:
-            query = {}
+        return list(
+            self.iter_documents(
+                collection_name,
+                query,
+                projection=projection,
+                sort=sort,
+                skip=skip,
+                limit=limit,
+            )
+        )
+
+    def iter_documents(
+        self,
+        collection_name: str,
+        query: Optional[Dict[str, Any]] = None,
+        projection: Optional[Dict[str, Any]] = None,
+        sort: Optional[List[Tuple[str, int]]] = None,
+        batch_size: int = 1000,
+        skip: int = 0,
+        limit: int = 0,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Summary: Iterate over matching documents without loading them all in memory.
 
-        # Get the collection
-        collection = self.get_collection(collection_name)
+        Args:
+            collection_name (str): Name of the collection.
+            query (Dict[str, Any], optional): Query dictionary. Defaults to all documents.
+            projection (Dict[str, Any], optional): Fields to include or exclude.
+            sort (List[Tuple[str, int]], optional): (field_name, sort_order) pairs.
+            batch_size (int, optional): Documents fetched per round trip. Defaults to 1000.
+            skip (int, optional): Number of documents to skip. Defaults to 0.
+            limit (int, optional): Maximum number of documents. Defaults to 0 (no limit).
 
-        # Build the cursor
-        cursor = collection.find(query)
+        Returns:
+            Iterator[Dict[str, Any]]: a cursor over the matching documents.
+        """
+        collection = self.get_collection(collection_name)
+        cursor = collection.find(query or {}, projection, batch_size=batch_size)
 
-        # Apply skip if greater than 0
+        # Apply skip and limit if greater than 0
         if skip > 0:
             cursor = cursor.skip(skip)
-
-        # Apply limit if greater than 0
         if limit > 0:
             cursor = cursor.limit(limit)
 
         # Apply sorting if provided
         if sort:
             cursor = cursor.sort(sort)
+        return cursor
 
-        # Convert the cursor to a list and return
-        result = list(cursor)
+    def explain_find(
+        self,
+        collection_name: str,
+        query: Dict[str, Any],
+        sort: Optional[List[Tuple[str, int]]] = None,
+        limit: int = 0,
+    ) -> Dict[str, Any]:
+        """
+        Summary: Get the query plan the server picks for a find.
 
-        # Log the query and results
-        return result
+        Args:
+            collection_name (str): Name of the collection.
+            query (Dict[str, Any]): Query dictionary.
+            sort (List[Tuple[str, int]], optional): (field_name, sort_order) pairs.
+            limit (int, optional): Maximum number of documents. Defaults to 0 (no limit).
+        Return:
+            Dict[str, Any]: the explain output.
+        """
+        cursor = self.get_collection(collection_name).find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        if limit > 0:
+            cursor = cursor.limit(limit)
+        return cursor.explain()
 
     def update_document(
         self, collection_name: str, query: Dict[str, Any], update_data: Dict[str, Any]
@@ -167,6 +570,33 @@ class MongoConnect:
         result = collection.update_one(query, {"$set": update_data})
         return result.modified_count
 
+    def add_to_set(
+        self,
+        collection_name: str,
+        query: Dict[str, Any],
+        field: str,
+        value: Any,
+        update_data: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        """
+        Summary: Add a value to an array field of a document, unless already present.
+
+        Args:
+            collection_name (str): name of the collection.
+            query (Dict[str, Any]): query dictionary.
+            field (str): array field to add to.
+            value (Any): value to add.
+            update_data (Dict[str, Any], optional): other fields to set in the same update.
+        Return:
+            int: count of data modified.
+        """
+        collection = self.get_collection(collection_name)
+        update: Dict[str, Any] = {"$addToSet": {field: value}}
+        if update_data:
+            update["$set"] = update_data
+        result = collection.update_one(query, update)
+        return result.modified_count
+
     def delete_document(self, collection_name: str, query: Dict[str, Any]) -> int:
         """
         Summary: Delete a document from the specified collection.
@@ -182,8 +612,316 @@ class MongoConnect:
         result = collection.delete_one(query)
         return result.deleted_count
 
+    def delete_documents(self, collection_name: str, query: Dict[str, Any]) -> int:
+        """
+        Summary: Delete every matching document from the specified collection.
+
+        Args:
+            collection_name (str): Name of the collection.
+            query (Dict[str, Any]): query dictionary that selects the documents.
+
+        Return:
+            int: count of data deleted.
+        """
+        collection = self.get_collection(collection_name)
+        result = collection.delete_many(query)
+        return result.deleted_count
+
     def close_connection(self):
         """
-        Summary: Close the connection to MongoDB.
+        Summary: Release this handle.
+
+        The underlying client is shared by the whole process and stays open;
+        use close_client() to shut it down.
+        """
+        self._db = None
+
+
+class AsyncMongoConnect:
+    """
+    Summary: Read methods of MongoConnect over an AsyncMongoClient, for the ASGI app
+    """
+
+    def __init__(self, client: AsyncMongoClient):
+        """
+        Summary: Initialise the object.
+
+        Args:
+            client (AsyncMongoClient): client of the running event loop.
+        """
+        self._CLIENT = client
+        self._db = self._CLIENT[DATABASE]
+
+    async def ping(self) -> bool:
+        """
+        Summary: Check that the deployment is reachable.
+
+        Return:
+            bool: True if the server answered the ping.
+        """
+        try:
+            await self._CLIENT.admin.command("ping")
+            return True
+        except Exception as e:
+            logging.error(f"MongoDB ping failed: {e}")
+            return False
+
+    def get_collection(self, collection_name: str) -> AsyncCollection:
         """
-        self._CLIENT.close()
+        Summary: Get a collection from the database.
+
+        Args:
+            collection_name (str): name of the collection.
+        Return:
+            AsyncCollection: the collection.
+        """
+        return self._db[collection_name]
+
+    async def count_documents(self, collection_name: str, query: Dict[str, Any]) -> int:
+        """
+        Summary: Count the documents matching a query.
+
+        Args:
+            collection_name (str): name of the collection.
+            query (Dict[str, Any]): query to count.
+        Return:
+            int: number of matching documents.
+        """
+        return await self.get_collection(collection_name).count_documents(query)
+
+    async def estimated_document_count(self, collection_name: str) -> int:
+        """
+        Summary: Count the documents of a collection from its metadata.
+
+        Args:
+            collection_name (str): name of the collection.
+        Return:
+            int: approximate number of documents.
+        """
+        return await self.get_collection(collection_name).estimated_document_count()
+
+    async def find_document(
+        self,
+        collection_name: str,
+        query: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Summary: Find a single document in the specified collection.
+
+        Args:
+            collection_name (str): name of the collection.
+            query (Dict[str, Any]): query to get data.
+            projection (Dict[str, Any], optional): Fields to include, exclude or compute.
+        Return:
+            Optional[Dict[str, Any]]: Returns dictionary of data.
+        """
+        return await self.get_collection(collection_name).find_one(query, projection)
+
+    def iter_documents(
+        self,
+        collection_name: str,
+        query: Optional[Dict[str, Any]] = None,
+        projection: Optional[Dict[str, Any]] = None,
+        sort: Optional[List[Tuple[str, int]]] = None,
+        batch_size: int = 1000,
+        skip: int = 0,
+        limit: int = 0,
+    ) -> AsyncCursor:
+        """
+        Summary: Async cursor over matching documents, with the arguments of MongoConnect.iter_documents.
+
+        Return:
+            AsyncCursor: iterate with "async for", or read batches with to_list.
+        """
+        collection = self.get_collection(collection_name)
+        cursor = collection.find(query or {}, projection, batch_size=batch_size)
+        if skip > 0:
+            cursor = cursor.skip(skip)
+        if limit > 0:
+            cursor = cursor.limit(limit)
+        if sort:
+            cursor = cursor.sort(sort)
+        return cursor
+
+    async def find_documents(
+        self,
+        collection_name: str,
+        query: Optional[Dict[str, Any]] = None,
+        sort: Optional[List[Tuple[str, int]]] = None,
+        skip: int = 0,
+        limit: int = 0,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Summary: Find multiple documents, with the arguments of MongoConnect.find_documents.
+
+        Return:
+            List[Dict[str, Any]]: the matching documents.
+        """
+        cursor = self.iter_documents(
+            collection_name,
+            query,
+            projection=projection,
+            sort=sort,
+            skip=skip,
+            limit=limit,
+        )
+        return await cursor.to_list()
+
+
+def load_index_specs(path: str = DATASCHEMA_PATH) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Summary: Read the index declarations from dataschema.json.
+
+    An index is declared either as a field name, for a single ascending key,
+    or as an object with "keys" as [field, direction] pairs plus options such
+    as "unique" or "expireAfterSeconds" (TTL).
+
+    Args:
+        path (str, optional): location of dataschema.json.
+    Return:
+        Dict[str, List[Dict[str, Any]]]: normalized specs per collection, each
+                                         with "name", "keys" and "options".
+    """
+    with open(path) as schema_file:
+        schema = json.load(schema_file)
+
+    specs = {}
+    for collection_name, definition in schema.items():
+        collection_specs = []
+        for index in definition.get("indexes", []):
+            if isinstance(index, str):
+                index = {"keys": [[index, 1]]}
+            keys = [(field, direction) for field, direction in index["keys"]]
+            options = {key: index[key] for key in INDEX_OPTIONS if key in index}
+            if keys == [("_id", 1)]:
+                name = "_id_"  # The server's own name for the default index
+            else:
+                name = index.get("name") or "_".join(
+                    f"{field}_{direction}" for field, direction in keys
+                )
+            collection_specs.append({"name": name, "keys": keys, "options": options})
+        specs[collection_name] = collection_specs
+    return specs
+
+
+def _index_matches(spec: Dict[str, Any], existing: Dict[str, Any]) -> bool:
+    """
+    Summary: Check whether a live index has the keys and options of a spec.
+    """
+    if [tuple(key) for key in existing["key"]] != spec["keys"]:
+        return False
+    for option in INDEX_OPTIONS:
+        if option == "collation" and "collation" in spec["options"]:
+            # The server fills in every collation default (caseLevel,
+            # alternate, version...), so only compare the declared fields
+            declared = spec["options"]["collation"]
+            live = existing.get("collation") or {}
+            if any(live.get(field) != value for field, value in declared.items()):
+                return False
+        elif spec["options"].get(option) != existing.get(option):
+            return False
+    return True
+
+
+def reconcile_indexes(
+    mongo: MongoConnect,
+    specs: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+    apply: bool = True,
+    drop_extra: bool = False,
+) -> Dict[str, Dict[str, List[str]]]:
+    """
+    Summary: Compare declared indexes with the live database and fix the differences.
+
+    Since MongoDB 4.2 every index build only locks the collection briefly at
+    its start and end, so reads and writes keep going on large collections
+    while an index is created.
+
+    Args:
+        mongo (MongoConnect): handle to the database.
+        specs (Dict, optional): declarations from load_index_specs. Defaults to dataschema.json.
+        apply (bool, optional): create missing indexes. Defaults to True.
+        drop_extra (bool, optional): drop indexes that are not declared. Defaults to False.
+    Return:
+        Dict[str, Dict[str, List[str]]]: per collection, the "missing", "extra"
+                                          and "mismatched" index names and what was
+                                          "created" or "dropped".
+    """
+    if specs is None:
+        specs = load_index_specs()
+
+    report = {}
+    for collection_name, collection_specs in specs.items():
+        existing = mongo.list_indexes(collection_name)
+        result = {
+            "missing": [],
+            "extra": [],
+            "mismatched": [],
+            "created": [],
+            "dropped": [],
+        }
+
+        declared = set()
+        for spec in collection_specs:
+            declared.add(spec["name"])
+            if spec["name"] == "_id_":
+                continue
+            if spec["name"] not in existing:
+                result["missing"].append(spec["name"])
+                if apply:
+                    mongo.create_index(
+                        collection_name,
+                        spec["keys"],
+                        name=spec["name"],
+                        **spec["options"],
+                    )
+                    result["created"].append(spec["name"])
+            elif not _index_matches(spec, existing[spec["name"]]):
+                # Options cannot be changed in place, leave it to an operator
+                result["mismatched"].append(spec["name"])
+
+        for name in existing:
+            if name == "_id_" or name in declared:
+                continue
+            result["extra"].append(name)
+            if drop_extra:
+                mongo.drop_index(collection_name, name)
+                result["dropped"].append(name)
+
+        report[collection_name] = result
+    return report
+
+
+def reconcile_indexes_in_background() -> threading.Thread:
+    """
+    Summary: Reconcile indexes on a daemon thread so startup is not blocked.
+
+    Return:
+        threading.Thread: the started thread.
+    """
+
+    def run():
+        try:
+            report = reconcile_indexes(MongoConnect())
+            for collection_name, result in report.items():
+                if any(result.values()):
+                    logging.info(f"Indexes for {collection_name}: {result}")
+        except Exception as e:
+            logging.error(f"Index reconciliation failed: {e}")
+
+    thread = threading.Thread(target=run, name="index-reconciler", daemon=True)
+    thread.start()
+    return thread
+
+
+@click.command("sync-indexes")
+@click.option("--apply", is_flag=True, help="Create missing indexes.")
+@click.option("--drop-extra", is_flag=True, help="Drop undeclared indexes.")
+@click.option("--schema", default=DATASCHEMA_PATH, help="Path to dataschema.json.")
+def sync_indexes_command(apply: bool, drop_extra: bool, schema: str):
+    """Report, and optionally fix, differences with dataschema.json indexes."""
+    report = reconcile_indexes(
+        MongoConnect(), load_index_specs(schema), apply=apply, drop_extra=drop_extra
+    )
+    click.echo(json.dumps(report, indent=2))
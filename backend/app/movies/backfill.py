@@ -0,0 +1,68 @@
+import logging
+
+import click
+from app.models import parse_duration, release_date_from_year, split_countries
+from app.mongo import MongoConnect
+
+BACKFILL_BATCH_SIZE = 1000  # Documents updated per bulk write
+
+
+def backfill_sort_fields(
+    mongo: MongoConnect, batch_size: int = BACKFILL_BATCH_SIZE
+) -> int:
+    """
+    Summary: Add the derived sort and filter fields to movies ingested before they existed.
+
+    Args:
+        mongo (MongoConnect): handle to the database.
+        batch_size (int, optional): documents updated per bulk write.
+    Return:
+        int: number of movies updated.
+    """
+    query = {
+        "$or": [
+            {"duration_minutes": {"$exists": False}},
+            {"season_count": {"$exists": False}},
+            {"release_date": {"$exists": False}},
+            {"countries": {"$exists": False}},
+        ]
+    }
+    projection = {"duration": 1, "release_year": 1, "country": 1}
+
+    updates, updated = [], 0
+    for movie in mongo.iter_documents(
+        "movies", query, projection, batch_size=batch_size
+    ):
+        duration_minutes, season_count = parse_duration(movie.get("duration"))
+        try:
+            release_year = int(movie.get("release_year") or 0)
+        except ValueError:
+            release_year = 0
+
+        updates.append(
+            (
+                {"_id": movie["_id"]},
+                {
+                    "duration_minutes": duration_minutes,
+                    "season_count": season_count,
+                    "release_date": release_date_from_year(release_year),
+                    "countries": split_countries(movie.get("country")),
+                },
+            )
+        )
+        if len(updates) >= batch_size:
+            updated += mongo.bulk_update_documents("movies", updates)
+            updates.clear()
+
+    updated += mongo.bulk_update_documents("movies", updates)
+    logging.info(f"Backfilled sort and filter fields on {updated} movies")
+    return updated
+
+
+@click.command("backfill-sort-fields")
+@click.option(
+    "--batch-size", default=BACKFILL_BATCH_SIZE, help="Documents per bulk write."
+)
+def backfill_sort_fields_command(batch_size: int):
+    """Add duration_minutes, season_count, release_date and countries to existing movies."""
+    click.echo(f"Updated {backfill_sort_fields(MongoConnect(), batch_size)} movies")
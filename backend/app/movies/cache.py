@@ -0,0 +1,196 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from app.cache import TTLCache
+
+PAGE_CACHE_BACKEND = os.getenv("PAGE_CACHE_BACKEND", "memory")  # memory, redis or none
+PAGE_CACHE_URL = os.getenv("PAGE_CACHE_URL", "redis://localhost:6379/0")
+PAGE_CACHE_TTL = float(os.getenv("PAGE_CACHE_TTL", "30"))
+PAGE_CACHE_SIZE = int(os.getenv("PAGE_CACHE_SIZE", "512"))
+PAGE_CACHE_PREFIX = os.getenv("PAGE_CACHE_PREFIX", "movie_pages")
+# Seconds a Redis call may take before the cache is skipped for that request
+PAGE_CACHE_TIMEOUT = float(os.getenv("PAGE_CACHE_TIMEOUT", "0.5"))
+
+
+class PageCache:
+    """
+    Summary: Cache of serialized dashboard pages, invalidated by a generation counter.
+
+    Every key is scoped to the current generation, so bumping the generation
+    drops all cached pages at once. get() returns the generation it looked
+    in, and set() stores under that generation: a page built from data read
+    before an invalidation is never cached as current. This base class
+    caches nothing.
+    """
+
+    backend = "none"
+
+    def get(self, key: str) -> Tuple[Optional[bytes], int]:
+        """
+        Summary: Get a cached page body for the current generation.
+
+        Return:
+            Tuple[Optional[bytes], int]: the body or None, and the generation to pass to set().
+        """
+        return None, 0
+
+    def set(self, key: str, body: bytes, generation: int):
+        """
+        Summary: Cache a page body built after the get() that returned generation.
+        """
+
+    def invalidate(self):
+        """
+        Summary: Bump the generation, dropping every cached page.
+        """
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Summary: Hit and miss counters of the cache.
+        """
+        return {"backend": self.backend}
+
+
+class MemoryPageCache(PageCache):
+    """
+    Summary: Per-process LRU and TTL page cache.
+    """
+
+    backend = "memory"
+
+    def __init__(self, max_entries: int = PAGE_CACHE_SIZE, ttl: float = PAGE_CACHE_TTL):
+        self._cache = TTLCache(max_entries, ttl)
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Tuple[Optional[bytes], int]:
+        generation = self._generation
+        return self._cache.get((generation, key)), generation
+
+    def set(self, key: str, body: bytes, generation: int):
+        # Pages of an older generation would outlive the invalidation
+        if generation == self._generation:
+            self._cache.set((generation, key), body)
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "generation": self._generation,
+            **self._cache.stats(),
+        }
+
+
+class RedisPageCache(PageCache):
+    """
+    Summary: Page cache shared by every worker through Redis.
+
+    The generation lives in Redis too, so an upload finishing in one worker
+    invalidates the pages cached by all of them. Each worker re-reads the
+    generation at most once a second.
+    """
+
+    backend = "redis"
+    GENERATION_REFRESH = 1.0
+
+    def __init__(
+        self,
+        url: str = PAGE_CACHE_URL,
+        ttl: float = PAGE_CACHE_TTL,
+        prefix: str = PAGE_CACHE_PREFIX,
+    ):
+        import redis
+
+        self._redis = redis.Redis.from_url(
+            url,
+            socket_timeout=PAGE_CACHE_TIMEOUT,
+            socket_connect_timeout=PAGE_CACHE_TIMEOUT,
+        )
+        # from_url does not connect, fail here so the caller can fall back
+        self._redis.ping()
+        self._ttl = max(int(ttl), 1)
+        self._prefix = prefix
+        self._generation = 0
+        self._generation_read_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def _current_generation(self) -> int:
+        now = time.monotonic()
+        if now - self._generation_read_at >= self.GENERATION_REFRESH:
+            generation = self._redis.get(f"{self._prefix}:generation")
+            self._generation = int(generation or 0)
+            self._generation_read_at = now
+        return self._generation
+
+    def _key(self, generation: int, key: str) -> str:
+        return f"{self._prefix}:{generation}:{key}"
+
+    def get(self, key: str) -> Tuple[Optional[bytes], int]:
+        generation = self._generation
+        try:
+            generation = self._current_generation()
+            body = self._redis.get(self._key(generation, key))
+        except Exception as e:
+            logging.warning(f"Page cache read failed: {e}")
+            body = None
+        if body is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return body, generation
+
+    def set(self, key: str, body: bytes, generation: int):
+        if generation != self._generation:
+            return
+        try:
+            self._redis.setex(self._key(generation, key), self._ttl, body)
+        except Exception as e:
+            logging.warning(f"Page cache write failed: {e}")
+
+    def invalidate(self):
+        try:
+            self._generation = self._redis.incr(f"{self._prefix}:generation")
+            self._generation_read_at = time.monotonic()
+        except Exception as e:
+            logging.error(f"Page cache invalidation failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "generation": self._generation,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def create_page_cache(backend: str = PAGE_CACHE_BACKEND) -> PageCache:
+    """
+    Summary: Build the configured page cache.
+
+    Args:
+        backend (str, optional): "memory", "redis" or "none".
+    Return:
+        PageCache: the cache, falling back to memory if Redis is unavailable.
+    """
+    if backend == "redis":
+        try:
+            return RedisPageCache()
+        except Exception as e:
+            logging.error(f"Redis page cache unavailable, using memory: {e}")
+            return MemoryPageCache()
+    if backend == "memory":
+        return MemoryPageCache()
+    return PageCache()
+
+
+page_cache = create_page_cache()
@@ -0,0 +1,234 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.mongo import AsyncMongoConnect, MongoConnect
+
+COUNT_CACHE_TTL = float(os.getenv("COUNT_CACHE_TTL", "300"))
+COUNT_CACHE_SIZE = int(os.getenv("COUNT_CACHE_SIZE", "256"))
+
+
+class UnsupportedQuery(ValueError):
+    """
+    Summary: Raised when a query cannot be evaluated against a document in Python.
+    """
+
+
+def _values(document: Dict[str, Any], field: str) -> List[Any]:
+    """
+    Summary: Values a query on a field compares against, arrays match per element.
+    """
+    value = document.get(field)
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
+def _matches_condition(values: List[Any], condition: Any) -> bool:
+    """
+    Summary: Evaluate a single field condition against the field's values.
+    """
+    if not isinstance(condition, dict):
+        return condition in values
+
+    for operator, operand in condition.items():
+        if operator == "$in":
+            matched = any(value in operand for value in values)
+        elif operator == "$all":
+            matched = all(item in values for item in operand)
+        elif operator in ("$gt", "$gte", "$lt", "$lte"):
+            matched = any(
+                value is not None and _compare(operator, value, operand)
+                for value in values
+            )
+        else:
+            raise UnsupportedQuery(f"Unsupported operator {operator}")
+        if not matched:
+            return False
+    return True
+
+
+def _compare(operator: str, value: Any, operand: Any) -> bool:
+    """
+    Summary: Apply a comparison operator, values of other types never match.
+    """
+    try:
+        if operator == "$gt":
+            return value > operand
+        if operator == "$gte":
+            return value >= operand
+        if operator == "$lt":
+            return value < operand
+        return value <= operand
+    except TypeError:
+        return False
+
+
+def matches(document: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    """
+    Summary: Check whether a document matches a simple Mongo query.
+
+    Supports equality, $in, $all, range operators and $and, which covers the
+    dashboard filters.
+
+    Args:
+        document (Dict[str, Any]): the document.
+        query (Dict[str, Any]): the query.
+    Return:
+        bool: True if the document matches.
+    Raises:
+        UnsupportedQuery: if the query uses anything else.
+    """
+    for field, condition in query.items():
+        if field == "$and":
+            if not all(matches(document, clause) for clause in condition):
+                return False
+        elif field.startswith("$"):
+            raise UnsupportedQuery(f"Unsupported operator {field}")
+        elif not _matches_condition(_values(document, field), condition):
+            return False
+    return True
+
+
+class MovieCountProvider:
+    """
+    Summary: Movie counts for pagination without a full count on every page.
+
+    Unfiltered views use the collection's estimated count. Filtered views are
+    counted once, cached, and kept current by the ingestion path as batches
+    commit. Entries expire after a TTL so writes made by other processes are
+    picked up.
+    """
+
+    def __init__(
+        self, ttl: float = COUNT_CACHE_TTL, max_entries: int = COUNT_CACHE_SIZE
+    ):
+        """
+        Summary: Initialise the provider.
+
+        Args:
+            ttl (float): seconds a cached count is trusted.
+            max_entries (int): maximum number of cached filtered counts.
+        """
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(query: Dict[str, Any]) -> str:
+        return json.dumps(query, sort_keys=True, default=str)
+
+    def count(self, mongo: MongoConnect, query: Dict[str, Any]) -> Tuple[int, bool]:
+        """
+        Summary: Count the movies matching a query.
+
+        Args:
+            mongo (MongoConnect): handle used when a count has to be computed.
+            query (Dict[str, Any]): dashboard query.
+        Return:
+            Tuple[int, bool]: the count, and whether it is exact or estimated.
+        """
+        if not query:
+            return mongo.estimated_document_count("movies"), False
+
+        cached = self._cached(query)
+        if cached is not None:
+            return cached, True
+
+        total = mongo.count_documents("movies", query)
+        self._store(query, total)
+        return total, True
+
+    async def count_async(
+        self, mongo: AsyncMongoConnect, query: Dict[str, Any]
+    ) -> Tuple[int, bool]:
+        """
+        Summary: Count the movies matching a query, for the ASGI app.
+
+        Args:
+            mongo (AsyncMongoConnect): handle used when a count has to be computed.
+            query (Dict[str, Any]): dashboard query.
+        Return:
+            Tuple[int, bool]: the count, and whether it is exact or estimated.
+        """
+        if not query:
+            return await mongo.estimated_document_count("movies"), False
+
+        cached = self._cached(query)
+        if cached is not None:
+            return cached, True
+
+        total = await mongo.count_documents("movies", query)
+        self._store(query, total)
+        return total, True
+
+    def _cached(self, query: Dict[str, Any]) -> Optional[int]:
+        """
+        Summary: Cached count of a query, None if missing or expired.
+        """
+        key = self._key(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.monotonic() - entry["counted_at"] < self._ttl:
+                self._entries.move_to_end(key)
+                return entry["count"]
+        return None
+
+    def _store(self, query: Dict[str, Any], total: int):
+        """
+        Summary: Cache a computed count, evicting the least recently used ones.
+        """
+        key = self._key(query)
+        with self._lock:
+            self._entries[key] = {
+                "query": query,
+                "count": total,
+                "counted_at": time.monotonic(),
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def record_batch(self, movies: List[Dict[str, Any]], counts: Dict[str, int]):
+        """
+        Summary: Update cached counts after a batch of movies was written.
+
+        New movies are added to every cached count they match. If the batch
+        changed existing movies, their old values are unknown, so the cached
+        filtered counts are dropped and recomputed on next use.
+
+        Args:
+            movies (List[Dict[str, Any]]): documents of the batch.
+            counts (Dict[str, int]): "inserted", "updated" and "unchanged" counts.
+        """
+        with self._lock:
+            if not self._entries or (
+                counts["inserted"] == 0 and counts["updated"] == 0
+            ):
+                return
+            if counts["updated"] or counts["inserted"] != len(movies):
+                self._entries.clear()
+                return
+
+            for key in list(self._entries):
+                entry = self._entries[key]
+                try:
+                    entry["count"] += sum(
+                        1 for movie in movies if matches(movie, entry["query"])
+                    )
+                except UnsupportedQuery:
+                    del self._entries[key]
+
+    def clear(self):
+        """
+        Summary: Drop every cached count.
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+movie_counts = MovieCountProvider()
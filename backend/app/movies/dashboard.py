@@ -0,0 +1,216 @@
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from app.movies.filters import (
+    SORT_FIELDS,
+    build_filter_query,
+    combine_queries,
+    filter_key,
+)
+from app.movies.pagination import (
+    decode_cursor,
+    encode_cursor,
+    keyset_query,
+    reverse_sort,
+)
+from app.movies.serializers import movie_projection, resolve_fields
+
+# Largest page a dashboard request may ask for
+MAX_PER_PAGE = int(os.getenv("MAX_PER_PAGE", "1000"))
+
+
+def _int_param(
+    args, name: str, default: int, minimum: int, maximum: Optional[int] = None
+) -> int:
+    """
+    Summary: Read an integer query parameter within bounds.
+
+    Raises:
+        ValueError: if the value is not an integer or out of bounds.
+    """
+    try:
+        value = int(args.get(name, default))
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
+    if value < minimum or (maximum is not None and value > maximum):
+        if maximum is None:
+            raise ValueError(f"{name} must be at least {minimum}")
+        raise ValueError(f"{name} must be between {minimum} and {maximum}")
+    return value
+
+
+class DashboardQuery:
+    """
+    Summary: A movie_dashboard request turned into its Mongo query and page layout.
+
+    Holds no database handle, so the Flask routes and the ASGI app share it
+    and only differ in how they run the query.
+    """
+
+    def __init__(self, args):
+        """
+        Summary: Parse the query string of a dashboard request.
+
+        Args:
+            args: query string of the request, with get and getlist.
+        Raises:
+            ValueError: if a parameter is invalid, including InvalidCursor.
+        """
+        # Fetch query parameters for pagination and sorting
+        self.page = _int_param(args, "page", 1, 1)
+        self.per_page = _int_param(args, "per_page", 20, 1, MAX_PER_PAGE)
+        sort_by = args.get("sort_by", "date_added")  # Default sorting by date_added
+        sort_order = args.get("sort_order", "asc")  # Default sorting order is ascending
+        self.cursor = args.get("cursor")
+
+        # Fields to return, the sort keys are always included for the cursors
+        fields = resolve_fields(args.get("view"), args.get("fields"))
+        # Filters, each backed by compound indexes matching the sort keys
+        self.filter_query = build_filter_query(args)
+
+        # Log query parameters
+        logging.info(
+            f"Received parameters: page={self.page}, per_page={self.per_page}, sort_by={sort_by}, sort_order={sort_order}"
+        )
+
+        # Ensure sort_by is a valid field
+        if sort_by not in SORT_FIELDS:
+            logging.warning(
+                f"Invalid 'sort_by' parameter received: {sort_by}. Defaulting to 'date_added'."
+            )
+            sort_by = "date_added"
+        self.sort_by = sort_by
+
+        # Determine the sort direction (ascending or descending)
+        self.sort_order = "asc" if sort_order == "asc" else "desc"
+        sort_direction = 1 if self.sort_order == "asc" else -1
+        self.sort_criteria = [(field, sort_direction) for field in SORT_FIELDS[sort_by]]
+        # _id breaks ties so every position in the sort order is unique
+        self.sort_criteria.append(("_id", sort_direction))
+
+        # Log the sorting criteria
+        logging.info(f"Sorting criteria: {self.sort_criteria}")
+
+        self.fields = fields + [
+            field
+            for field, _ in self.sort_criteria
+            if field not in fields and field != "_id"
+        ]
+
+        # Key of the page in the page cache
+        self.cache_key = (
+            f"{self.cursor or self.page}|{self.per_page}|{sort_by}|{self.sort_order}"
+            f"|{','.join(self.fields)}|{filter_key(self.filter_query)}"
+        )
+
+        if self.cursor:
+            # Keyset pagination: continue after (or before) the cursor position
+            position = decode_cursor(self.cursor, sort_by, self.sort_order)
+            self.forward = position["d"] == "next"
+            self.query = combine_queries(
+                self.filter_query,
+                keyset_query(self.sort_criteria, position["k"], self.forward),
+            )
+            self.skip = 0
+        else:
+            self.forward = True
+            self.query = self.filter_query
+            # Calculate the skip value for pagination
+            self.skip = (self.page - 1) * self.per_page
+            logging.info(f"Pagination: skip={self.skip}, limit={self.per_page}")
+
+    @property
+    def projection(self) -> Dict[str, Any]:
+        """
+        Summary: Projection of the page query, _id is converted to a string by the server.
+        """
+        return movie_projection(self.fields)
+
+    @property
+    def sort(self):
+        """
+        Summary: Sort of the page query, reversed when reading a previous page.
+        """
+        return self.sort_criteria if self.forward else reverse_sort(self.sort_criteria)
+
+    @property
+    def limit(self) -> int:
+        """
+        Summary: Documents fetched, one more than a page to tell if there is a next one.
+        """
+        return self.per_page + 1
+
+    def pagination(
+        self,
+        total_movies: int,
+        count_exact: bool,
+        first: Optional[dict],
+        last: Optional[dict],
+        has_more: bool,
+    ) -> Dict[str, Any]:
+        """
+        Summary: Pagination block with continuation tokens for the neighbouring pages.
+
+        Args:
+            total_movies (int): movies matching the filters.
+            count_exact (bool): whether total_movies is exact or estimated.
+            first (dict, optional): first movie of the page.
+            last (dict, optional): last movie of the page.
+            has_more (bool): whether the query had more than a page of movies.
+        Return:
+            Dict[str, Any]: the pagination block.
+        """
+        per_page = self.per_page
+        total_pages = (total_movies // per_page) + (1 if total_movies % per_page else 0)
+
+        has_next = has_more if self.forward else True
+        has_prev = (bool(self.cursor) or self.page > 1) if self.forward else has_more
+        pagination = {
+            "total_pages": total_pages,
+            "total_movies": total_movies,
+            "count_exact": count_exact,
+            "next": None,
+            "prev": None,
+        }
+        if not self.cursor:
+            pagination = {"current_page": self.page, **pagination}
+        if last is not None and has_next:
+            pagination["next"] = encode_cursor(
+                last, self.sort_criteria, self.sort_by, self.sort_order, "next"
+            )
+        if first is not None and has_prev:
+            pagination["prev"] = encode_cursor(
+                first, self.sort_criteria, self.sort_by, self.sort_order, "prev"
+            )
+        return pagination
+
+    def page_body(
+        self, documents: List[dict], total_movies: int, count_exact: bool
+    ) -> Dict[str, Any]:
+        """
+        Summary: Response body of a page from the documents the query returned.
+
+        Args:
+            documents (List[dict]): up to limit movies, in query order.
+            total_movies (int): movies matching the filters.
+            count_exact (bool): whether total_movies is exact or estimated.
+        Return:
+            Dict[str, Any]: {"movies": [...], "pagination": {...}}.
+        """
+        has_more = len(documents) > self.per_page
+        movies = documents[: self.per_page]
+        if not self.forward:
+            movies.reverse()
+
+        # Log number of movies fetched
+        logging.info(f"Fetched {len(movies)} movies")
+
+        pagination = self.pagination(
+            total_movies,
+            count_exact,
+            movies[0] if movies else None,
+            movies[-1] if movies else None,
+            has_more,
+        )
+        return {"movies": movies, "pagination": pagination}
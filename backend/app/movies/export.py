@@ -0,0 +1,170 @@
+import csv
+import io
+import os
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from app.movies.serializers import dumps
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))  # Cursor batch size
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "500"))  # Rows per chunk sent
+EXPORT_GZIP_LEVEL = int(os.getenv("EXPORT_GZIP_LEVEL", "6"))
+EXPORT_FORMATS = ("ndjson", "csv")
+
+# Column layout of the uploaded CSV files, as read by Movie.from_csv
+CSV_COLUMNS = [
+    "show_id",
+    "type",
+    "title",
+    "director",
+    "cast",
+    "country",
+    "date_added",
+    "release_year",
+    "rating",
+    "duration",
+    "listed_in",
+    "description",
+]
+
+# Movie fields needed to write the CSV columns
+CSV_FIELDS = [
+    "show_id",
+    "movie_type",
+    "title",
+    "director",
+    "cast",
+    "country",
+    "date_added",
+    "release_year",
+    "rating",
+    "duration",
+    "listed_in",
+    "description",
+]
+
+
+def csv_projection() -> Dict[str, Any]:
+    """
+    Summary: Projection with only the fields written to the CSV export.
+    """
+    projection: Dict[str, Any] = {"_id": 0}
+    for field in CSV_FIELDS:
+        projection[field] = 1
+    return projection
+
+
+def _format_date_added(value: Optional[datetime]) -> str:
+    """
+    Summary: Format date_added the way the catalog CSV does, e.g. "September 2, 2021".
+    """
+    if value is None:
+        return ""
+    return f"{value:%B} {value.day}, {value.year}"
+
+
+def movie_to_csv_row(movie: Dict[str, Any]) -> List[Any]:
+    """
+    Summary: Convert a movie document back into a row of the upload CSV layout.
+
+    Args:
+        movie (Dict[str, Any]): movie document.
+    Return:
+        List[Any]: values in CSV_COLUMNS order.
+    """
+    release_year = movie.get("release_year")
+    return [
+        movie.get("show_id", ""),
+        movie.get("movie_type", ""),
+        movie.get("title", ""),
+        movie.get("director", ""),
+        ", ".join(movie.get("cast") or []),
+        movie.get("country", ""),
+        _format_date_added(movie.get("date_added")),
+        "" if release_year is None else release_year,
+        movie.get("rating") or "",
+        movie.get("duration") or "",
+        ", ".join(movie.get("listed_in") or []),
+        movie.get("description", ""),
+    ]
+
+
+def iter_ndjson(
+    documents: Iterable[Dict[str, Any]], chunk_rows: int = EXPORT_CHUNK_ROWS
+) -> Iterator[bytes]:
+    """
+    Summary: Encode documents as newline delimited JSON, a chunk of rows at a time.
+
+    Args:
+        documents (Iterable[Dict[str, Any]]): documents to encode.
+        chunk_rows (int, optional): rows joined into each yielded chunk.
+    Return:
+        Iterator[bytes]: encoded chunks.
+    """
+    chunk: List[bytes] = []
+    for document in documents:
+        chunk.append(dumps(document))
+        if len(chunk) >= chunk_rows:
+            yield b"\n".join(chunk) + b"\n"
+            chunk.clear()
+    if chunk:
+        yield b"\n".join(chunk) + b"\n"
+
+
+def iter_csv(
+    documents: Iterable[Dict[str, Any]],
+    chunk_rows: int = EXPORT_CHUNK_ROWS,
+    header: bool = True,
+) -> Iterator[bytes]:
+    """
+    Summary: Encode movies as CSV in the upload layout, header first.
+
+    Args:
+        documents (Iterable[Dict[str, Any]]): movie documents.
+        chunk_rows (int, optional): rows written into each yielded chunk.
+        header (bool, optional): whether to start with the header row.
+    Return:
+        Iterator[bytes]: encoded chunks.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(CSV_COLUMNS)
+    rows = 0
+    for movie in documents:
+        writer.writerow(movie_to_csv_row(movie))
+        rows += 1
+        if rows >= chunk_rows:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    yield buffer.getvalue().encode("utf-8")
+
+
+def gzip_compressor(level: int = EXPORT_GZIP_LEVEL):
+    """
+    Summary: zlib compressor writing a single gzip member.
+    """
+    return zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip header
+
+
+def gzip_stream(
+    chunks: Iterable[bytes], level: int = EXPORT_GZIP_LEVEL
+) -> Iterator[bytes]:
+    """
+    Summary: Compress a stream of chunks into a single gzip member.
+
+    Args:
+        chunks (Iterable[bytes]): uncompressed chunks.
+        level (int, optional): zlib compression level.
+    Return:
+        Iterator[bytes]: compressed chunks, empty output is skipped.
+    """
+    compressor = gzip_compressor(level)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
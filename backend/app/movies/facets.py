@@ -0,0 +1,202 @@
+import logging
+import os
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+import click
+from app.mongo import MongoConnect, is_blank, load_index_specs
+
+FACETS_COLLECTION = "movie_facets"
+FACET_LIMIT = int(os.getenv("FACET_LIMIT", "50"))  # Values returned per facet
+
+# Facet names and the movie field each one counts
+FACET_FIELDS = {
+    "listed_in": "listed_in",
+    "country": "countries",
+    "rating": "rating",
+    "movie_type": "movie_type",
+    "release_year": "release_year",
+}
+FACET_PROJECTION = {"_id": 0, "show_id": 1, **{f: 1 for f in FACET_FIELDS.values()}}
+# Query and projection reading the stored counts
+FACET_READ_QUERY = ({"count": {"$gt": 0}}, {"_id": 0})
+
+
+def facet_values(movie: Dict[str, Any]) -> Iterator[Tuple[str, Any]]:
+    """
+    Summary: (facet, value) pairs a movie counts towards.
+
+    Args:
+        movie (Dict[str, Any]): movie document.
+    Return:
+        Iterator[Tuple[str, Any]]: one pair per value, arrays count once per item.
+    """
+    for facet, field in FACET_FIELDS.items():
+        value = movie.get(field)
+        values = value if isinstance(value, list) else [value]
+        for item in set(values):
+            if item is not None and item != "":
+                yield facet, item
+
+
+def facet_deltas(
+    previous: Dict[str, Dict[str, Any]], written: List[Dict[str, Any]], merge: bool
+) -> Counter:
+    """
+    Summary: Facet count changes caused by writing a batch of movies.
+
+    Args:
+        previous (Dict[str, Dict[str, Any]]): stored movies before the write, by show_id.
+        written (List[Dict[str, Any]]): movies written by the batch.
+        merge (bool): whether blank fields of the batch kept their stored value.
+    Return:
+        Counter: change per (facet, value), without zero entries.
+    """
+    deltas: Counter = Counter()
+    for movie in written:
+        old = previous.get(movie["show_id"])
+        if merge and old:
+            new = {**old, **{f: v for f, v in movie.items() if not is_blank(v)}}
+        else:
+            new = movie
+        deltas.update(facet_values(new))
+        if old:
+            deltas.subtract(facet_values(old))
+    return Counter({key: delta for key, delta in deltas.items() if delta})
+
+
+def previous_facet_values(
+    mongo: MongoConnect, movies: List[Dict[str, Any]]
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Summary: Fetch the facet fields of the stored versions of a batch of movies.
+
+    Args:
+        mongo (MongoConnect): handle to the database.
+        movies (List[Dict[str, Any]]): movies about to be upserted.
+    Return:
+        Dict[str, Dict[str, Any]]: stored movies by show_id, new ones are absent.
+    """
+    show_ids = [movie["show_id"] for movie in movies]
+    return {
+        movie["show_id"]: movie
+        for movie in mongo.iter_documents(
+            "movies", {"show_id": {"$in": show_ids}}, FACET_PROJECTION
+        )
+    }
+
+
+def record_facets(
+    mongo: MongoConnect,
+    previous: Dict[str, Dict[str, Any]],
+    written: List[Dict[str, Any]],
+    merge: bool = False,
+) -> int:
+    """
+    Summary: Apply the facet count changes of a committed batch with $inc upserts.
+
+    Args:
+        mongo (MongoConnect): handle to the database.
+        previous (Dict[str, Dict[str, Any]]): stored movies before the write, by show_id.
+        written (List[Dict[str, Any]]): movies written by the batch.
+        merge (bool, optional): whether the batch was merged into stored movies.
+    Return:
+        int: number of facet values changed.
+    """
+    deltas = facet_deltas(previous, written, merge)
+    return mongo.bulk_increment_documents(
+        FACETS_COLLECTION,
+        [
+            ({"facet": facet, "value": value}, {"count": delta})
+            for (facet, value), delta in deltas.items()
+        ],
+    )
+
+
+def read_facets(mongo: MongoConnect, limit: int = FACET_LIMIT) -> Dict[str, List[dict]]:
+    """
+    Summary: Facet counts for the dashboard, largest first.
+
+    Args:
+        mongo (MongoConnect): handle to the database.
+        limit (int, optional): values returned per facet.
+    Return:
+        Dict[str, List[dict]]: {"value", "count"} entries per facet.
+    """
+    entries = mongo.iter_documents(FACETS_COLLECTION, *FACET_READ_QUERY)
+    return facets_from_entries(entries, limit)
+
+
+def facets_from_entries(
+    entries: Iterable[Dict[str, Any]], limit: int = FACET_LIMIT
+) -> Dict[str, List[dict]]:
+    """
+    Summary: Group stored facet counts by facet, largest first.
+
+    Args:
+        entries (Iterable[Dict[str, Any]]): movie_facets documents.
+        limit (int, optional): values returned per facet.
+    Return:
+        Dict[str, List[dict]]: {"value", "count"} entries per facet.
+    """
+    facets: Dict[str, List[dict]] = {facet: [] for facet in FACET_FIELDS}
+    for entry in entries:
+        if entry["facet"] in facets:
+            facets[entry["facet"]].append(
+                {"value": entry["value"], "count": entry["count"]}
+            )
+    for facet, values in facets.items():
+        values.sort(key=lambda value: (-value["count"], str(value["value"])))
+        del values[limit:]
+    return facets
+
+
+def rebuild_facets(mongo: MongoConnect) -> int:
+    """
+    Summary: Recompute every facet count from the movies collection.
+
+    $inc updates from ingestion batches that commit while the counts are
+    being computed are not included, run it when no upload is in progress.
+
+    Args:
+        mongo (MongoConnect): handle to the database.
+    Return:
+        int: number of facet values stored.
+    """
+    entries = []
+    for facet, field in FACET_FIELDS.items():
+        pipeline = [
+            {"$project": {"value": f"${field}"}},
+            {"$unwind": "$value"},
+            {"$match": {"value": {"$nin": [None, ""]}}},
+            # Count each movie once per value, even if the value repeats in it
+            {"$group": {"_id": {"movie": "$_id", "value": "$value"}}},
+            {"$group": {"_id": "$_id.value", "count": {"$sum": 1}}},
+        ]
+        entries.extend(
+            {"facet": facet, "value": result["_id"], "count": result["count"]}
+            for result in mongo.aggregate("movies", pipeline)
+        )
+
+    # Build the new counts aside and swap them in at once, so readers never see
+    # an empty or partial collection
+    rebuilt = f"{FACETS_COLLECTION}_rebuild"
+    mongo.drop_collection(rebuilt)
+    for spec in load_index_specs().get(FACETS_COLLECTION, []):
+        if spec["name"] != "_id_":
+            mongo.create_index(
+                rebuilt, spec["keys"], name=spec["name"], **spec["options"]
+            )
+    if entries:
+        mongo.insert_many_documents(rebuilt, entries, ordered=False)
+        mongo.rename_collection(rebuilt, FACETS_COLLECTION)
+    else:
+        mongo.drop_collection(FACETS_COLLECTION)
+    logging.info(f"Rebuilt {len(entries)} facet counts")
+    return len(entries)
+
+
+@click.command("rebuild-facets")
+def rebuild_facets_command():
+    """Recompute the dashboard facet counts from the movies collection."""
+    click.echo(f"Stored {rebuild_facets(MongoConnect())} facet values")
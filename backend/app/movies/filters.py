@@ -0,0 +1,103 @@
+from datetime import datetime
+from typing import Any, Dict, List
+
+# Map the sorting fields to their corresponding indexed MongoDB fields
+SORT_FIELDS = {
+    "date_added": ["date_added"],  # Sort by the date the movie was added
+    "release_date": ["release_date"],  # Sort by release date
+    # Sort by runtime in minutes, TV shows by their number of seasons
+    "duration": ["duration_minutes", "season_count"],
+}
+
+# Dashboard filter parameters and the movie field each one matches
+FILTER_FIELDS = {
+    "listed_in": "listed_in",
+    "country": "countries",
+    "cast": "cast",
+    "movie_type": "movie_type",
+    "rating": "rating",
+}
+# Array fields, where several values must all be present
+ARRAY_FILTERS = ("listed_in", "country", "cast")
+YEAR_RANGE_PARAMS = ("release_year_min", "release_year_max")
+MIN_YEAR, MAX_YEAR = 1, 9998
+
+
+def _values(args, name: str) -> List[str]:
+    """
+    Summary: Values of a filter, given repeatedly and/or comma separated.
+    """
+    values = []
+    for raw in args.getlist(name):
+        values.extend(value.strip() for value in raw.split(",") if value.strip())
+    return values
+
+
+def build_filter_query(args) -> Dict[str, Any]:
+    """
+    Summary: Build the movies query for the filter parameters of a request.
+
+    listed_in, country and cast match movies having every given value.
+    movie_type and rating match any of the given values. release_year_min
+    and release_year_max bound the release year, both inclusive, through
+    release_date.
+
+    Args:
+        args: query string of the request.
+    Return:
+        Dict[str, Any]: the query, empty when no filter is given.
+    Raises:
+        ValueError: if a year bound is not an integer or out of range.
+    """
+    clauses = []
+    for name, field in FILTER_FIELDS.items():
+        values = sorted(set(_values(args, name)))
+        if not values:
+            continue
+        if len(values) == 1:
+            clauses.append({field: values[0]})
+        elif name in ARRAY_FILTERS:
+            clauses.append({field: {"$all": values}})
+        else:
+            clauses.append({field: {"$in": values}})
+
+    # Years are matched as release_date bounds, which the sort indexes cover
+    date_range = {}
+    for name, operator, offset in zip(YEAR_RANGE_PARAMS, ("$gte", "$lt"), (0, 1)):
+        value = args.get(name)
+        if value in (None, ""):
+            continue
+        try:
+            year = int(value)
+        except ValueError:
+            raise ValueError(f"{name} must be an integer")
+        if not MIN_YEAR <= year <= MAX_YEAR:
+            raise ValueError(f"{name} must be between {MIN_YEAR} and {MAX_YEAR}")
+        date_range[operator] = datetime(year + offset, 1, 1)
+    if date_range:
+        clauses.append({"release_date": date_range})
+
+    if not clauses:
+        return {}
+    if len(clauses) == 1:
+        return clauses[0]
+    return {"$and": clauses}
+
+
+def combine_queries(*queries: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Summary: AND together queries, skipping empty ones.
+    """
+    queries = [query for query in queries if query]
+    if not queries:
+        return {}
+    if len(queries) == 1:
+        return queries[0]
+    return {"$and": list(queries)}
+
+
+def filter_key(query: Dict[str, Any]) -> str:
+    """
+    Summary: Stable text form of a filter query, for cache keys.
+    """
+    return repr(query)
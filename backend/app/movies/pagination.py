@@ -0,0 +1,118 @@
+import base64
+import binascii
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId, json_util
+
+
+class InvalidCursor(ValueError):
+    """
+    Summary: Raised when a continuation token cannot be decoded or does not match the query.
+    """
+
+
+def encode_cursor(
+    document: Dict[str, Any],
+    sort: List[Tuple[str, int]],
+    sort_by: str,
+    sort_order: str,
+    direction: str,
+) -> str:
+    """
+    Summary: Build an opaque continuation token pointing at a document.
+
+    Args:
+        document (Dict[str, Any]): first or last document of the current page.
+        sort (List[Tuple[str, int]]): sort criteria of the query, ending with _id.
+        sort_by (str): sort_by parameter the token is valid for.
+        sort_order (str): sort_order parameter the token is valid for.
+        direction (str): "next" or "prev".
+    Return:
+        str: url-safe token.
+    """
+    values = [document.get(field) for field, _ in sort]
+    for index, (field, _) in enumerate(sort):
+        # _id may have been converted to a string by the projection
+        if field == "_id" and isinstance(values[index], str):
+            values[index] = ObjectId(values[index])
+
+    position = {
+        "k": values,
+        "s": sort_by,
+        "o": sort_order,
+        "d": direction,
+    }
+    return base64.urlsafe_b64encode(json_util.dumps(position).encode()).decode()
+
+
+def decode_cursor(token: str, sort_by: str, sort_order: str) -> Dict[str, Any]:
+    """
+    Summary: Decode a continuation token made by encode_cursor.
+
+    Args:
+        token (str): the token.
+        sort_by (str): sort_by parameter of the current request.
+        sort_order (str): sort_order parameter of the current request.
+    Return:
+        Dict[str, Any]: sort key values under "k" and direction under "d".
+    Raises:
+        InvalidCursor: if the token is malformed or was made for another sort.
+    """
+    try:
+        position = json_util.loads(base64.urlsafe_b64decode(token.encode()))
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise InvalidCursor(f"Malformed cursor: {e}")
+
+    if not isinstance(position, dict) or position.get("d") not in ("next", "prev"):
+        raise InvalidCursor("Malformed cursor")
+    if position.get("s") != sort_by or position.get("o") != sort_order:
+        raise InvalidCursor("Cursor does not match sort_by and sort_order")
+    return position
+
+
+def _beyond(field: str, value: Any, ascending: bool) -> Optional[Dict[str, Any]]:
+    """
+    Summary: Condition for values strictly after a value in sort order.
+
+    Nulls and missing fields sort before every other value.
+    """
+    if ascending:
+        if value is None:
+            return {field: {"$ne": None}}
+        return {field: {"$gt": value}}
+    if value is None:
+        return None
+    return {"$or": [{field: {"$lt": value}}, {field: None}]}
+
+
+def keyset_query(
+    sort: List[Tuple[str, int]], values: List[Any], forward: bool
+) -> Dict[str, Any]:
+    """
+    Summary: Query for the documents after (or before) a position in sort order.
+
+    Args:
+        sort (List[Tuple[str, int]]): sort criteria, ending with _id so keys are unique.
+        values (List[Any]): sort key values of the position, in the same order.
+        forward (bool): documents after the position if True, before it otherwise.
+    Return:
+        Dict[str, Any]: a range query the sort index can answer.
+    """
+    clauses = []
+    for index, (field, direction) in enumerate(sort):
+        beyond = _beyond(field, values[index], ascending=(direction == 1) == forward)
+        if beyond is None:
+            continue
+        equal = [{prefix: values[i]} for i, (prefix, _) in enumerate(sort[:index])]
+        clauses.append({"$and": equal + [beyond]} if equal else beyond)
+
+    if not clauses:
+        return {"_id": {"$exists": False}}
+    return {"$or": clauses}
+
+
+def reverse_sort(sort: List[Tuple[str, int]]) -> List[Tuple[str, int]]:
+    """
+    Summary: Flip every direction of a sort, used to walk backwards.
+    """
+    return [(field, -direction) for field, direction in sort]
@@ -0,0 +1,137 @@
+import logging
+from typing import Any, Dict, List, Set
+
+import click
+from app.movies.filters import FILTER_FIELDS, SORT_FIELDS, build_filter_query
+from app.mongo import MongoConnect
+from werkzeug.datastructures import MultiDict
+
+# Stand-in values, the plan only depends on the shape of the query
+SAMPLE_FILTERS: Dict[str, Dict[str, Any]] = {
+    **{name: {field: "x"} for name, field in FILTER_FIELDS.items()},
+    "release_year": build_filter_query(
+        MultiDict({"release_year_min": "2000", "release_year_max": "2010"})
+    ),
+}
+PLAN_CHECK_LIMIT = 21  # A dashboard page plus the look-ahead document
+RANGE_OPERATORS = ("$gt", "$gte", "$lt", "$lte")
+FULL_BOUNDS = ["[MinKey, MaxKey]"]
+
+
+def plan_nodes(plan: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Summary: Every stage of a query plan tree.
+
+    Args:
+        plan (Dict[str, Any]): a winning plan from explain output.
+    Return:
+        List[Dict[str, Any]]: the stages, parents before their inputs.
+    """
+    # Plans run by the slot-based engine nest the classic plan under queryPlan
+    plan = plan.get("queryPlan", plan)
+    nodes = [plan] if "stage" in plan else []
+    for key in ("inputStage", "outerStage", "innerStage"):
+        if key in plan:
+            nodes.extend(plan_nodes(plan[key]))
+    for child in plan.get("inputStages", []):
+        nodes.extend(plan_nodes(child))
+    return nodes
+
+
+def plan_stages(plan: Dict[str, Any]) -> Set[str]:
+    """
+    Summary: Names of every stage in a query plan tree.
+
+    Args:
+        plan (Dict[str, Any]): a winning plan from explain output.
+    Return:
+        Set[str]: stage names such as IXSCAN, FETCH or COLLSCAN.
+    """
+    return {node["stage"] for node in plan_nodes(plan)}
+
+
+def bounded_fields(plan: Dict[str, Any]) -> Set[str]:
+    """
+    Summary: Fields whose index bounds narrow an index scan of the plan.
+
+    A scan of the sort index with the filter applied afterwards reads every
+    key, its bounds on the filtered field are [MinKey, MaxKey] or absent.
+
+    Args:
+        plan (Dict[str, Any]): a winning plan from explain output.
+    Return:
+        Set[str]: the fields.
+    """
+    fields = set()
+    for node in plan_nodes(plan):
+        if node["stage"] != "IXSCAN":
+            continue
+        for field, bounds in node.get("indexBounds", {}).items():
+            if bounds != FULL_BOUNDS:
+                fields.add(field)
+    return fields
+
+
+def check_query_plans(mongo: MongoConnect) -> List[Dict[str, Any]]:
+    """
+    Summary: Explain every supported filter and sort combination of the dashboard.
+
+    A combination passes when an index scan is bounded on the filtered
+    field and the collection is never scanned. Equality filters must also
+    get the sort order from the index. A range filter may sort in memory,
+    as no index serves a range on one field in the order of another; it is
+    bounded by the range first.
+
+    Args:
+        mongo (MongoConnect): handle to the database.
+    Return:
+        List[Dict[str, Any]]: one result per combination, with its stages and
+                              whether it passed.
+    """
+    results = []
+    for filter_name, filter_query in SAMPLE_FILTERS.items():
+        field, condition = next(iter(filter_query.items()))
+        is_range = isinstance(condition, dict) and any(
+            operator in condition for operator in RANGE_OPERATORS
+        )
+        for sort_by, sort_fields in SORT_FIELDS.items():
+            for direction in (1, -1):
+                sort = [(sort_field, direction) for sort_field in sort_fields]
+                sort.append(("_id", direction))
+                explain = mongo.explain_find(
+                    "movies",
+                    filter_query,
+                    sort=sort,
+                    limit=PLAN_CHECK_LIMIT,
+                )
+                plan = explain["queryPlanner"]["winningPlan"]
+                stages = plan_stages(plan)
+                passed = field in bounded_fields(plan) and "COLLSCAN" not in stages
+                if not is_range or field == sort_fields[0]:
+                    passed = passed and "SORT" not in stages
+                results.append(
+                    {
+                        "filter": filter_name,
+                        "sort_by": sort_by,
+                        "direction": direction,
+                        "stages": sorted(stages),
+                        "passed": passed,
+                    }
+                )
+    return results
+
+
+@click.command("check-query-plans")
+def check_query_plans_command():
+    """Check that every dashboard filter and sort combination uses an index."""
+    results = check_query_plans(MongoConnect())
+    failed = [result for result in results if not result["passed"]]
+    for result in results:
+        click.echo(
+            f"{'ok  ' if result['passed'] else 'FAIL'} {result['filter']} "
+            f"sorted by {result['sort_by']} ({result['direction']}): "
+            f"{', '.join(result['stages'])}"
+        )
+    if failed:
+        logging.error(f"{len(failed)} dashboard queries do not use a suitable index")
+        raise SystemExit(1)
@@ -1,25 +1,35 @@
 import logging
+import os
 
 from app.auth.utils import token_required
-from flask import Blueprint, g, jsonify, request
+from app.movies.cache import page_cache
+from app.movies.counts import movie_counts
+from app.movies.dashboard import DashboardQuery
+from app.movies.export import (
+    EXPORT_BATCH_SIZE,
+    EXPORT_FORMATS,
+    csv_projection,
+    gzip_stream,
+    iter_csv,
+    iter_ndjson,
+)
+from app.movies.facets import FACET_LIMIT, read_facets
+from app.movies.filters import SORT_FIELDS, build_filter_query
+from app.movies.serializers import (
+    dumps,
+    movie_projection,
+    resolve_fields,
+    stream_movie_listing,
+)
+from app.movies.suggest import SUGGEST_LIMIT, SUGGEST_MAX_LIMIT, title_index
+from flask import Blueprint, Response, g, jsonify, request, stream_with_context
 from flask_cors import cross_origin
 
 movie_bp = Blueprint("movie", __name__)
 logging.basicConfig(level=logging.INFO)
 
-from bson import ObjectId
-
-
-# Helper function to convert ObjectId to string
-def convert_objectid(obj):
-    """Recursively converts ObjectId to string in dictionaries and lists."""
-    if isinstance(obj, ObjectId):
-        return str(obj)  # Convert ObjectId to string
-    elif isinstance(obj, dict):
-        return {key: convert_objectid(value) for key, value in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_objectid(item) for item in obj]
-    return obj
+# Pages larger than this are streamed instead of built in memory
+MOVIE_STREAM_THRESHOLD = int(os.getenv("MOVIE_STREAM_THRESHOLD", "500"))
 
 
 # Route for listing movies with pagination and sorting
@@ -31,83 +41,225 @@ def list_movies():
     List movies with pagination and sorting.
     Query parameters:
     - page (int): The page number for pagination (default is 1)
-    - per_page (int): The number of items per page (default is 20)
+    - per_page (int): The number of items per page (default is 20, at most 1000)
     - sort_by (str): The field by which to sort the movies (default is "date_added")
     - sort_order (str): The sorting order (default is "asc")
+    - view (str): "summary" for the columns of the dashboard table, or "full" (default)
+    - fields (str): Comma separated movie fields to return, instead of a view
+    - listed_in, country, cast (str): Movies having every given value, comma separated
+    - movie_type, rating (str): Movies having any of the given values, comma separated
+    - release_year_min, release_year_max (int): Inclusive release year range
+    - cursor (str): A "next" or "prev" token from a previous response's pagination
+      block. When given, the page is read with a range scan instead of skipping
+      documents, and "page" is ignored.
     """
     try:
-        # Fetch query parameters for pagination and sorting
-        page = int(request.args.get("page", 1))
-        per_page = int(request.args.get("per_page", 20))
-        sort_by = request.args.get(
-            "sort_by", "date_added"
-        )  # Default sorting by date_added
-        sort_order = request.args.get(
-            "sort_order", "asc"
-        )  # Default sorting order is ascending
-
-        # Log query parameters
-        logging.info(
-            f"Received parameters: page={page}, per_page={per_page}, sort_by={sort_by}, sort_order={sort_order}"
+        try:
+            dashboard = DashboardQuery(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        # Serve repeated page requests from the page cache
+        cached_body, generation = page_cache.get(dashboard.cache_key)
+        if cached_body is not None:
+            return Response(cached_body, status=200, mimetype="application/json")
+
+        # Get total count for pagination metadata
+        total_movies, count_exact = movie_counts.count(
+            g.mongo, query=dashboard.filter_query
+        )
+
+        # Log pagination metadata
+        logging.info(f"Total movies: {total_movies}")
+
+        # Fetch movies from MongoDB, _id is converted to a string by the server
+        documents = g.mongo.iter_documents(
+            "movies",
+            dashboard.query,
+            projection=dashboard.projection,
+            sort=dashboard.sort,
+            skip=dashboard.skip,
+            limit=dashboard.limit,
         )
 
-        # Map the sorting fields to their corresponding MongoDB fields
-        sort_fields = {
-            "date_added": "date_added",  # Sort by the date the movie was added
-            "release_date": "release_date",  # Sort by release date
-            "duration": "duration",  # Sort by movie duration (e.g., in minutes)
-        }
-
-        # Ensure sort_by is a valid field
-        if sort_by not in sort_fields:
-            sort_by = "date_added"
-            logging.warning(
-                f"Invalid 'sort_by' parameter received: {sort_by}. Defaulting to 'date_added'."
+        # Stream large pages straight from the cursor
+        if dashboard.per_page > MOVIE_STREAM_THRESHOLD and dashboard.forward:
+
+            def build_pagination(first, last, has_more):
+                return dashboard.pagination(
+                    total_movies, count_exact, first, last, has_more
+                )
+
+            return Response(
+                stream_with_context(
+                    stream_movie_listing(
+                        documents, dashboard.per_page, build_pagination
+                    )
+                ),
+                status=200,
+                mimetype="application/json",
             )
 
-        # Determine the sort direction (ascending or descending)
-        sort_direction = 1 if sort_order == "asc" else -1
-        sort_criteria = [(sort_fields.get(sort_by, "date_added"), sort_direction)]
+        body = dumps(dashboard.page_body(list(documents), total_movies, count_exact))
+        page_cache.set(dashboard.cache_key, body, generation)
+        return Response(body, status=200, mimetype="application/json")
 
-        # Log the sorting criteria
-        logging.info(f"Sorting criteria: {sort_criteria}")
+    except Exception as e:
+        logging.error(f"Error in list_movies: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
 
-        # Calculate the skip value for pagination
-        skip = (page - 1) * per_page
-        logging.info(f"Pagination: skip={skip}, limit={per_page}")
 
-        # Fetch movies from MongoDB with pagination and sorting
-        movies = g.mongo.find_documents(
-            "movies", query={}, sort=sort_criteria, skip=skip, limit=per_page
+# Route for exporting the whole catalog, or a sorted subset, as a download
+@movie_bp.route("/export", methods=["OPTIONS", "GET"])
+@cross_origin(origins=["http://localhost:3000", "http://127.0.0.1:3000"])
+@token_required
+def export_movies():
+    """
+    Stream movies straight from a batched cursor.
+    Query parameters:
+    - format (str): "ndjson" (default) or "csv", in the same columns as the upload
+    - sort_by (str): "date_added", "release_date" or "duration", unsorted if not given
+    - sort_order (str): The sorting order (default is "asc")
+    - view, fields (str): Fields of each NDJSON line, as for the dashboard
+    - listed_in, country, cast, movie_type, rating, release_year_min,
+      release_year_max: Filters, as for the dashboard
+    - gzip (str): "1" or "true" to compress the download
+    """
+    export_format = request.args.get("format", "ndjson")
+    if export_format not in EXPORT_FORMATS:
+        return (
+            jsonify({"error": f"format must be one of {', '.join(EXPORT_FORMATS)}"}),
+            400,
         )
 
-        # Log number of movies fetched
-        logging.info(f"Fetched {len(movies)} movies")
+    try:
+        filter_query = build_filter_query(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        # Get total count for pagination metadata
-        total_movies = g.mongo.count_documents("movies", query={})
-        total_pages = (total_movies // per_page) + (1 if total_movies % per_page else 0)
+    sort_by = request.args.get("sort_by")
+    if sort_by is not None and sort_by not in SORT_FIELDS:
+        return jsonify({"error": f"Invalid sort_by: {sort_by}"}), 400
+    sort_direction = 1 if request.args.get("sort_order", "asc") == "asc" else -1
+    sort_criteria = None
+    if sort_by:
+        sort_criteria = [(field, sort_direction) for field in SORT_FIELDS[sort_by]]
+        sort_criteria.append(("_id", sort_direction))
 
-        # Log pagination metadata
-        logging.info(f"Total movies: {total_movies}, Total pages: {total_pages}")
+    if export_format == "csv":
+        projection = csv_projection()
+        encode, mimetype = iter_csv, "text/csv"
+    else:
+        try:
+            fields = resolve_fields(
+                request.args.get("view"), request.args.get("fields")
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        projection = movie_projection(fields)
+        encode, mimetype = iter_ndjson, "application/x-ndjson"
 
-        # Convert ObjectId to string for all movies
-        serialized_movies = [convert_objectid(movie) for movie in movies]
+    documents = g.mongo.iter_documents(
+        "movies",
+        filter_query,
+        projection=projection,
+        sort=sort_criteria,
+        batch_size=EXPORT_BATCH_SIZE,
+    )
+    body = encode(documents)
+    file_name = f"movies.{export_format}"
+    if request.args.get("gzip", "").lower() in ("1", "true"):
+        body = gzip_stream(body)
+        mimetype = "application/gzip"
+        file_name += ".gz"
 
-        return (
-            jsonify(
-                {
-                    "movies": serialized_movies,
-                    "pagination": {
-                        "current_page": page,
-                        "total_pages": total_pages,
-                        "total_movies": total_movies,
-                    },
-                }
-            ),
-            200,
-        )
+    logging.info(f"Exporting movies as {file_name}")
+    return Response(
+        stream_with_context(body),
+        status=200,
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="{file_name}"'},
+    )
 
-    except Exception as e:
-        logging.error(f"Error in list_movies: {str(e)}")
-        return jsonify({"error": "Internal server error"}), 500
+
+# Route for the facet counts shown in the dashboard sidebars
+@movie_bp.route("/facets", methods=["OPTIONS", "GET"])
+@cross_origin(origins=["http://localhost:3000", "http://127.0.0.1:3000"])
+@token_required
+def movie_facets():
+    """
+    Movie counts by genre, country, rating, type and release year.
+    Query parameters:
+    - limit (int): The number of values per facet, largest counts first (default 50)
+    """
+    try:
+        limit = int(request.args.get("limit", FACET_LIMIT))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+
+    cache_key = f"facets|{limit}"
+    cached_body, generation = page_cache.get(cache_key)
+    if cached_body is not None:
+        return Response(cached_body, status=200, mimetype="application/json")
+
+    body = dumps({"facets": read_facets(g.mongo, max(limit, 1))})
+    page_cache.set(cache_key, body, generation)
+    return Response(body, status=200, mimetype="application/json")
+
+
+# Route for title autocomplete
+@movie_bp.route("/suggest", methods=["OPTIONS", "GET"])
+@cross_origin(origins=["http://localhost:3000", "http://127.0.0.1:3000"])
+@token_required
+def suggest_titles():
+    """
+    Suggest titles as the user types, ignoring case and accents.
+    Query parameters:
+    - q (str): The text typed so far, matched against the start of any word of a title
+    - limit (int): The number of suggestions (default is 10, at most 50)
+    """
+    try:
+        limit = int(request.args.get("limit", SUGGEST_LIMIT))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    limit = min(max(limit, 1), SUGGEST_MAX_LIMIT)
+
+    title_index.ensure_loaded(g.mongo)
+    suggestions = title_index.suggest(request.args.get("q", ""), limit)
+    return Response(
+        dumps({"suggestions": suggestions}), status=200, mimetype="application/json"
+    )
+
+
+# Route for a single movie with every field, under a prefix no static route shares
+@movie_bp.route("/by_id/<show_id>", methods=["OPTIONS", "GET"])
+@cross_origin(origins=["http://localhost:3000", "http://127.0.0.1:3000"])
+@token_required
+def get_movie(show_id):
+    """
+    Get one movie by its show_id.
+    Query parameters:
+    - view (str): "summary" or "full" (default)
+    - fields (str): Comma separated movie fields to return, instead of a view
+    """
+    try:
+        fields = resolve_fields(request.args.get("view"), request.args.get("fields"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    movie = g.mongo.find_document(
+        "movies", {"show_id": show_id}, projection=movie_projection(fields)
+    )
+    if not movie:
+        return jsonify({"error": "Movie not found"}), 404
+
+    return Response(dumps(movie), status=200, mimetype="application/json")
+
+
+@movie_bp.route("/cache_stats", methods=["GET"])
+@token_required
+def cache_stats():
+    """
+    Report hit and miss counters of the dashboard page cache.
+    """
+    return jsonify(page_cache.stats()), 200
@@ -0,0 +1,171 @@
+from datetime import date
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+import orjson
+from app.models import Movie
+from bson import Decimal128, ObjectId
+from werkzeug.http import http_date
+
+# Every field stored for a movie, in model order
+MOVIE_FIELDS: List[str] = list(Movie.model_fields)
+
+# Named field sets for movie listings
+MOVIE_VIEWS: Dict[str, List[str]] = {
+    "summary": [
+        "show_id",
+        "title",
+        "movie_type",
+        "listed_in",
+        "rating",
+        "date_added",
+        "release_year",
+        "release_date",
+        "duration",
+    ],
+    "full": MOVIE_FIELDS,
+}
+
+# Same options as Flask's jsonify: sorted keys and HTTP dates
+JSON_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+STREAM_CHUNK_SIZE = 100  # Documents encoded per chunk of a streamed response
+
+
+@lru_cache(maxsize=4096)
+def _http_date(value: date) -> str:
+    """
+    Summary: Format a date like Flask's JSON provider, memoized as dates repeat a lot.
+    """
+    return http_date(value)
+
+
+def _default(value: Any) -> Any:
+    """
+    Summary: Encode the BSON types orjson does not handle itself.
+    """
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, date):
+        return _http_date(value)
+    if isinstance(value, Decimal128):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(value: Any) -> bytes:
+    """
+    Summary: Encode a value, including Mongo documents, to JSON bytes.
+
+    Args:
+        value (Any): value to encode.
+    Return:
+        bytes: UTF-8 JSON equivalent to what jsonify would produce, with
+               non-ASCII text left unescaped rather than as \\u escapes.
+    """
+    return orjson.dumps(value, default=_default, option=JSON_OPTIONS)
+
+
+def movie_projection(fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Summary: Projection that returns movie fields with _id already as a string.
+
+    The conversion runs on the server, so documents need no walk in Python
+    before encoding.
+
+    Args:
+        fields (Iterable[str], optional): fields to include. Defaults to all movie fields.
+    Return:
+        Dict[str, Any]: a find projection.
+    """
+    projection: Dict[str, Any] = {"_id": {"$toString": "$_id"}}
+    for field in fields if fields is not None else MOVIE_FIELDS:
+        projection[field] = 1
+    return projection
+
+
+def resolve_fields(view: Optional[str], fields: Optional[str]) -> List[str]:
+    """
+    Summary: Work out which movie fields a listing request asked for.
+
+    Args:
+        view (str, optional): name of a view in MOVIE_VIEWS.
+        fields (str, optional): comma separated field names, takes precedence over view.
+    Return:
+        List[str]: the movie fields to return.
+    Raises:
+        ValueError: if the view or a field is unknown.
+    """
+    if fields:
+        requested = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in requested if field not in MOVIE_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        return requested
+
+    view = view or "full"
+    if view not in MOVIE_VIEWS:
+        raise ValueError(f"view must be one of {', '.join(MOVIE_VIEWS)}")
+    return MOVIE_VIEWS[view]
+
+
+def iter_json_array(documents: Iterable[Any]) -> Iterator[bytes]:
+    """
+    Summary: Encode documents as the items of a JSON array, a chunk at a time.
+
+    Yields the items separated by commas but without the surrounding
+    brackets, so callers can embed the array in a larger document.
+
+    Args:
+        documents (Iterable[Any]): documents to encode.
+    Return:
+        Iterator[bytes]: encoded chunks.
+    """
+    chunk: List[bytes] = []
+    first = True
+    for document in documents:
+        chunk.append(dumps(document))
+        if len(chunk) >= STREAM_CHUNK_SIZE:
+            yield (b"" if first else b",") + b",".join(chunk)
+            chunk.clear()
+            first = False
+    if chunk:
+        yield (b"" if first else b",") + b",".join(chunk)
+
+
+def stream_movie_listing(
+    documents: Iterable[Dict[str, Any]],
+    limit: int,
+    build_pagination: Callable[[Optional[dict], Optional[dict], bool], Dict[str, Any]],
+) -> Iterator[bytes]:
+    """
+    Summary: Stream a {"movies": [...], "pagination": {...}} response body.
+
+    Movies are encoded as they come off the cursor. The pagination block is
+    built last, from the first and last movie sent and whether the cursor had
+    more than limit documents.
+
+    Args:
+        documents (Iterable[Dict[str, Any]]): cursor fetching up to limit + 1 movies.
+        limit (int): number of movies to send.
+        build_pagination (Callable): builds the pagination block from
+                                     (first, last, has_more).
+    Return:
+        Iterator[bytes]: chunks of the response body.
+    """
+    state: Dict[str, Any] = {"first": None, "last": None, "has_more": False}
+
+    def page() -> Iterator[Dict[str, Any]]:
+        for count, document in enumerate(documents):
+            if count == limit:
+                state["has_more"] = True
+                return
+            if state["first"] is None:
+                state["first"] = document
+            state["last"] = document
+            yield document
+
+    yield b'{"movies":['
+    yield from iter_json_array(page())
+    pagination = build_pagination(state["first"], state["last"], state["has_more"])
+    yield b'],"pagination":' + dumps(pagination) + b"}"
@@ -0,0 +1,303 @@
+import bisect
+import heapq
+import logging
+import os
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from app.mongo import MongoConnect
+
+SUGGEST_MAX_TITLES = int(os.getenv("SUGGEST_MAX_TITLES", "500000"))
+SUGGEST_LIMIT = int(os.getenv("SUGGEST_LIMIT", "10"))  # Default suggestions returned
+SUGGEST_MAX_LIMIT = 50
+# Seconds before the index is rebuilt, picking up writes made by other processes
+SUGGEST_REFRESH_INTERVAL = float(os.getenv("SUGGEST_REFRESH_INTERVAL", "600"))
+
+
+def fold(text: str) -> str:
+    """
+    Summary: Normalise text for matching: no accents, case folded, single spaces.
+
+    Args:
+        text (str): text to fold.
+    Return:
+        str: the folded text, e.g. "Amélie " becomes "amelie".
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.casefold().split())
+
+
+def title_keys(title: str) -> List[str]:
+    """
+    Summary: Keys a title is found under, one starting at each of its words.
+
+    "The Irishman" is found both by "the i..." and by "irish...".
+
+    Args:
+        title (str): the title.
+    Return:
+        List[str]: folded keys, without duplicates.
+    """
+    words = fold(title).split(" ")
+    keys = []
+    for start in range(len(words)):
+        key = " ".join(words[start:])
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+
+class IndexState(NamedTuple):
+    """
+    Summary: What a lookup reads, swapped as a whole so it is always consistent.
+    """
+
+    keys: List[Tuple[str, str]]  # Base list of (folded key, show_id)
+    runs: List[List[Tuple[str, str]]]  # Sorted runs of ingested keys
+    titles: Dict[str, str]  # Title by show_id
+    renamed: Set[str]  # show_ids whose title changed since the last compact
+
+
+class TitleIndex:
+    """
+    Summary: In-process prefix index over movie titles for autocomplete.
+
+    Keys are kept in sorted lists of (folded key, show_id) tuples, so a prefix
+    lookup is a binary search followed by a short scan. Loaded titles form
+    the base list. Ingested batches go to smaller sorted runs, and runs of
+    similar size are merged, so a batch costs about its own size rather than
+    the size of the index. compact() folds the runs into the base list once an
+    upload is done. Lists are swapped in a single IndexState, never changed,
+    so lookups never wait on ingestion.
+    """
+
+    def __init__(
+        self,
+        max_titles: int = SUGGEST_MAX_TITLES,
+        refresh_interval: float = SUGGEST_REFRESH_INTERVAL,
+    ):
+        """
+        Summary: Initialise an empty index, loaded on first use.
+
+        Args:
+            max_titles (int): titles kept at most, later ones are not indexed.
+            refresh_interval (float): seconds before a full rebuild from the database.
+        """
+        self._max_titles = max_titles
+        self._refresh_interval = refresh_interval
+        self._state = IndexState([], [], {}, set())
+        self._loaded_at: Optional[float] = None
+        # Batches recorded while a load reads the collection, replayed after it
+        self._pending: Optional[List[List[Tuple[str, str]]]] = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._refreshing = False
+
+    @property
+    def loaded(self) -> bool:
+        """
+        Summary: Whether the index has been built, lookups need no database access once it is.
+        """
+        return self._loaded_at is not None
+
+    def load(self, mongo: MongoConnect):
+        """
+        Summary: Build the index from the movies collection.
+
+        Batches recorded while the collection is read are applied again on
+        top of the new index, so none of them is lost.
+
+        Args:
+            mongo (MongoConnect): handle to the database.
+        """
+        with self._lock:
+            self._pending = []
+        try:
+            titles: Dict[str, str] = {}
+            for movie in mongo.iter_documents(
+                "movies", {}, {"_id": 0, "show_id": 1, "title": 1}, batch_size=5000
+            ):
+                if len(titles) >= self._max_titles:
+                    logging.warning(
+                        f"Title index is full, only {self._max_titles} titles are suggested"
+                    )
+                    break
+                if movie.get("title"):
+                    titles[movie["show_id"]] = movie["title"]
+
+            keys = sorted(
+                (key, show_id)
+                for show_id, title in titles.items()
+                for key in title_keys(title)
+            )
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+
+        with self._lock:
+            pending, self._pending = self._pending, None
+            self._state = IndexState(keys, [], titles, set())
+            self._loaded_at = time.monotonic()
+            for batch in pending:
+                self._apply(batch)
+        logging.info(f"Loaded {len(titles)} titles into the suggest index")
+
+    def ensure_loaded(self, mongo: MongoConnect):
+        """
+        Summary: Load the index on first use, and refresh it in the background when stale.
+
+        Args:
+            mongo (MongoConnect): handle used for the first load.
+        """
+        if self._loaded_at is None:
+            with self._load_lock:
+                if self._loaded_at is None:
+                    self.load(mongo)
+            return
+
+        if time.monotonic() - self._loaded_at < self._refresh_interval:
+            return
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def refresh():
+            try:
+                with self._load_lock:
+                    self.load(MongoConnect())
+            except Exception as e:
+                logging.error(f"Suggest index refresh failed: {e}")
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=refresh, name="suggest-refresh", daemon=True).start()
+
+    def record_batch(self, movies: Iterable[Dict[str, Any]]):
+        """
+        Summary: Add or update the titles of a committed batch of movies.
+
+        Does nothing until a load has started, the load picks them up.
+
+        Args:
+            movies (Iterable[Dict[str, Any]]): movie documents written by the batch.
+        """
+        if self._loaded_at is None and self._pending is None:
+            return
+        batch = [
+            (movie.get("show_id"), movie.get("title"))
+            for movie in movies
+            if movie.get("title")
+        ]
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(batch)
+            if self._loaded_at is not None:
+                self._apply(batch)
+
+    def _apply(self, batch: List[Tuple[str, str]]):
+        """
+        Summary: Index a batch of (show_id, title) pairs, called with the lock held.
+
+        Keys of a title that changed stay in their list and are skipped by
+        lookups until the next compact().
+        """
+        state = self._state
+        titles, added = state.titles, []
+        for show_id, title in batch:
+            current = titles.get(show_id)
+            if current == title:
+                continue
+            if current is None and len(titles) >= self._max_titles:
+                continue
+            if current is not None:
+                state.renamed.add(show_id)
+            titles[show_id] = title
+            added.extend((key, show_id) for key in title_keys(title))
+        if not added:
+            return
+
+        # Merge runs while the newest is at least as long as the one before it
+        runs, run = list(state.runs), sorted(added)
+        while runs and len(runs[-1]) <= len(run):
+            run = list(heapq.merge(runs.pop(), run))
+        runs.append(run)
+        self._state = state._replace(runs=runs)
+
+    def compact(self):
+        """
+        Summary: Fold the ingested runs into the base list and drop outdated keys.
+
+        Costs a pass over the whole index, so it is run once an upload is done
+        rather than per batch. The merge runs outside the lock, and is dropped
+        if more batches were recorded meanwhile.
+        """
+        with self._lock:
+            state = self._state
+        keys, runs, titles, renamed = state
+        if not runs:
+            return
+        merged: List[Tuple[str, str]] = []
+        for entry in heapq.merge(keys, *runs):
+            if (not merged or merged[-1] != entry) and self._current(
+                titles, renamed, entry
+            ):
+                merged.append(entry)
+        with self._lock:
+            if self._state is state:
+                self._state = IndexState(merged, [], titles, set())
+
+    @staticmethod
+    def _current(
+        titles: Dict[str, str], renamed: Set[str], entry: Tuple[str, str]
+    ) -> bool:
+        """
+        Summary: Whether a key still belongs to the current title of its movie.
+        """
+        key, show_id = entry
+        if show_id not in renamed:
+            return True
+        title = titles.get(show_id)
+        return title is not None and fold(title).endswith(key)
+
+    def suggest(self, query: str, limit: int = SUGGEST_LIMIT) -> List[Dict[str, str]]:
+        """
+        Summary: Titles with a word starting with the query, in alphabetical order.
+
+        Args:
+            query (str): what the user typed so far.
+            limit (int, optional): number of suggestions.
+        Return:
+            List[Dict[str, str]]: {"show_id", "title"} entries.
+        """
+        prefix = fold(query)
+        if not prefix:
+            return []
+        keys, runs, titles, renamed = self._state
+        start = (prefix, "")
+
+        def matches(entries: List[Tuple[str, str]]) -> Iterator[Tuple[str, str]]:
+            for index in range(bisect.bisect_left(entries, start), len(entries)):
+                if not entries[index][0].startswith(prefix):
+                    return
+                yield entries[index]
+
+        suggestions, seen = [], set()
+        for entry in heapq.merge(matches(keys), *map(matches, runs)):
+            if len(suggestions) >= limit:
+                break
+            show_id = entry[1]
+            title = titles.get(show_id)
+            if title is None or show_id in seen:
+                continue
+            if self._current(titles, renamed, entry):
+                seen.add(show_id)
+                suggestions.append({"show_id": show_id, "title": title})
+        return suggestions
+
+
+title_index = TitleIndex()
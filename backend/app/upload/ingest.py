@@ -0,0 +1,669 @@
+import bz2
+import csv
+import gzip
+import io
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import BinaryIO, Deque, Dict, Iterator, List, Optional, Set
+
+from app.metrics import INGEST_BYTES_READ, INGEST_ROWS_PARSED, record_ingest_batch
+from app.models import Movie
+from app.mongo import MongoConnect, is_blank
+from app.movies.counts import movie_counts
+from app.movies.facets import previous_facet_values, record_facets
+from app.movies.suggest import title_index
+from app.upload.progress import publish_progress
+from pymongo.errors import BulkWriteError
+
+try:
+    import zstandard
+except ImportError:  # Optional, .csv.zst uploads are rejected without it
+    zstandard = None
+
+BATCH_SIZE = 1000  # Number of movies inserted per insert_many call
+READ_CHUNK_SIZE = 64 * 1024  # Bytes pulled from the upload stream per read
+
+# Parallel ingestion settings
+INGEST_PARALLELISM = int(os.getenv("INGEST_PARALLELISM", str(os.cpu_count() or 1)))
+INGEST_PARALLEL_MIN_BYTES = int(
+    os.getenv("INGEST_PARALLEL_MIN_BYTES", str(64 * 1024 * 1024))
+)
+INGEST_CHUNK_BYTES = int(os.getenv("INGEST_CHUNK_BYTES", str(4 * 1024 * 1024)))
+INGEST_INSERT_THREADS = int(os.getenv("INGEST_INSERT_THREADS", "4"))
+INGEST_MP_START_METHOD = os.getenv("INGEST_MP_START_METHOD", "spawn")
+
+INGEST_MODES = ("auto", "serial", "parallel")
+
+# How uploaded movies are written, see write_movies
+WRITE_MODES = ("insert", "replace", "merge")
+INGEST_WRITE_MODE = os.getenv("INGEST_WRITE_MODE", "replace")
+DUPLICATE_KEY_ERROR = 11000
+
+# Accepted upload file names and the compression they imply
+UPLOAD_SUFFIXES = {
+    ".csv": None,
+    ".csv.gz": "gzip",
+    ".csv.bz2": "bz2",
+    ".csv.zst": "zstd",
+}
+# Cap on the size of a decompressed upload, guards against decompression bombs
+INGEST_MAX_DECOMPRESSED_BYTES = int(
+    os.getenv("INGEST_MAX_DECOMPRESSED_BYTES", str(16 * 1024 * 1024 * 1024))
+)
+
+
+class DecompressedSizeExceeded(ValueError):
+    """
+    Summary: Raised when a compressed upload expands past INGEST_MAX_DECOMPRESSED_BYTES.
+    """
+
+
+class ByteCountingStream(io.RawIOBase):
+    """
+    Summary: Read-only raw stream that counts the bytes pulled through it.
+    """
+
+    def __init__(self, raw: BinaryIO):
+        """
+        Summary: Wrap a binary stream.
+
+        Args:
+            raw (BinaryIO): stream to read from.
+        """
+        self._raw = raw
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._raw.read(len(buffer))
+        if not data:
+            return 0
+        size = len(data)
+        buffer[:size] = data
+        self.bytes_read += size
+        INGEST_BYTES_READ.inc(size)
+        return size
+
+
+class SizeLimitedStream(io.RawIOBase):
+    """
+    Summary: Read-only raw stream that fails once more than a maximum is read.
+    """
+
+    def __init__(self, raw: BinaryIO, max_bytes: int):
+        """
+        Summary: Wrap a binary stream.
+
+        Args:
+            raw (BinaryIO): stream to read from.
+            max_bytes (int): bytes allowed through.
+        """
+        self._raw = raw
+        self._max_bytes = max_bytes
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._raw.read(len(buffer))
+        if not data:
+            return 0
+        size = len(data)
+        self.bytes_read += size
+        if self.bytes_read > self._max_bytes:
+            raise DecompressedSizeExceeded(
+                f"Upload expands to more than {self._max_bytes} bytes"
+            )
+        buffer[:size] = data
+        return size
+
+
+def compression_for_file(file_name: str) -> Optional[str]:
+    """
+    Summary: Get the compression of an upload from its file name.
+
+    Args:
+        file_name (str): name of the uploaded file.
+    Return:
+        Optional[str]: "gzip", "bz2", "zstd", or None for a plain CSV.
+    Raises:
+        ValueError: if the file is not a CSV or a supported compressed CSV, or
+                    its decompression library is not installed.
+    """
+    name = file_name.lower()
+    # Longest suffix first, so ".csv.gz" is not taken for ".gz" alone
+    for suffix in sorted(UPLOAD_SUFFIXES, key=len, reverse=True):
+        if name.endswith(suffix):
+            compression = UPLOAD_SUFFIXES[suffix]
+            # Rejected up front, rather than failing once the job runs
+            if compression == "zstd" and zstandard is None:
+                raise ValueError("zstandard is required for .csv.zst uploads")
+            return compression
+    raise ValueError(
+        f"Invalid file format. Please upload a {', '.join(UPLOAD_SUFFIXES)} file."
+    )
+
+
+def open_decompressed(
+    stream: BinaryIO,
+    compression: Optional[str],
+    max_bytes: int = INGEST_MAX_DECOMPRESSED_BYTES,
+) -> BinaryIO:
+    """
+    Summary: Decompress an upload incrementally as it is read.
+
+    Args:
+        stream (BinaryIO): compressed byte stream.
+        compression (str, optional): "gzip", "bz2", "zstd", or None to read as is.
+        max_bytes (int, optional): largest decompressed size allowed.
+    Return:
+        BinaryIO: the decompressed byte stream.
+    Raises:
+        ValueError: if the compression is unknown or its library is not installed.
+    """
+    if compression is None:
+        return stream
+    if compression == "gzip":
+        decompressed = gzip.GzipFile(fileobj=stream, mode="rb")
+    elif compression == "bz2":
+        decompressed = bz2.BZ2File(stream, mode="rb")
+    elif compression == "zstd":
+        if zstandard is None:
+            raise ValueError("zstandard is required for .csv.zst uploads")
+        decompressed = zstandard.ZstdDecompressor().stream_reader(
+            stream, read_across_frames=True
+        )
+    else:
+        raise ValueError(f"Unsupported compression: {compression}")
+    return SizeLimitedStream(decompressed, max_bytes)
+
+
+class RateMeter:
+    """
+    Summary: Track the ingestion rate of an upload.
+    """
+
+    def __init__(self):
+        self._started = time.monotonic()
+
+    def rows_per_second(self, rows: int) -> float:
+        """
+        Summary: Average rows per second since the meter was created.
+
+        Args:
+            rows (int): rows processed so far.
+        Return:
+            float: rows per second, rounded to one decimal.
+        """
+        elapsed = time.monotonic() - self._started
+        return round(rows / elapsed, 1) if elapsed > 0 else 0.0
+
+
+def iter_csv_rows(stream: BinaryIO) -> Iterator[dict]:
+    """
+    Summary: Decode a CSV byte stream incrementally and yield its rows.
+
+    Args:
+        stream (BinaryIO): raw stream over the upload, decompressed if needed.
+    Return:
+        Iterator[dict]: one dictionary per CSV record.
+    """
+    buffered = io.BufferedReader(stream, buffer_size=READ_CHUNK_SIZE)
+    text = io.TextIOWrapper(buffered, encoding="utf-8", newline="")
+    return csv.DictReader(text)
+
+
+def iter_record_chunks(stream: BinaryIO, chunk_bytes: int) -> Iterator[bytes]:
+    """
+    Summary: Split a CSV byte stream into chunks that end on record boundaries.
+
+    A newline only ends a record when it is outside a quoted field, which is
+    the case when the chunk so far contains an even number of quote characters.
+
+    Args:
+        stream (BinaryIO): CSV byte stream, positioned at the start of a record.
+        chunk_bytes (int): approximate size of each chunk.
+    Return:
+        Iterator[bytes]: chunks of whole CSV records.
+    """
+    carry = b""
+    while True:
+        block = stream.read(chunk_bytes)
+        if not block:
+            break
+        buffer = carry + block
+        quotes = buffer.count(b'"')
+        cut = buffer.rfind(b"\n")
+        while cut != -1 and (quotes - buffer.count(b'"', cut)) % 2:
+            cut = buffer.rfind(b"\n", 0, cut)
+
+        if cut == -1:
+            carry = buffer
+            continue
+        yield buffer[: cut + 1]
+        carry = buffer[cut + 1 :]
+
+    if carry.strip():
+        yield carry
+
+
+def read_header(stream: BinaryIO) -> List[str]:
+    """
+    Summary: Read the CSV header line from a byte stream.
+
+    Args:
+        stream (BinaryIO): CSV byte stream positioned at the start of the file.
+    Return:
+        List[str]: the column names.
+    """
+    line = stream.readline()
+    return next(csv.reader([line.decode("utf-8")]), [])
+
+
+def parse_chunk(fieldnames: List[str], chunk: bytes) -> List[dict]:
+    """
+    Summary: Parse and validate a chunk of CSV records into movie documents.
+
+    Runs inside the ingestion process pool, so it must stay importable at
+    module level.
+
+    Args:
+        fieldnames (List[str]): CSV column names.
+        chunk (bytes): whole CSV records without the header.
+    Return:
+        List[dict]: movie documents ready for insertion.
+    """
+    reader = csv.DictReader(
+        io.StringIO(chunk.decode("utf-8"), newline=""), fieldnames=fieldnames
+    )
+    return Movie.from_csv_batch(list(reader))
+
+
+def estimate_progress(bytes_read: int, total_bytes: Optional[int]) -> float:
+    """
+    Summary: Estimate progress from the bytes consumed so far.
+
+    Args:
+        bytes_read (int): bytes consumed from the upload.
+        total_bytes (int, optional): expected size, e.g. the Content-Length.
+    Return:
+        float: progress percentage, kept below 100 until the upload completes.
+    """
+    if not total_bytes:
+        return 0
+    return min(bytes_read / total_bytes * 100, 99.0)
+
+
+def choose_mode(mode: str, total_bytes: Optional[int]) -> str:
+    """
+    Summary: Resolve the "auto" ingestion mode from the upload size.
+
+    Args:
+        mode (str): requested mode, one of INGEST_MODES.
+        total_bytes (int, optional): size of the upload.
+    Return:
+        str: "serial" or "parallel".
+    """
+    if mode in ("serial", "parallel"):
+        return mode
+    if total_bytes and total_bytes >= INGEST_PARALLEL_MIN_BYTES:
+        return "parallel"
+    return "serial"
+
+
+class IngestStats:
+    """
+    Summary: Running totals of an ingestion, as reported in upload_status.
+    """
+
+    def __init__(self):
+        self.uploaded_rows = 0
+        self.inserted_rows = 0
+        self.updated_rows = 0
+        self.unchanged_rows = 0
+        self._meter = RateMeter()
+
+    def add(self, counts: Dict[str, int]):
+        """
+        Summary: Add the outcome of one written batch.
+
+        Args:
+            counts (Dict[str, int]): "inserted", "updated" and "unchanged" counts.
+        """
+        self.inserted_rows += counts["inserted"]
+        self.updated_rows += counts["updated"]
+        self.unchanged_rows += counts["unchanged"]
+        self.uploaded_rows += sum(counts.values())
+
+    def to_dict(self) -> dict:
+        """
+        Summary: Status fields describing the ingestion so far.
+        """
+        return {
+            "uploaded_rows": self.uploaded_rows,
+            "inserted_rows": self.inserted_rows,
+            "updated_rows": self.updated_rows,
+            "unchanged_rows": self.unchanged_rows,
+            "rows_per_second": self._meter.rows_per_second(self.uploaded_rows),
+        }
+
+
+class ShowIdLocks:
+    """
+    Summary: Let upsert batches run concurrently unless they share show_ids.
+
+    A batch reads the stored facet values of its movies, upserts them and
+    then moves their facet counts. Two batches updating the same movie at
+    once would both move the counts off the same old values, so a batch
+    waits until no batch in flight holds one of its show_ids.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._held: Set[str] = set()
+
+    @contextmanager
+    def hold(self, show_ids: Set[str]):
+        """
+        Summary: Hold a set of show_ids for the duration of the block.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._held.isdisjoint(show_ids))
+            self._held.update(show_ids)
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._held.difference_update(show_ids)
+                self._condition.notify_all()
+
+
+_upsert_locks = ShowIdLocks()
+
+
+def collapse_by_show_id(movies: List[dict], merge: bool) -> List[dict]:
+    """
+    Summary: Keep one document per show_id, as the upserts of a batch leave one movie.
+
+    Args:
+        movies (List[dict]): movie documents, in upload order.
+        merge (bool): fold the non-blank fields of later rows over earlier ones,
+                      otherwise the last row wins.
+    Return:
+        List[dict]: the documents, one per show_id.
+    """
+    latest: Dict[str, dict] = {}
+    for movie in movies:
+        earlier = latest.get(movie["show_id"])
+        if merge and earlier is not None:
+            movie = {**earlier, **{f: v for f, v in movie.items() if not is_blank(v)}}
+        latest[movie["show_id"]] = movie
+    return list(latest.values())
+
+
+def write_movies(
+    mongo: MongoConnect, movies: List[dict], write_mode: str
+) -> Dict[str, int]:
+    """
+    Summary: Write a batch of movie documents with the requested write mode.
+
+    "insert" only adds documents, skipping show_ids that already exist once the
+    unique index is in place. "replace" and "merge" upsert on show_id, replacing
+    the stored document or updating only the fields that are not blank in the
+    upload. Rows superseded by a later row with the same show_id in the batch
+    count as unchanged.
+
+    Args:
+        mongo (MongoConnect): handle used for the writes.
+        movies (List[dict]): movie documents to write.
+        write_mode (str): one of WRITE_MODES.
+    Return:
+        Dict[str, int]: "inserted", "updated" and "unchanged" counts.
+    """
+    started = time.perf_counter()
+    written, previous = movies, {}
+    merge = write_mode == "merge"
+    if write_mode != "insert":
+        written = collapse_by_show_id(movies, merge)
+        with _upsert_locks.hold({movie["show_id"] for movie in written}):
+            # Facet counts of replaced movies are moved off their old values
+            previous = previous_facet_values(mongo, written)
+            counts = mongo.bulk_upsert_documents(
+                "movies", written, key="show_id", merge=merge
+            )
+            record_facets(mongo, previous, written, merge=merge)
+        counts["unchanged"] += len(movies) - len(written)
+        movie_counts.record_batch(written, counts)
+    else:
+        try:
+            inserted = len(mongo.insert_many_documents("movies", movies, ordered=False))
+            counts = {"inserted": inserted, "updated": 0, "unchanged": 0}
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(error.get("code") != DUPLICATE_KEY_ERROR for error in errors):
+                raise
+            counts = {
+                "inserted": e.details.get("nInserted", 0),
+                "updated": 0,
+                "unchanged": len(errors),
+            }
+            skipped = {error.get("index") for error in errors}
+            written = [movie for i, movie in enumerate(movies) if i not in skipped]
+        record_facets(mongo, previous, written)
+        movie_counts.record_batch(movies, counts)
+
+    # Keep the title index in step with the batch, counts and facets are updated above
+    title_index.record_batch(written)
+    record_ingest_batch(counts, time.perf_counter() - started)
+    return counts
+
+
+def ensure_show_id_index(mongo: MongoConnect):
+    """
+    Summary: Make sure the unique show_id index used by upserts exists.
+
+    Args:
+        mongo (MongoConnect): handle used to create the index.
+    """
+    try:
+        mongo.create_index("movies", [("show_id", 1)], unique=True)
+    except Exception as e:
+        # Usually duplicates left by earlier uploads, upserts still work without it
+        logging.warning(f"Could not create unique show_id index: {e}")
+
+
+def _report_progress(
+    mongo: MongoConnect,
+    task_id: str,
+    stream: ByteCountingStream,
+    total_bytes: Optional[int],
+    stats: IngestStats,
+):
+    """
+    Summary: Publish the current progress of an upload, persisted at a fixed interval.
+    """
+    publish_progress(
+        mongo,
+        task_id,
+        {
+            "progress": estimate_progress(stream.bytes_read, total_bytes),
+            **stats.to_dict(),
+        },
+    )
+
+
+def _report_completed(mongo: MongoConnect, task_id: str, stats: IngestStats):
+    """
+    Summary: Mark an upload as completed in upload_status.
+    """
+    publish_progress(
+        mongo,
+        task_id,
+        {
+            "status": "completed",
+            "progress": 100,
+            "total_rows": stats.uploaded_rows,
+            **stats.to_dict(),
+        },
+    )
+    logging.info(
+        f"Upload {task_id} completed with {stats.uploaded_rows} rows "
+        f"({stats.inserted_rows} inserted, {stats.updated_rows} updated, "
+        f"{stats.unchanged_rows} unchanged)"
+    )
+
+
+def ingest_csv(
+    mongo: MongoConnect,
+    task_id: str,
+    raw_stream: BinaryIO,
+    total_bytes: Optional[int] = None,
+    mode: str = "auto",
+    parallelism: Optional[int] = None,
+    write_mode: str = INGEST_WRITE_MODE,
+    compression: Optional[str] = None,
+) -> int:
+    """
+    Summary: Stream a movies CSV into the movies collection in one pass.
+
+    Args:
+        mongo (MongoConnect): handle used for inserts and status updates.
+        task_id (str): upload_status task to report progress into.
+        raw_stream (BinaryIO): binary stream of the CSV upload.
+        total_bytes (int, optional): expected stream size used for progress.
+        mode (str, optional): "serial", "parallel" or "auto". Defaults to "auto".
+        parallelism (int, optional): parser processes for the parallel mode.
+        write_mode (str, optional): one of WRITE_MODES. Defaults to INGEST_WRITE_MODE.
+        compression (str, optional): compression of the upload, see open_decompressed.
+    Return:
+        int: number of rows uploaded.
+    """
+    ensure_show_id_index(mongo)
+
+    if choose_mode(mode, total_bytes) == "parallel":
+        return ingest_csv_parallel(
+            mongo,
+            task_id,
+            raw_stream,
+            total_bytes,
+            parallelism,
+            write_mode,
+            compression,
+        )
+
+    # Bytes are counted before decompression, so progress follows total_bytes
+    stream = ByteCountingStream(raw_stream)
+    stats = IngestStats()
+    rows = []
+
+    for row in iter_csv_rows(open_decompressed(stream, compression)):
+        rows.append(row)
+
+        if len(rows) >= BATCH_SIZE:  # Convert and write in batches
+            INGEST_ROWS_PARSED.inc(len(rows))
+            stats.add(write_movies(mongo, Movie.from_csv_batch(rows), write_mode))
+            rows.clear()
+            _report_progress(mongo, task_id, stream, total_bytes, stats)
+
+    # Final write for remaining movies
+    if rows:
+        INGEST_ROWS_PARSED.inc(len(rows))
+        stats.add(write_movies(mongo, Movie.from_csv_batch(rows), write_mode))
+
+    # Fold the titles of this upload into the suggest index's main list
+    title_index.compact()
+    _report_completed(mongo, task_id, stats)
+    return stats.uploaded_rows
+
+
+def ingest_csv_parallel(
+    mongo: MongoConnect,
+    task_id: str,
+    raw_stream: BinaryIO,
+    total_bytes: Optional[int] = None,
+    parallelism: Optional[int] = None,
+    write_mode: str = INGEST_WRITE_MODE,
+    compression: Optional[str] = None,
+) -> int:
+    """
+    Summary: Ingest a movies CSV with a process pool of parsers and concurrent writes.
+
+    The stream is split into record-aligned chunks that are parsed and
+    validated in separate processes. Parsed chunks are written unordered on
+    a thread pool, so parsing of the next chunks overlaps earlier writes.
+
+    Args:
+        mongo (MongoConnect): handle used for writes and status updates.
+        task_id (str): upload_status task to report progress into.
+        raw_stream (BinaryIO): binary stream of the CSV upload.
+        total_bytes (int, optional): expected stream size used for progress.
+        parallelism (int, optional): parser processes. Defaults to INGEST_PARALLELISM.
+        write_mode (str, optional): one of WRITE_MODES. Defaults to INGEST_WRITE_MODE.
+        compression (str, optional): compression of the upload, see open_decompressed.
+    Return:
+        int: number of rows uploaded.
+    """
+    workers = max(parallelism or INGEST_PARALLELISM, 1)
+    stream = ByteCountingStream(raw_stream)
+    buffered = io.BufferedReader(
+        open_decompressed(stream, compression), buffer_size=READ_CHUNK_SIZE
+    )
+    stats = IngestStats()
+
+    fieldnames = read_header(buffered)
+    parsing: Deque[Future] = deque()
+    writing: Deque[Future] = deque()
+
+    parsers = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context(INGEST_MP_START_METHOD),
+    )
+    writers = ThreadPoolExecutor(
+        max_workers=INGEST_INSERT_THREADS, thread_name_prefix=f"ingest-{task_id[:8]}"
+    )
+
+    def finish_write():
+        stats.add(writing.popleft().result())
+        _report_progress(mongo, task_id, stream, total_bytes, stats)
+
+    def start_write():
+        movies = parsing.popleft().result()
+        # Parser processes do not share this process's metrics, count here
+        INGEST_ROWS_PARSED.inc(len(movies))
+        if movies:
+            writing.append(writers.submit(write_movies, mongo, movies, write_mode))
+        # Keep a bounded number of parsed chunks in memory
+        while len(writing) > INGEST_INSERT_THREADS * 2:
+            finish_write()
+
+    try:
+        for chunk in iter_record_chunks(buffered, INGEST_CHUNK_BYTES):
+            parsing.append(parsers.submit(parse_chunk, fieldnames, chunk))
+            while len(parsing) >= workers * 2:
+                start_write()
+
+        while parsing:
+            start_write()
+        while writing:
+            finish_write()
+    except Exception:
+        for future in list(parsing) + list(writing):
+            future.cancel()
+        raise
+    finally:
+        parsers.shutdown(wait=True, cancel_futures=True)
+        writers.shutdown(wait=True, cancel_futures=True)
+
+    # Fold the titles of this upload into the suggest index's main list
+    title_index.compact()
+    _report_completed(mongo, task_id, stats)
+    return stats.uploaded_rows
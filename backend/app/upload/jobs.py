@@ -0,0 +1,250 @@
+import atexit
+import logging
+import os
+import queue
+import tempfile
+import threading
+from typing import List, Optional
+
+from app.mongo import MongoConnect
+from app.movies.cache import page_cache
+from app.upload.ingest import INGEST_WRITE_MODE, ingest_csv
+from app.upload.progress import publish_progress
+
+UPLOAD_SPOOL_DIR = os.getenv(
+    "UPLOAD_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "movie-uploads")
+)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "16"))
+INGEST_SHUTDOWN_TIMEOUT = float(os.getenv("INGEST_SHUTDOWN_TIMEOUT", "30"))
+
+
+class JobQueueFull(Exception):
+    """
+    Summary: Raised when the ingestion queue cannot accept another job.
+    """
+
+
+class IngestionJob:
+    """
+    Summary: A spooled CSV upload waiting to be ingested.
+    """
+
+    def __init__(
+        self,
+        task_id: str,
+        path: str,
+        file_name: str,
+        mode: str = "auto",
+        parallelism: Optional[int] = None,
+        write_mode: str = INGEST_WRITE_MODE,
+        compression: Optional[str] = None,
+    ):
+        """
+        Summary: Initialise the job.
+
+        Args:
+            task_id (str): upload_status task the job reports into.
+            path (str): location of the spooled upload on local disk.
+            file_name (str): original name of the uploaded file.
+            mode (str, optional): ingestion mode, one of INGEST_MODES.
+            parallelism (int, optional): parser processes for the parallel mode.
+            write_mode (str, optional): one of WRITE_MODES.
+            compression (str, optional): compression of the upload, see open_decompressed.
+        """
+        self.task_id = task_id
+        self.path = path
+        self.file_name = file_name
+        self.mode = mode
+        self.parallelism = parallelism
+        self.write_mode = write_mode
+        self.compression = compression
+
+
+def spool_path(task_id: str) -> str:
+    """
+    Summary: Get the local path an upload is spooled to.
+
+    Args:
+        task_id (str): task the upload belongs to.
+    Return:
+        str: path inside UPLOAD_SPOOL_DIR.
+    """
+    os.makedirs(UPLOAD_SPOOL_DIR, exist_ok=True)
+    return os.path.join(UPLOAD_SPOOL_DIR, f"{task_id}.upload")
+
+
+def remove_spooled_file(path: str):
+    """
+    Summary: Delete a spooled upload, ignoring files that are already gone.
+
+    Args:
+        path (str): spooled file to delete.
+    """
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def run_job(job: IngestionJob):
+    """
+    Summary: Ingest a spooled upload and record the outcome in upload_status.
+
+    Args:
+        job (IngestionJob): job to run.
+    """
+    mongo = MongoConnect()
+    try:
+        publish_progress(
+            mongo,
+            job.task_id,
+            {"status": "in_progress", "progress": 0, "file_name": job.file_name},
+            force=True,
+        )
+        with open(job.path, "rb") as stream:
+            ingest_csv(
+                mongo,
+                job.task_id,
+                stream,
+                os.path.getsize(job.path),
+                mode=job.mode,
+                parallelism=job.parallelism,
+                write_mode=job.write_mode,
+                compression=job.compression,
+            )
+    except Exception as e:
+        logging.error(f"Error processing upload {job.task_id}: {e}")
+        publish_progress(mongo, job.task_id, {"status": "failed"})
+    finally:
+        # Cached dashboard pages may no longer match the collection
+        page_cache.invalidate()
+        remove_spooled_file(job.path)
+        mongo.close_connection()
+
+
+class IngestionJobEngine:
+    """
+    Summary: In-process worker pool that ingests spooled uploads from a bounded queue.
+    """
+
+    def __init__(
+        self, workers: int = INGEST_WORKERS, queue_size: int = INGEST_QUEUE_SIZE
+    ):
+        """
+        Summary: Initialise the engine and start its worker threads.
+
+        Args:
+            workers (int): number of worker threads.
+            queue_size (int): maximum number of jobs waiting for a worker.
+        """
+        self._queue: "queue.Queue[Optional[IngestionJob]]" = queue.Queue(
+            maxsize=queue_size
+        )
+        self._threads: List[threading.Thread] = []
+        for index in range(max(workers, 1)):
+            thread = threading.Thread(
+                target=self._work, name=f"ingest-worker-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, job: IngestionJob):
+        """
+        Summary: Queue a job without blocking.
+
+        Args:
+            job (IngestionJob): job to queue.
+        Raises:
+            JobQueueFull: if the queue is at capacity.
+        """
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            raise JobQueueFull(f"Ingestion queue is full ({self._queue.maxsize} jobs)")
+
+    def pending(self) -> int:
+        """
+        Summary: Number of jobs waiting for a worker.
+        """
+        return self._queue.qsize()
+
+    def shutdown(self, timeout: Optional[float] = INGEST_SHUTDOWN_TIMEOUT):
+        """
+        Summary: Stop the workers once they finish their current job.
+
+        Args:
+            timeout (float, optional): seconds to wait for each worker.
+        """
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _work(self):
+        """
+        Summary: Worker loop, runs jobs until it receives the stop sentinel.
+        """
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                run_job(job)
+            finally:
+                self._queue.task_done()
+
+
+_engine: Optional[IngestionJobEngine] = None
+_engine_pid: Optional[int] = None
+_engine_lock = threading.Lock()
+
+
+def get_job_engine() -> IngestionJobEngine:
+    """
+    Summary: Get the ingestion engine for this process, starting it on first use.
+
+    Return:
+        IngestionJobEngine: the shared engine.
+    """
+    global _engine, _engine_pid
+
+    pid = os.getpid()
+    if _engine is not None and _engine_pid == pid:
+        return _engine
+
+    with _engine_lock:
+        if _engine is None or _engine_pid != pid:
+            _engine = IngestionJobEngine()
+            _engine_pid = pid
+    return _engine
+
+
+def shutdown_job_engine():
+    """
+    Summary: Stop the ingestion engine for this process, if it was started.
+    """
+    global _engine, _engine_pid
+
+    with _engine_lock:
+        if _engine is not None and _engine_pid == os.getpid():
+            _engine.shutdown()
+        _engine = None
+        _engine_pid = None
+
+
+def _reset_engine_after_fork():
+    """
+    Summary: Drop the inherited engine reference in a forked child.
+    """
+    global _engine, _engine_pid, _engine_lock
+
+    _engine = None
+    _engine_pid = None
+    _engine_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_engine_after_fork)
+
+atexit.register(shutdown_job_engine)
@@ -0,0 +1,339 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+
+from app.cache import TTLCache
+from app.mongo import AsyncMongoConnect, MongoConnect
+
+# Seconds between progress writes to upload_status for one upload
+PROGRESS_WRITE_INTERVAL = float(os.getenv("PROGRESS_WRITE_INTERVAL", "1"))
+# Seconds an upload_status read is shared by every watcher in the process
+PROGRESS_CACHE_TTL = float(os.getenv("PROGRESS_CACHE_TTL", "1"))
+# Seconds between keep-alive comments on an idle progress stream
+PROGRESS_KEEPALIVE = float(os.getenv("PROGRESS_KEEPALIVE", "15"))
+# Seconds the last event of a finished upload is kept for late watchers
+PROGRESS_RETENTION = float(os.getenv("PROGRESS_RETENTION", "60"))
+
+# Seconds between checks of a local upload by an async progress stream
+PROGRESS_ASYNC_POLL = float(os.getenv("PROGRESS_ASYNC_POLL", "0.2"))
+
+FINAL_STATUSES = ("completed", "failed")
+
+
+def progress_payload(upload_status: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Summary: Progress fields of an upload, as returned to clients.
+
+    Args:
+        upload_status (Dict[str, Any]): upload_status document or progress snapshot.
+    Return:
+        Dict[str, Any]: the progress response.
+    """
+    return {
+        "status": upload_status["status"],
+        "progress": upload_status.get("progress", 0),
+        "uploaded_rows": upload_status.get("uploaded_rows", 0),
+        "rows_per_second": upload_status.get("rows_per_second", 0),
+        "inserted_rows": upload_status.get("inserted_rows", 0),
+        "updated_rows": upload_status.get("updated_rows", 0),
+        "unchanged_rows": upload_status.get("unchanged_rows", 0),
+        "file_name": upload_status.get("file_name"),
+    }
+
+
+class ProgressBroker:
+    """
+    Summary: Latest progress of the uploads ingested by this process.
+
+    Ingestion publishes every update here, and watchers block until the
+    version of their upload moves past the one they last sent. Only the
+    latest snapshot is kept, so slow watchers skip intermediate updates
+    instead of queueing them.
+    """
+
+    def __init__(self, retention: float = PROGRESS_RETENTION):
+        """
+        Summary: Initialise the broker.
+
+        Args:
+            retention (float): seconds a finished upload stays available.
+        """
+        self._retention = retention
+        self._lock = threading.Lock()
+        self._tasks: Dict[str, Dict[str, Any]] = {}
+
+    def publish(
+        self, task_id: str, update: Dict[str, Any], interval: float, force: bool = False
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Summary: Record a progress update and wake the upload's watchers.
+
+        Args:
+            task_id (str): upload task.
+            update (Dict[str, Any]): changed status fields.
+            interval (float): minimum seconds between two persisted snapshots.
+            force (bool, optional): persist regardless of the interval.
+        Return:
+            Tuple[Dict[str, Any], bool]: the merged snapshot, and whether it is
+                                         due to be written to upload_status.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            task = self._tasks.get(task_id)
+            if task is None:
+                task = {
+                    "version": 0,
+                    "snapshot": {},
+                    "written_at": None,
+                    "finished_at": None,
+                    "condition": threading.Condition(self._lock),
+                }
+                self._tasks[task_id] = task
+
+            task["snapshot"] = {**task["snapshot"], **update}
+            task["version"] += 1
+            if task["snapshot"].get("status") in FINAL_STATUSES:
+                task["finished_at"] = now
+                force = True
+
+            due = (
+                force
+                or task["written_at"] is None
+                or now - task["written_at"] >= interval
+            )
+            if due:
+                task["written_at"] = now
+            task["condition"].notify_all()
+            return dict(task["snapshot"]), due
+
+    def get(self, task_id: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """
+        Summary: Latest version and snapshot of an upload, if this process has it.
+        """
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None:
+                return None
+            return task["version"], dict(task["snapshot"])
+
+    def wait(
+        self, task_id: str, version: int, timeout: float
+    ) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """
+        Summary: Block until an upload has a snapshot newer than version.
+
+        Args:
+            task_id (str): upload task.
+            version (int): last version the watcher has seen.
+            timeout (float): seconds to wait.
+        Return:
+            Optional[Tuple[int, Dict[str, Any]]]: the new version and snapshot,
+                                                  or None on timeout.
+        """
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None:
+                return None
+            if task["version"] <= version:
+                task["condition"].wait(timeout)
+            if task["version"] <= version:
+                return None
+            return task["version"], dict(task["snapshot"])
+
+    def _prune(self, now: float):
+        """
+        Summary: Forget uploads that finished longer than the retention ago.
+        """
+        expired = [
+            task_id
+            for task_id, task in self._tasks.items()
+            if task["finished_at"] is not None
+            and now - task["finished_at"] > self._retention
+        ]
+        for task_id in expired:
+            del self._tasks[task_id]
+
+
+progress_broker = ProgressBroker()
+
+# Shared upload_status reads, for uploads ingested by another process
+_status_reads = TTLCache(max_entries=1024, ttl=PROGRESS_CACHE_TTL)
+
+
+def publish_progress(
+    mongo: MongoConnect, task_id: str, update: Dict[str, Any], force: bool = False
+):
+    """
+    Summary: Push a progress update to watchers and persist it at most once per interval.
+
+    Updates between two writes are coalesced: the next write persists the
+    merged snapshot. Final statuses are always written.
+
+    Args:
+        mongo (MongoConnect): handle used for the upload_status write.
+        task_id (str): upload task.
+        update (Dict[str, Any]): changed status fields.
+        force (bool, optional): write to upload_status regardless of the interval.
+    """
+    snapshot, due = progress_broker.publish(
+        task_id, update, PROGRESS_WRITE_INTERVAL, force=force
+    )
+    if due:
+        mongo.update_document("upload_status", {"task_id": task_id}, snapshot)
+        _status_reads.delete(task_id)
+
+
+def read_progress(mongo: MongoConnect, task_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Summary: Current progress of an upload, without a database read per watcher.
+
+    Uploads ingested by this process are answered from the broker. Others
+    are read from upload_status, and the read is shared for PROGRESS_CACHE_TTL.
+
+    Args:
+        mongo (MongoConnect): handle used when upload_status has to be read.
+        task_id (str): upload task.
+    Return:
+        Optional[Dict[str, Any]]: the progress response, or None if the task is unknown.
+    """
+    latest = progress_broker.get(task_id)
+    if latest is not None and "status" in latest[1]:
+        return progress_payload(latest[1])
+
+    upload_status = _status_reads.get(task_id)
+    if upload_status is None:
+        upload_status = mongo.find_document("upload_status", {"task_id": task_id})
+        if upload_status is None:
+            return None
+        _status_reads.set(task_id, upload_status)
+    return progress_payload(upload_status)
+
+
+async def read_progress_async(
+    mongo: AsyncMongoConnect, task_id: str
+) -> Optional[Dict[str, Any]]:
+    """
+    Summary: read_progress for the ASGI app, reading upload_status without blocking.
+
+    Args:
+        mongo (AsyncMongoConnect): handle used when upload_status has to be read.
+        task_id (str): upload task.
+    Return:
+        Optional[Dict[str, Any]]: the progress response, or None if the task is unknown.
+    """
+    latest = progress_broker.get(task_id)
+    if latest is not None and "status" in latest[1]:
+        return progress_payload(latest[1])
+
+    upload_status = _status_reads.get(task_id)
+    if upload_status is None:
+        upload_status = await mongo.find_document("upload_status", {"task_id": task_id})
+        if upload_status is None:
+            return None
+        _status_reads.set(task_id, upload_status)
+    return progress_payload(upload_status)
+
+
+def format_event(event: str, data: Dict[str, Any]) -> bytes:
+    """
+    Summary: Encode a Server-Sent Event.
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+def iter_progress_events(
+    mongo: MongoConnect,
+    task_id: str,
+    poll_interval: float = PROGRESS_CACHE_TTL,
+    keepalive: float = PROGRESS_KEEPALIVE,
+) -> Iterator[bytes]:
+    """
+    Summary: Stream the progress of an upload as Server-Sent Events until it finishes.
+
+    An event is sent whenever the progress changes. Uploads ingested by this
+    process wake the stream as soon as they publish; others are re-read
+    through the shared upload_status cache every poll_interval. Idle streams
+    get a comment every keepalive seconds so proxies keep them open.
+
+    Args:
+        mongo (MongoConnect): handle used when upload_status has to be read.
+        task_id (str): upload task.
+        poll_interval (float, optional): seconds between checks for new progress.
+        keepalive (float, optional): seconds between keep-alive comments.
+    Return:
+        Iterator[bytes]: the event stream.
+    """
+    yield f"retry: {int(poll_interval * 1000)}\n\n".encode()
+    version = 0
+    sent = None
+    sent_at = time.monotonic()
+    while True:
+        latest = progress_broker.wait(task_id, version, poll_interval)
+        if latest is not None:
+            version = latest[0]
+
+        payload = read_progress(mongo, task_id)
+        if payload is None:
+            yield format_event("error", {"error": "Upload task not found"})
+            return
+
+        now = time.monotonic()
+        if payload != sent:
+            yield format_event("progress", payload)
+            sent, sent_at = payload, now
+            if payload["status"] in FINAL_STATUSES:
+                return
+        elif now - sent_at >= keepalive:
+            yield b": keepalive\n\n"
+            sent_at = now
+
+        # Uploads ingested elsewhere are not published here, wait between reads
+        if progress_broker.get(task_id) is None:
+            time.sleep(poll_interval)
+
+
+async def iter_progress_events_async(
+    mongo: AsyncMongoConnect,
+    task_id: str,
+    poll_interval: float = PROGRESS_CACHE_TTL,
+    keepalive: float = PROGRESS_KEEPALIVE,
+) -> AsyncIterator[bytes]:
+    """
+    Summary: iter_progress_events for the ASGI app, an idle stream holds no thread.
+
+    The broker's condition blocks a thread, so uploads ingested by this
+    process are checked every PROGRESS_ASYNC_POLL seconds instead.
+
+    Args:
+        mongo (AsyncMongoConnect): handle used when upload_status has to be read.
+        task_id (str): upload task.
+        poll_interval (float, optional): seconds between upload_status reads.
+        keepalive (float, optional): seconds between keep-alive comments.
+    Return:
+        AsyncIterator[bytes]: the event stream.
+    """
+    yield f"retry: {int(poll_interval * 1000)}\n\n".encode()
+    sent = None
+    sent_at = time.monotonic()
+    while True:
+        payload = await read_progress_async(mongo, task_id)
+        if payload is None:
+            yield format_event("error", {"error": "Upload task not found"})
+            return
+
+        now = time.monotonic()
+        if payload != sent:
+            yield format_event("progress", payload)
+            sent, sent_at = payload, now
+            if payload["status"] in FINAL_STATUSES:
+                return
+        elif now - sent_at >= keepalive:
+            yield b": keepalive\n\n"
+            sent_at = now
+
+        local = progress_broker.get(task_id) is not None
+        await asyncio.sleep(PROGRESS_ASYNC_POLL if local else poll_interval)
@@ -1,19 +1,54 @@
-import csv
 import logging
+import os
+import shutil
 import uuid
 from datetime import datetime
+from typing import Optional, Tuple
 
 from app.auth.utils import token_required
-from app.models import Movie, UploadStatus
-from flask import Blueprint, g, jsonify, request
+from app.models import UploadSession, UploadStatus
+from app.upload.ingest import (
+    INGEST_MODES,
+    INGEST_WRITE_MODE,
+    WRITE_MODES,
+    compression_for_file,
+)
+from app.upload.jobs import (
+    IngestionJob,
+    JobQueueFull,
+    get_job_engine,
+    remove_spooled_file,
+    spool_path,
+)
+from app.upload.progress import iter_progress_events, read_progress
+from app.upload.sessions import (
+    UPLOAD_CHUNK_SIZE,
+    UPLOAD_MAX_BYTES,
+    UPLOAD_MAX_CHUNK_SIZE,
+    chunk_count,
+    chunk_length,
+    create_session_file,
+    missing_chunks,
+    received_ranges,
+    remove_expired_session_files,
+    session_spool_path,
+    write_chunk,
+)
+from flask import Blueprint, Response, g, jsonify, request, stream_with_context
 
 upload_bp = Blueprint("upload", __name__)
 logging.basicConfig(level=logging.INFO)
 
+RAW_BODY_BLOCK_SIZE = 1024 * 1024  # Bytes copied per write when spooling a raw body
+
 
 @upload_bp.route("/upload_csv", methods=["POST"])
 @token_required
 def upload_csv():
+    # Bodies that are not a form are the CSV itself, spooled without form parsing
+    if request.mimetype != "multipart/form-data":
+        return _upload_raw_body()
+
     file = request.files.get("file")
 
     # Check if a file was provided in the request
@@ -28,20 +63,122 @@ def upload_csv():
         logging.error("No selected file")
         return jsonify({"error": "No selected file"}), 400
 
-    if not file or not file.filename.endswith(".csv"):
+    # Plain or compressed CSV, decompressed while it is ingested
+    try:
+        compression = compression_for_file(file.filename)
+    except ValueError as e:
         logging.error("Invalid file format. Expected a CSV file.")
-        return jsonify({"error": "Invalid file format. Please upload a CSV file."}), 400
+        return jsonify({"error": str(e)}), 400
+
+    # Optional ingestion mode and degree of parallelism
+    try:
+        mode, write_mode, parallelism = _ingest_options(request.form)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    task_id = str(uuid.uuid4())
+    file_name = file.filename or "unknown"
+    if not _create_upload_status(task_id, file_name, write_mode):
+        return jsonify({"error": "Error initializing upload status."}), 500
+
+    # Spool the upload to local disk and hand it to the background workers
+    path = spool_path(task_id)
+    try:
+        file.save(path)
+    except Exception as e:
+        logging.error(f"Error spooling upload: {e}")
+        return _fail_upload(task_id, path, "Error processing CSV.", 500)
+
+    return _submit_ingestion(
+        task_id, path, file_name, mode, parallelism, write_mode, compression
+    )
+
+
+def _upload_raw_body():
+    """
+    Summary: Handle an upload_csv request whose body is the file itself.
+
+    The file name and ingestion options come from the query string. A body
+    sent with "Content-Encoding: gzip" is ingested as a gzip file.
+    """
+    file_name = request.args.get("file_name", "upload.csv")
+    content_encoding = (request.headers.get("Content-Encoding") or "identity").lower()
+    try:
+        compression = compression_for_file(file_name)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if content_encoding == "gzip" and compression is None:
+        compression = "gzip"
+    elif content_encoding != "identity":
+        return (
+            jsonify({"error": f"Unsupported Content-Encoding: {content_encoding}"}),
+            415,
+        )
+
+    try:
+        mode, write_mode, parallelism = _ingest_options(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
     task_id = str(uuid.uuid4())
+    if not _create_upload_status(task_id, file_name, write_mode):
+        return jsonify({"error": "Error initializing upload status."}), 500
+
+    path = spool_path(task_id)
+    try:
+        with open(path, "wb") as spool:
+            shutil.copyfileobj(request.stream, spool, RAW_BODY_BLOCK_SIZE)
+    except Exception as e:
+        logging.error(f"Error spooling upload: {e}")
+        return _fail_upload(task_id, path, "Error processing CSV.", 500)
+
+    return _submit_ingestion(
+        task_id, path, file_name, mode, parallelism, write_mode, compression
+    )
 
-    # Initialize upload status with the task_id
+
+def _ingest_options(values) -> Tuple[str, str, Optional[int]]:
+    """
+    Summary: Read the ingestion options of an upload request.
+
+    Args:
+        values: form or JSON values of the request.
+    Return:
+        Tuple[str, str, Optional[int]]: mode, write_mode and parallelism.
+    Raises:
+        ValueError: if mode or write_mode is invalid.
+    """
+    mode = values.get("mode", "auto")
+    if mode not in INGEST_MODES:
+        raise ValueError(f"mode must be one of {', '.join(INGEST_MODES)}")
+    write_mode = values.get("write_mode", INGEST_WRITE_MODE)
+    if write_mode not in WRITE_MODES:
+        raise ValueError(f"write_mode must be one of {', '.join(WRITE_MODES)}")
+    try:
+        parallelism = values.get("parallelism")
+        parallelism = int(parallelism) if parallelism is not None else None
+    except (TypeError, ValueError):
+        parallelism = None
+    if parallelism is not None:
+        parallelism = min(max(parallelism, 1), os.cpu_count() or 1)
+    return mode, write_mode, parallelism
+
+
+def _create_upload_status(task_id: str, file_name: str, write_mode: str) -> bool:
+    """
+    Summary: Insert the queued upload_status of a new upload.
+
+    Return:
+        bool: False if the status could not be inserted.
+    """
     upload_status = UploadStatus(
         user_id=g.current_user_email,
-        file_name=file.filename or "unknown",
-        status="in_progress",
+        file_name=file_name,
+        status="queued",
         progress=0,
         timestamp=datetime.now(),
         task_id=task_id,  # Store task ID in the database
+        write_mode=write_mode,
     )
 
     try:
@@ -49,80 +186,329 @@ def upload_csv():
         g.mongo.insert_document("upload_status", upload_status.to_dict())
     except Exception as e:
         logging.error(f"Error inserting upload status: {e}")
-        return jsonify({"error": "Error initializing upload status."}), 500
+        return False
+    return True
 
-    # Process the CSV
+
+def _fail_upload(
+    task_id: str,
+    path: str,
+    message: str,
+    status_code: int,
+    restore_path: Optional[str] = None,
+):
+    """
+    Summary: Mark an upload failed, drop its spooled file and build the error response.
+
+    With restore_path, the spooled file is moved back there instead, so a
+    resumable upload can be finalized again.
+    """
+    if restore_path:
+        try:
+            os.replace(path, restore_path)
+        except OSError as e:
+            logging.error(f"Error restoring spooled upload {task_id}: {e}")
+            remove_spooled_file(path)
+    else:
+        remove_spooled_file(path)
+    g.mongo.update_document("upload_status", {"task_id": task_id}, {"status": "failed"})
+    return jsonify({"error": message}), status_code
+
+
+def _submit_ingestion(
+    task_id: str,
+    path: str,
+    file_name: str,
+    mode: str,
+    parallelism: Optional[int],
+    write_mode: str,
+    compression: Optional[str] = None,
+    restore_path: Optional[str] = None,
+):
+    """
+    Summary: Queue a spooled upload for ingestion and build the response.
+    """
     try:
-        csv_content = file.stream.read().decode("utf-8")
-        csv_reader = csv.DictReader(csv_content.splitlines())
-        logging.info(f"csv_reader: {csv_reader}")
-        total_rows = sum(1 for _ in csv_reader)
-        logging.info(f"Total rows: {total_rows}")
-        file.stream.seek(0)  # Reset file pointer
-        movies, uploaded_rows = [], 0
-
-        csv_content = file.stream.read().decode("utf-8")
-        csv_reader = csv.DictReader(csv_content.splitlines())
-
-        for row in csv_reader:
-            logging.info(f"A {row}")
-            movie = Movie.from_csv(row)
-            movies.append(movie.to_dict())
-            uploaded_rows += 1
-
-            if uploaded_rows % 1000 == 0:  # Insert in batches
-                try:
-                    g.mongo.insert_many_documents("movies", movies)
-                    movies.clear()
-
-                    # Update progress
-                    progress = (uploaded_rows / total_rows) * 100
-                    g.mongo.update_document(
-                        "upload_status",
-                        {"task_id": task_id},
-                        {"progress": progress, "uploaded_rows": uploaded_rows},
-                    )
-                except Exception as e:
-                    logging.error(f"Error inserting batch of movies: {e}")
-                    return jsonify({"error": "Error inserting movies."}), 500
-
-        # Final insertion for remaining movies and update progress
-        if movies:
-            try:
-                g.mongo.insert_many_documents("movies", movies)
-            except Exception as e:
-                logging.error(f"Error inserting remaining movies: {e}")
-                return jsonify({"error": "Error inserting remaining movies."}), 500
-
-        g.mongo.update_document(
-            "upload_status",
-            {"task_id": task_id},
-            {"status": "completed", "progress": 100},
+        get_job_engine().submit(
+            IngestionJob(
+                task_id,
+                path,
+                file_name,
+                mode=mode,
+                parallelism=parallelism,
+                write_mode=write_mode,
+                compression=compression,
+            )
+        )
+    except JobQueueFull as e:
+        logging.warning(f"Rejecting upload {task_id}: {e}")
+        return _fail_upload(
+            task_id,
+            path,
+            "Too many uploads in progress, retry later.",
+            503,
+            restore_path,
         )
     except Exception as e:
-        logging.error(f"Error processing CSV: {e}")
-        return jsonify({"error": "Error processing CSV."}), 500
+        logging.error(f"Error queueing upload: {e}")
+        return _fail_upload(task_id, path, "Error processing CSV.", 500, restore_path)
 
     return jsonify({"message": "CSV upload started", "task_id": task_id}), 202
 
 
-@upload_bp.route("/upload_progress/<task_id>", methods=["GET"])
+@upload_bp.route("/sessions", methods=["POST"])
 @token_required
-def upload_progress(task_id):
-    # Retrieve upload status from MongoDB using the task_id
-    upload_status = g.mongo.find_document("upload_status", {"task_id": task_id})
+def create_upload_session():
+    """
+    Start a resumable upload.
+    JSON body:
+    - file_name (str): name of the CSV file
+    - total_bytes (int): size of the file
+    - chunk_size (int): size of every chunk but the last (default UPLOAD_CHUNK_SIZE)
+    - mode, write_mode, parallelism: ingestion options, as for upload_csv
+    """
+    data = request.get_json(silent=True) or {}
+    file_name = data.get("file_name") or ""
+    try:
+        compression_for_file(file_name)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        total_bytes = int(data.get("total_bytes"))
+        chunk_size = int(data.get("chunk_size", UPLOAD_CHUNK_SIZE))
+    except (TypeError, ValueError):
+        return jsonify({"error": "total_bytes and chunk_size must be integers"}), 400
+    if not 0 < total_bytes <= UPLOAD_MAX_BYTES:
+        return (
+            jsonify({"error": f"total_bytes must be between 1 and {UPLOAD_MAX_BYTES}"}),
+            400,
+        )
+    if not 0 < chunk_size <= UPLOAD_MAX_CHUNK_SIZE:
+        return (
+            jsonify(
+                {"error": f"chunk_size must be between 1 and {UPLOAD_MAX_CHUNK_SIZE}"}
+            ),
+            400,
+        )
+    try:
+        mode, write_mode, parallelism = _ingest_options(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    if not upload_status:
-        return jsonify({"error": "Upload task not found"}), 404
+    remove_expired_session_files()
+
+    now = datetime.now()
+    session = UploadSession(
+        session_id=str(uuid.uuid4()),
+        user_id=g.current_user_email,
+        file_name=file_name,
+        total_bytes=total_bytes,
+        chunk_size=chunk_size,
+        mode=mode,
+        parallelism=parallelism,
+        write_mode=write_mode,
+        created_at=now,
+        updated_at=now,
+    )
+    try:
+        create_session_file(session_spool_path(session.session_id), total_bytes)
+        g.mongo.insert_document("upload_sessions", session.to_dict())
+    except Exception as e:
+        logging.error(f"Error starting upload session: {e}")
+        remove_spooled_file(session_spool_path(session.session_id))
+        return jsonify({"error": "Error starting upload session."}), 500
 
     return (
         jsonify(
             {
-                "status": upload_status["status"],
-                "progress": upload_status["progress"],
-                "uploaded_rows": upload_status.get("uploaded_rows", 0),
-                "file_name": upload_status["file_name"],
+                "session_id": session.session_id,
+                "chunk_size": chunk_size,
+                "chunk_count": chunk_count(total_bytes, chunk_size),
+            }
+        ),
+        201,
+    )
+
+
+def _find_session(session_id: str) -> Optional[dict]:
+    """
+    Summary: Get an upload session of the current user.
+    """
+    return g.mongo.find_document(
+        "upload_sessions",
+        {"session_id": session_id, "user_id": g.current_user_email},
+    )
+
+
+@upload_bp.route("/sessions/<session_id>", methods=["GET"])
+@token_required
+def get_upload_session(session_id):
+    """
+    Get the state of a resumable upload, including the byte ranges already received.
+    """
+    session = _find_session(session_id)
+    if not session:
+        return jsonify({"error": "Upload session not found"}), 404
+
+    total_bytes, chunk_size = session["total_bytes"], session["chunk_size"]
+    return (
+        jsonify(
+            {
+                "session_id": session_id,
+                "file_name": session["file_name"],
+                "status": session["status"],
+                "task_id": session.get("task_id"),
+                "total_bytes": total_bytes,
+                "chunk_size": chunk_size,
+                "chunk_count": chunk_count(total_bytes, chunk_size),
+                "received_ranges": received_ranges(
+                    session["received_chunks"], total_bytes, chunk_size
+                ),
+                "missing_chunks": missing_chunks(
+                    session["received_chunks"], total_bytes, chunk_size
+                ),
             }
         ),
         200,
     )
+
+
+@upload_bp.route("/sessions/<session_id>/chunks/<int:index>", methods=["PUT"])
+@token_required
+def put_upload_chunk(session_id, index):
+    """
+    Write one chunk of a resumable upload. The body is the raw chunk, which
+    must be exactly chunk_size bytes, except for the last chunk. Sending a
+    chunk again overwrites it.
+    """
+    session = _find_session(session_id)
+    if not session:
+        return jsonify({"error": "Upload session not found"}), 404
+    if session["status"] != "open":
+        return jsonify({"error": "Upload session is already finalized"}), 409
+
+    total_bytes, chunk_size = session["total_bytes"], session["chunk_size"]
+    if not 0 <= index < chunk_count(total_bytes, chunk_size):
+        return jsonify({"error": "Chunk index out of range"}), 400
+    length = chunk_length(index, total_bytes, chunk_size)
+    if request.content_length != length:
+        return jsonify({"error": f"Chunk {index} must be {length} bytes"}), 400
+
+    try:
+        written = write_chunk(
+            session_spool_path(session_id), index * chunk_size, request.stream, length
+        )
+    except Exception as e:
+        logging.error(f"Error writing chunk {index} of session {session_id}: {e}")
+        return jsonify({"error": "Error writing chunk."}), 500
+    if written != length:
+        return jsonify({"error": f"Chunk {index} was cut short"}), 400
+
+    g.mongo.add_to_set(
+        "upload_sessions",
+        {"session_id": session_id},
+        "received_chunks",
+        index,
+        {"updated_at": datetime.now()},
+    )
+    return jsonify({"session_id": session_id, "index": index, "bytes": written}), 200
+
+
+@upload_bp.route("/sessions/<session_id>/finalize", methods=["POST"])
+@token_required
+def finalize_upload_session(session_id):
+    """
+    Start ingesting a resumable upload once every chunk has been received.
+    """
+    session = _find_session(session_id)
+    if not session:
+        return jsonify({"error": "Upload session not found"}), 404
+    if session["status"] == "finalized":
+        return (
+            jsonify({"message": "CSV upload started", "task_id": session["task_id"]}),
+            202,
+        )
+    if session["status"] == "finalizing":
+        return jsonify({"error": "Upload session is being finalized"}), 409
+
+    missing = missing_chunks(
+        session["received_chunks"], session["total_bytes"], session["chunk_size"]
+    )
+    if missing:
+        return (
+            jsonify({"error": "Upload is incomplete", "missing_chunks": missing}),
+            409,
+        )
+
+    task_id = str(uuid.uuid4())
+    # Claim the session, so a concurrent finalize cannot ingest it twice
+    claimed = g.mongo.update_document(
+        "upload_sessions",
+        {"session_id": session_id, "status": "open"},
+        {"status": "finalizing", "task_id": task_id, "updated_at": datetime.now()},
+    )
+    if not claimed:
+        return jsonify({"error": "Upload session is already finalized"}), 409
+
+    session_path, path = session_spool_path(session_id), spool_path(task_id)
+    if not _create_upload_status(task_id, session["file_name"], session["write_mode"]):
+        response = (jsonify({"error": "Error initializing upload status."}), 500)
+    else:
+        try:
+            os.replace(session_path, path)
+        except OSError as e:
+            logging.error(f"Error spooling upload session {session_id}: {e}")
+            response = _fail_upload(task_id, path, "Error processing CSV.", 500)
+        else:
+            response = _submit_ingestion(
+                task_id,
+                path,
+                session["file_name"],
+                session["mode"],
+                session.get("parallelism"),
+                session["write_mode"],
+                compression_for_file(session["file_name"]),
+                restore_path=session_path,
+            )
+
+    # Only a queued ingestion finalizes the session, otherwise it can be retried
+    finalized = response[1] == 202
+    g.mongo.update_document(
+        "upload_sessions",
+        {"session_id": session_id, "task_id": task_id},
+        {
+            "status": "finalized" if finalized else "open",
+            "task_id": task_id if finalized else None,
+            "updated_at": datetime.now(),
+        },
+    )
+    return response
+
+
+@upload_bp.route("/upload_progress/<task_id>", methods=["GET"])
+@token_required
+def upload_progress(task_id):
+    # Served from the ingesting job, or from a shared read of upload_status
+    progress = read_progress(g.mongo, task_id)
+
+    if not progress:
+        return jsonify({"error": "Upload task not found"}), 404
+
+    return jsonify(progress), 200
+
+
+@upload_bp.route("/progress_stream/<task_id>", methods=["GET"])
+@token_required
+def progress_stream(task_id):
+    """
+    Push the progress of an upload as Server-Sent Events until it completes or fails.
+    """
+    if not read_progress(g.mongo, task_id):
+        return jsonify({"error": "Upload task not found"}), 404
+
+    return Response(
+        stream_with_context(iter_progress_events(g.mongo, task_id)),
+        status=200,
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,150 @@
+import logging
+import os
+import time
+from typing import BinaryIO, List
+
+from app.upload.jobs import UPLOAD_SPOOL_DIR
+
+# Default and maximum size of the chunks of a resumable upload
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024)))
+UPLOAD_MAX_CHUNK_SIZE = int(os.getenv("UPLOAD_MAX_CHUNK_SIZE", str(64 * 1024 * 1024)))
+# Largest file accepted by a resumable upload
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(20 * 1024 * 1024 * 1024)))
+# Seconds an idle session is kept, matches the upload_sessions TTL index
+UPLOAD_SESSION_TTL = int(os.getenv("UPLOAD_SESSION_TTL", "86400"))
+
+WRITE_BLOCK_SIZE = 1024 * 1024  # Bytes copied from the request per write
+
+
+def session_spool_path(session_id: str) -> str:
+    """
+    Summary: Get the local path the chunks of a session are written to.
+
+    Args:
+        session_id (str): the upload session.
+    Return:
+        str: path inside UPLOAD_SPOOL_DIR.
+    """
+    os.makedirs(UPLOAD_SPOOL_DIR, exist_ok=True)
+    return os.path.join(UPLOAD_SPOOL_DIR, f"{session_id}.session")
+
+
+def create_session_file(path: str, total_bytes: int):
+    """
+    Summary: Create the spool file of a session at its final size.
+
+    The file is sparse until chunks arrive, so chunks can be written at
+    their offsets in any order.
+
+    Args:
+        path (str): spool file to create.
+        total_bytes (int): size of the uploaded file.
+    """
+    with open(path, "wb") as spool:
+        spool.truncate(total_bytes)
+
+
+def chunk_count(total_bytes: int, chunk_size: int) -> int:
+    """
+    Summary: Number of chunks a file of total_bytes is sent in.
+    """
+    return max((total_bytes + chunk_size - 1) // chunk_size, 1)
+
+
+def chunk_length(index: int, total_bytes: int, chunk_size: int) -> int:
+    """
+    Summary: Expected size of a chunk, only the last one may be shorter.
+    """
+    return min(chunk_size, total_bytes - index * chunk_size)
+
+
+def write_chunk(path: str, offset: int, stream: BinaryIO, length: int) -> int:
+    """
+    Summary: Copy a chunk from a request body into the spool file at its offset.
+
+    Writes are positional, so concurrent chunks of the same session do not
+    interfere with each other.
+
+    Args:
+        path (str): spool file of the session.
+        offset (int): byte offset of the chunk in the file.
+        stream (BinaryIO): request body.
+        length (int): bytes to copy.
+    Return:
+        int: bytes written, less than length if the body ended early.
+    """
+    written = 0
+    fd = os.open(path, os.O_WRONLY)
+    try:
+        while written < length:
+            block = stream.read(min(WRITE_BLOCK_SIZE, length - written))
+            if not block:
+                break
+            os.pwrite(fd, block, offset + written)
+            written += len(block)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    return written
+
+
+def received_ranges(
+    received_chunks: List[int], total_bytes: int, chunk_size: int
+) -> List[List[int]]:
+    """
+    Summary: Byte ranges of a session already on disk.
+
+    Args:
+        received_chunks (List[int]): indexes of the received chunks.
+        total_bytes (int): size of the uploaded file.
+        chunk_size (int): size of the chunks.
+    Return:
+        List[List[int]]: merged [start, end) ranges, in order.
+    """
+    ranges: List[List[int]] = []
+    for index in sorted(set(received_chunks)):
+        start = index * chunk_size
+        end = start + chunk_length(index, total_bytes, chunk_size)
+        if ranges and ranges[-1][1] == start:
+            ranges[-1][1] = end
+        else:
+            ranges.append([start, end])
+    return ranges
+
+
+def missing_chunks(
+    received_chunks: List[int], total_bytes: int, chunk_size: int
+) -> List[int]:
+    """
+    Summary: Indexes of the chunks of a session not received yet.
+    """
+    received = set(received_chunks)
+    return [
+        index
+        for index in range(chunk_count(total_bytes, chunk_size))
+        if index not in received
+    ]
+
+
+def remove_expired_session_files(ttl: int = UPLOAD_SESSION_TTL):
+    """
+    Summary: Delete spool files of sessions idle for longer than the session TTL.
+
+    The TTL index only removes session documents, this removes their files.
+
+    Args:
+        ttl (int, optional): seconds since the last chunk.
+    """
+    if not os.path.isdir(UPLOAD_SPOOL_DIR):
+        return
+    cutoff = time.time() - ttl
+    for entry in os.scandir(UPLOAD_SPOOL_DIR):
+        if not entry.name.endswith(".session"):
+            continue
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError as e:
+            logging.warning(
+                f"Could not remove expired upload session {entry.path}: {e}"
+            )
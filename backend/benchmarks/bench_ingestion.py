@@ -0,0 +1,261 @@
+"""
+Summary: Benchmark CSV ingestion and dashboard reads on seeded synthetic catalogs.
+
+For each catalog size, a catalog is generated with benchmarks.catalog and
+uploaded through /upload/upload_csv. The run reports rows per second and
+the peak RSS of the process. Then /movies/movie_dashboard is read at
+several pages and with a cursor walk, for every sort key and order, and
+the p50/p99 latency is reported. Everything goes through the Flask test
+client, so routing, auth and serialization are included. Results are
+printed as JSON.
+
+Run from the backend folder against a local mongod:
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.bench_ingestion \
+        --rows 10000 --rows 100000 --rows 1000000 --output results.json
+
+Or against an in-memory stand-in, for small sizes only (needs mongomock):
+    python -m benchmarks.bench_ingestion --in-memory --rows 10000
+
+The collections of --database (movie_benchmark) are dropped before each size.
+"""
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List
+
+from benchmarks.catalog import write_catalog_file
+
+BENCHMARK_COLLECTIONS = ("movies", "movie_facets", "upload_status")
+
+
+class PeakRSS:
+    """
+    Summary: Sample the resident set size of the process on a background thread.
+    """
+
+    def __init__(self, interval: float = 0.05):
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self.peak = 0
+
+    @staticmethod
+    def current() -> int:
+        """
+        Summary: Current RSS in bytes, or the lifetime peak where /proc is missing.
+        """
+        try:
+            with open("/proc/self/statm") as statm:
+                return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except OSError:
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.current())
+            self._stop.wait(self._interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current())
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, Any]:
+    """
+    Summary: p50, p99 and mean of latencies in milliseconds.
+    """
+    latencies = sorted(latencies)
+    if not latencies:
+        return {"requests": 0}
+    return {
+        "requests": len(latencies),
+        "p50_ms": round(latencies[len(latencies) // 2], 3),
+        "p99_ms": round(
+            latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 3
+        ),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+    }
+
+
+def reset_database(mongo_module, caches):
+    """
+    Summary: Drop the benchmark collections and in-process caches, then create the indexes.
+    """
+    mongo = mongo_module.MongoConnect()
+    for collection_name in BENCHMARK_COLLECTIONS:
+        mongo.get_collection(collection_name).drop()
+    for cache in caches:
+        cache()
+    mongo_module.reconcile_indexes(mongo)
+
+
+def bench_upload(client, headers, path: str, rows: int, args) -> Dict[str, Any]:
+    """
+    Summary: Upload a catalog file as a raw request body and wait for its ingestion.
+    """
+    size = os.path.getsize(path)
+    query = (
+        f"file_name={os.path.basename(path)}&mode={args.mode}"
+        f"&write_mode={args.write_mode}"
+    )
+    with PeakRSS() as rss, open(path, "rb") as body:
+        started = time.perf_counter()
+        response = client.post(
+            f"/upload/upload_csv?{query}",
+            input_stream=body,
+            content_type="text/csv",
+            content_length=size,
+            headers=headers,
+        )
+        if response.status_code != 202:
+            raise RuntimeError(f"Upload rejected: {response.get_json()}")
+        task_id = response.get_json()["task_id"]
+        while True:
+            progress = client.get(
+                f"/upload/upload_progress/{task_id}", headers=headers
+            ).get_json()
+            if progress["status"] in ("completed", "failed"):
+                break
+            time.sleep(args.poll_interval)
+        elapsed = time.perf_counter() - started
+
+    if progress["status"] != "completed":
+        raise RuntimeError(f"Ingestion failed: {progress}")
+    return {
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(rows / elapsed, 1),
+        "file_bytes": size,
+        "inserted_rows": progress["inserted_rows"],
+        "peak_rss_bytes": rss.peak,
+    }
+
+
+def bench_dashboard(client, headers, rows: int, args) -> Dict[str, Any]:
+    """
+    Summary: Read dashboard pages for every sort key and order and report latencies.
+    """
+    from app.movies.filters import SORT_FIELDS
+
+    last_page = max(1, -(-rows // args.per_page))
+    pages = sorted({1, 2, max(1, last_page // 2), last_page})
+    results: Dict[str, Any] = {"pages": pages, "sort": {}}
+    every: List[float] = []
+
+    def timed_get(url: str) -> dict:
+        started = time.perf_counter()
+        response = client.get(url, headers=headers)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f"{url} answered {response.status_code}")
+        return response.get_json()
+
+    for sort_by in SORT_FIELDS:
+        for sort_order in ("asc", "desc"):
+            latencies: List[float] = []
+            base = (
+                f"/movies/movie_dashboard?per_page={args.per_page}"
+                f"&sort_by={sort_by}&sort_order={sort_order}&view={args.view}"
+            )
+            for _ in range(args.repeat):
+                for page in pages:
+                    timed_get(f"{base}&page={page}")
+                # Walk forward with continuation tokens from the first page
+                body = timed_get(base)
+                for _ in range(args.cursor_pages):
+                    cursor = body["pagination"]["next"]
+                    if not cursor:
+                        break
+                    body = timed_get(f"{base}&cursor={cursor}")
+            results["sort"][f"{sort_by} {sort_order}"] = latency_summary(latencies)
+            every.extend(latencies)
+
+    results["overall"] = latency_summary(every)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, action="append", dest="sizes")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database", default="movie_benchmark")
+    parser.add_argument("--in-memory", action="store_true")
+    parser.add_argument("--mode", default="auto")
+    parser.add_argument("--write-mode", default="insert")
+    parser.add_argument("--per-page", type=int, default=20)
+    parser.add_argument("--view", default="summary")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--cursor-pages", type=int, default=10)
+    parser.add_argument("--poll-interval", type=float, default=0.2)
+    parser.add_argument("--page-cache", action="store_true")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    sizes = args.sizes or [10000]
+
+    # Measure the database, not the page cache, and build indexes synchronously
+    if not args.page_cache:
+        os.environ["PAGE_CACHE_BACKEND"] = "none"
+    os.environ["MONGO_SYNC_INDEXES"] = "false"
+
+    import app.mongo as mongo_module
+
+    mongo_module.DATABASE = args.database
+    if args.in_memory:
+        try:
+            import mongomock
+        except ImportError:
+            raise SystemExit("--in-memory needs mongomock: pip install mongomock")
+        mongo_module._client = mongomock.MongoClient()
+        mongo_module._client_pid = os.getpid()
+    elif not mongo_module.MONGO_URI:
+        raise SystemExit("Set MONGO_URI, or pass --in-memory")
+
+    from app import create_app
+    from app.auth.utils import create_jwt_token
+    from app.movies.cache import page_cache
+    from app.movies.counts import movie_counts
+
+    app = create_app()
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {create_jwt_token('bench@example.com')}"}
+
+    results: Dict[str, Any] = {
+        "backend": "mongomock" if args.in_memory else "mongod",
+        "seed": args.seed,
+        "per_page": args.per_page,
+        "write_mode": args.write_mode,
+        "runs": [],
+    }
+    with tempfile.TemporaryDirectory() as folder:
+        for rows in sizes:
+            reset_database(mongo_module, (page_cache.invalidate, movie_counts.clear))
+            path = os.path.join(folder, f"catalog-{rows}.csv")
+            started = time.perf_counter()
+            write_catalog_file(path, rows, args.seed)
+            generated = time.perf_counter() - started
+
+            run = {"rows": rows, "generate_seconds": round(generated, 3)}
+            run["upload"] = bench_upload(client, headers, path, rows, args)
+            run["dashboard"] = bench_dashboard(client, headers, rows, args)
+            results["runs"].append(run)
+            os.remove(path)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as out:
+            out.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Summary: Measure login throughput of the password hasher at different hash costs.
+
+Each login is one password check on the hasher's thread pool, driven by
+more request threads than hashing workers, as under a burst of logins.
+
+Run from the backend folder:
+    python -m benchmarks.bench_password_hashing --workers 4 --duration 5 \
+        --method scrypt:16384:8:1 --method scrypt --method pbkdf2:sha256:600000
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.auth.hashing import HashingBusy, PasswordHasher
+
+DEFAULT_METHODS = [
+    "scrypt:16384:8:1",
+    "scrypt:32768:8:1",
+    "pbkdf2:sha256:600000",
+    "pbkdf2:sha256:1000000",
+]
+
+
+def bench_method(method: str, workers: int, clients: int, duration: float) -> dict:
+    """
+    Summary: Run logins against one hash method for duration seconds.
+
+    Args:
+        method (str): werkzeug hash method and cost.
+        workers (int): hashing threads.
+        clients (int): request threads logging in at once.
+        duration (float): seconds to run.
+    Return:
+        dict: logins per second, latency percentiles and rejected logins.
+    """
+    hasher = PasswordHasher(
+        method=method, workers=workers, max_pending=clients, timeout=60
+    )
+    password_hash = hasher.hash("correct horse battery staple")
+    latencies, rejected = [], 0
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client():
+        nonlocal rejected
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                matches, _ = hasher.verify(
+                    password_hash, "correct horse battery staple"
+                )
+            except HashingBusy:
+                with lock:
+                    rejected += 1
+                continue
+            assert matches
+            with lock:
+                latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        for _ in range(clients):
+            pool.submit(client)
+    elapsed = time.monotonic() - started
+    hasher.shutdown()
+
+    latencies.sort()
+    return {
+        "logins_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2], 2) if latencies else None,
+        "p99_ms": (
+            round(latencies[int(len(latencies) * 0.99)], 2) if latencies else None
+        ),
+        "rejected": rejected,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--method", dest="methods", action="append")
+    args = parser.parse_args()
+
+    results = {
+        "workers": args.workers,
+        "clients": args.clients,
+        "cpu_count": os.cpu_count(),
+        "methods": {},
+    }
+    for method in args.methods or DEFAULT_METHODS:
+        results["methods"][method] = bench_method(
+            method, args.workers, args.clients, args.duration
+        )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
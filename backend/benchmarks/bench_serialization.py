@@ -0,0 +1,93 @@
+"""
+Summary: Compare the dashboard serialization paths on a synthetic page of movies.
+
+Run from the backend folder:
+    python -m benchmarks.bench_serialization --per-page 100 --repeat 200
+"""
+
+import argparse
+import json
+import random
+import timeit
+from datetime import datetime
+
+from app.movies.serializers import dumps
+from bson import ObjectId
+from flask import Flask, jsonify
+
+
+def convert_objectid(obj):
+    """Recursively converts ObjectId to string, as list_movies used to."""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    elif isinstance(obj, dict):
+        return {key: convert_objectid(value) for key, value in obj.items()}
+    elif isinstance(obj, list):
+        return [convert_objectid(item) for item in obj]
+    return obj
+
+
+def make_movies(count: int, seed: int = 42) -> list:
+    """
+    Summary: Build movie documents shaped like the movies collection.
+    """
+    rng = random.Random(seed)
+    movies = []
+    for index in range(count):
+        release_year = rng.randint(1950, 2021)
+        movies.append(
+            {
+                "_id": ObjectId(),
+                "show_id": f"s{index}",
+                "movie_type": rng.choice(["Movie", "TV Show"]),
+                "title": f"Title {index}",
+                "director": "Director Name",
+                "cast": [f"Actor {rng.randint(1, 5000)}" for _ in range(8)],
+                "country": "India",
+                "date_added": datetime(2021, rng.randint(1, 12), rng.randint(1, 28)),
+                "release_year": release_year,
+                "rating": "TV-14",
+                "duration": "106 min",
+                "listed_in": ["Dramas", "International Movies"],
+                "description": "When the daughter of a wealthy family returns "
+                "from college, she gets a frosty welcome from her brother.",
+                "duration_minutes": 106,
+                "season_count": None,
+                "release_date": datetime(release_year, 1, 1),
+            }
+        )
+    return movies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--per-page", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    movies = make_movies(args.per_page)
+    pagination = {"current_page": 1, "total_pages": 10, "total_movies": 1000}
+    app = Flask(__name__)
+
+    def legacy():
+        with app.app_context():
+            serialized = [convert_objectid(movie) for movie in movies]
+            jsonify({"movies": serialized, "pagination": pagination}).get_data()
+
+    def current():
+        dumps({"movies": movies, "pagination": pagination})
+
+    results = {"per_page": args.per_page, "repeat": args.repeat}
+    for name, func in (("convert_objectid+jsonify", legacy), ("orjson", current)):
+        seconds = min(timeit.repeat(func, number=args.repeat, repeat=5))
+        results[name] = {"ms_per_page": round(seconds / args.repeat * 1000, 4)}
+    results["speedup"] = round(
+        results["convert_objectid+jsonify"]["ms_per_page"]
+        / results["orjson"]["ms_per_page"],
+        2,
+    )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
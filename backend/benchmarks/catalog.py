@@ -0,0 +1,189 @@
+"""
+Summary: Seeded generator of Netflix-style catalog CSVs in the upload layout.
+
+The same seed and row count always produce the same file, so benchmark
+runs can be compared. Run from the backend folder:
+    python -m benchmarks.catalog --rows 1000000 --seed 42 --output catalog.csv.gz
+"""
+
+import argparse
+import bz2
+import csv
+import gzip
+import io
+import random
+from datetime import date, timedelta
+from typing import IO, List
+
+from app.movies.export import CSV_COLUMNS
+
+MONTHS = [
+    "January",
+    "February",
+    "March",
+    "April",
+    "May",
+    "June",
+    "July",
+    "August",
+    "September",
+    "October",
+    "November",
+    "December",
+]
+TITLE_WORDS = (
+    "love night city last house dark secret war little girl boy story world "
+    "christmas life man woman king queen dead blood river summer winter lost "
+    "road home family time dream ghost heart fire island moon star wild "
+    "amélie señor café über"
+).split()
+FIRST_NAMES = (
+    "Aarav Maya Ana Kenji Chloé Olu Diego Priya Liam Sofia Hiro Zoe Omar Lena "
+    "Raúl Ines Ravi Emma Yuki Noah Aisha Mateo Elif Jonas Mei Pablo Sara Ivan"
+).split()
+LAST_NAMES = (
+    "Sharma Kim Okafor Tanaka García Müller Rossi Silva Chen Novak Haddad "
+    "Johansson Dubois Kapoor Nguyen Smith Ali Petrov Costa Schmidt Yilmaz Park"
+).split()
+COUNTRIES = [
+    "United States",
+    "India",
+    "United Kingdom",
+    "Japan",
+    "South Korea",
+    "Canada",
+    "Spain",
+    "France",
+    "Mexico",
+    "Egypt",
+    "Nigeria",
+    "Germany",
+    "Brazil",
+    "Turkey",
+    "Australia",
+]
+MOVIE_GENRES = [
+    "Dramas",
+    "Comedies",
+    "International Movies",
+    "Documentaries",
+    "Action & Adventure",
+    "Thrillers",
+    "Romantic Movies",
+    "Horror Movies",
+    "Children & Family Movies",
+    "Stand-Up Comedy",
+]
+SHOW_GENRES = [
+    "International TV Shows",
+    "TV Dramas",
+    "TV Comedies",
+    "Crime TV Shows",
+    "Kids' TV",
+    "Docuseries",
+    "Reality TV",
+    "Anime Series",
+]
+MOVIE_RATINGS = ["G", "PG", "PG-13", "R", "NR", "TV-14", "TV-MA", "TV-PG"]
+SHOW_RATINGS = ["TV-Y", "TV-Y7", "TV-G", "TV-PG", "TV-14", "TV-MA"]
+FIRST_DATE_ADDED = date(2008, 1, 1)
+DATE_ADDED_DAYS = (date(2021, 9, 25) - FIRST_DATE_ADDED).days
+
+
+def _names(rng: random.Random, count: int) -> str:
+    return ", ".join(
+        f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}" for _ in range(count)
+    )
+
+
+def catalog_row(rng: random.Random, index: int) -> List[str]:
+    """
+    Summary: One catalog row, in the order of the upload columns.
+
+    Args:
+        rng (random.Random): seeded generator, advanced by the call.
+        index (int): row number, used for a unique show_id.
+    Return:
+        List[str]: the CSV values.
+    """
+    is_movie = rng.random() < 0.7
+    release_year = rng.randint(1942, 2021)
+    added = FIRST_DATE_ADDED + timedelta(days=rng.randrange(DATE_ADDED_DAYS))
+    date_added = f"{MONTHS[added.month - 1]} {added.day}, {added.year}"
+    if is_movie:
+        duration = f"{rng.randint(3, 312)} min"
+        genres = rng.sample(MOVIE_GENRES, rng.randint(1, 3))
+        rating = rng.choice(MOVIE_RATINGS)
+    else:
+        seasons = rng.randint(1, 17)
+        duration = f"{seasons} Season{'s' if seasons > 1 else ''}"
+        genres = rng.sample(SHOW_GENRES, rng.randint(1, 3))
+        rating = rng.choice(SHOW_RATINGS)
+    title = " ".join(rng.choice(TITLE_WORDS) for _ in range(rng.randint(1, 4)))
+    return [
+        f"s{index + 1}",
+        "Movie" if is_movie else "TV Show",
+        f"{title.title()} {index + 1}",
+        # Like the real catalog, some movies have no director or cast
+        _names(rng, rng.randint(1, 2)) if rng.random() > 0.3 else "",
+        _names(rng, rng.randint(1, 10)) if rng.random() > 0.1 else "",
+        ", ".join(rng.sample(COUNTRIES, rng.randint(1, 3))),
+        date_added,
+        str(release_year),
+        rating,
+        duration,
+        ", ".join(genres),
+        f"When {rng.choice(FIRST_NAMES)} finds a {rng.choice(TITLE_WORDS)}, "
+        f"the {rng.choice(TITLE_WORDS)} of a whole {rng.choice(TITLE_WORDS)} "
+        "is at stake.",
+    ]
+
+
+def write_catalog(stream: IO[bytes], rows: int, seed: int = 42) -> int:
+    """
+    Summary: Write a catalog CSV with a header and the given number of rows.
+
+    Args:
+        stream (IO[bytes]): binary stream to write to.
+        rows (int): number of movies.
+        seed (int, optional): seed of the generator.
+    Return:
+        int: number of rows written.
+    """
+    rng = random.Random(seed)
+    text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    writer = csv.writer(text)
+    writer.writerow(CSV_COLUMNS)
+    for index in range(rows):
+        writer.writerow(catalog_row(rng, index))
+    text.flush()
+    text.detach()
+    return rows
+
+
+def write_catalog_file(path: str, rows: int, seed: int = 42) -> int:
+    """
+    Summary: Write a catalog to a file, compressed when the name ends in .gz or .bz2.
+    """
+    if path.endswith(".gz"):
+        opener = gzip.open
+    elif path.endswith(".bz2"):
+        opener = bz2.open
+    else:
+        opener = open
+    with opener(path, "wb") as stream:
+        return write_catalog(stream, rows, seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="catalog.csv")
+    args = parser.parse_args()
+    write_catalog_file(args.output, args.rows, args.seed)
+    print(f"Wrote {args.rows} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
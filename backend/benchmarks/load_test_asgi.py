@@ -0,0 +1,162 @@
+"""
+Summary: Compare request throughput of the Flask and ASGI serving modes under concurrency.
+
+Start both servers against the same database, the Flask app behind a WSGI
+server on port 5000 and the ASGI app with:
+    uvicorn asgi:app --workers 4 --port 8000
+
+then run from the backend folder:
+    python -m benchmarks.load_test_asgi --sync-url http://localhost:5000 \
+        --async-url http://localhost:8000 --email user@example.com --password secret
+
+Each mode logs in separately, unless both share JWT_SECRET_KEYS and --token is given.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+DEFAULT_PATHS = [
+    "/movies/movie_dashboard?page=1&per_page=20&view=summary",
+    "/movies/movie_dashboard?per_page=20&sort_by=duration&sort_order=desc",
+    "/movies/facets",
+    "/movies/suggest?q=the",
+]
+
+
+async def login(client: httpx.AsyncClient, email: str, password: str) -> str:
+    """
+    Summary: Get a JWT token from /auth/login.
+    """
+    response = await client.post(
+        "/auth/login", json={"email": email, "password": password}
+    )
+    response.raise_for_status()
+    return response.json()["token"]
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    Summary: Value below which the given fraction of the sorted values falls.
+    """
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+async def run_load(
+    base_url: str,
+    token: Optional[str],
+    paths: List[str],
+    concurrency: int,
+    duration: float,
+    credentials: Optional[tuple] = None,
+) -> Dict[str, Any]:
+    """
+    Summary: Send requests from concurrency workers for duration seconds.
+
+    Args:
+        base_url (str): server to load.
+        token (str, optional): JWT token, fetched with credentials if not given.
+        paths (List[str]): request paths, taken in turn by each worker.
+        concurrency (int): requests in flight at once.
+        duration (float): seconds to run.
+        credentials (tuple, optional): (email, password) used to log in.
+    Return:
+        Dict[str, Any]: throughput, latency percentiles and error count.
+    """
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=60
+    ) as client:
+        if token is None:
+            token = await login(client, *credentials)
+        headers = {"Authorization": f"Bearer {token}"}
+        latencies: List[float] = []
+        errors = 0
+        deadline = time.monotonic() + duration
+
+        async def worker(offset: int):
+            nonlocal errors
+            index = offset
+            while time.monotonic() < deadline:
+                path = paths[index % len(paths)]
+                index += 1
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path, headers=headers)
+                    if response.status_code != 200:
+                        errors += 1
+                        continue
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.monotonic()
+        await asyncio.gather(*(worker(offset) for offset in range(concurrency)))
+        elapsed = time.monotonic() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.5), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "mean_ms": round(statistics.fmean(latencies), 2) if latencies else 0.0,
+    }
+
+
+async def main_async(args) -> Dict[str, Any]:
+    credentials = (args.email, args.password) if args.email else None
+    if args.token is None and credentials is None:
+        raise SystemExit("Pass --token or --email and --password")
+
+    results: Dict[str, Any] = {
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "paths": args.paths,
+    }
+    for mode, url in (("sync", args.sync_url), ("async", args.async_url)):
+        if url:
+            results[mode] = await run_load(
+                url,
+                args.token,
+                args.paths,
+                args.concurrency,
+                args.duration,
+                credentials,
+            )
+    if "sync" in results and "async" in results and results["sync"]["requests"]:
+        results["throughput_ratio"] = round(
+            results["async"]["requests_per_second"]
+            / results["sync"]["requests_per_second"],
+            2,
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sync-url", help="Base URL of the Flask server")
+    parser.add_argument("--async-url", help="Base URL of the ASGI server")
+    parser.add_argument("--token", help="JWT token accepted by both servers")
+    parser.add_argument("--email")
+    parser.add_argument("--password")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--path", dest="paths", action="append")
+    args = parser.parse_args()
+    args.paths = args.paths or DEFAULT_PATHS
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
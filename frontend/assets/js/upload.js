@@ -35,8 +35,8 @@ uploadForm.addEventListener("submit", (event) => {
     })
     .then((data) => {
       if (data.task_id) {
-        // If task ID is received, start polling for progress
-        checkUploadProgress(data.task_id);
+        // If task ID is received, follow the progress stream
+        watchUploadProgress(data.task_id);
       } else {
         alert("Error uploading CSV file.");
         resetUploadForm();
@@ -49,6 +49,92 @@ uploadForm.addEventListener("submit", (event) => {
     });
 });
 
+// Follow upload progress pushed by the server as Server-Sent Events.
+// fetch is used instead of EventSource so the token can be sent in a header.
+function watchUploadProgress(taskId) {
+  const token = localStorage.getItem("token");
+
+  fetch(`http://127.0.0.1:5000/upload/progress_stream/${taskId}`, {
+    method: "GET",
+    headers: {
+      Authorization: `Bearer ${token}`,
+    },
+  })
+    .then(async (response) => {
+      if (!response.ok || !response.body) {
+        throw new Error("Failed to open the progress stream.");
+      }
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let finished = false;
+
+      while (!finished) {
+        const { done, value } = await reader.read();
+        if (done) {
+          break;
+        }
+        buffer += decoder.decode(value, { stream: true });
+
+        // Events are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+          const event = parseServerSentEvent(buffer.slice(0, boundary));
+          buffer = buffer.slice(boundary + 2);
+          if (event && event.event === "progress") {
+            finished = showUploadProgress(JSON.parse(event.data));
+          } else if (event && event.event === "error") {
+            throw new Error(JSON.parse(event.data).error);
+          }
+        }
+      }
+      if (!finished) {
+        // The stream was cut before the upload finished, fall back to polling
+        checkUploadProgress(taskId);
+      }
+    })
+    .catch((error) => {
+      console.error("Progress stream error:", error);
+      checkUploadProgress(taskId);
+    });
+}
+
+// Parse one Server-Sent Event block into its event name and data
+function parseServerSentEvent(block) {
+  let event = "message";
+  const data = [];
+  for (const line of block.split("\n")) {
+    if (line.startsWith("event:")) {
+      event = line.slice(6).trim();
+    } else if (line.startsWith("data:")) {
+      data.push(line.slice(5).trim());
+    }
+  }
+  return data.length ? { event, data: data.join("\n") } : null;
+}
+
+// Show an upload's progress, returns true once the upload has finished
+function showUploadProgress(data) {
+  if (data.status === "completed") {
+    uploadStatus.textContent = "Upload completed!";
+    setTimeout(() => {
+      resetUploadForm();
+    }, 2000); // Reset the form after a short delay
+    return true;
+  }
+  if (data.status === "queued" || data.status === "in_progress") {
+    uploadStatus.textContent = `Uploading: ${data.progress}% (${data.uploaded_rows} rows uploaded)`;
+    return false;
+  }
+  if (data.status === "failed") {
+    alert("Upload failed. Please check the CSV and try again.");
+  } else {
+    alert("Unknown upload status.");
+  }
+  resetUploadForm();
+  return true;
+}
+
 // Poll the server for upload progress
 function checkUploadProgress(taskId) {
   const token = localStorage.getItem("token");
@@ -66,20 +152,10 @@ function checkUploadProgress(taskId) {
       return response.json();
     })
     .then((data) => {
-      if (data.status === "completed") {
-        uploadStatus.textContent = "Upload completed!";
-        setTimeout(() => {
-          resetUploadForm();
-        }, 2000); // Reset the form after a short delay
-      } else if (data.status === "in_progress") {
-        // Update progress status
-        uploadStatus.textContent = `Uploading: ${data.progress}% (${data.uploaded_rows} rows uploaded)`;
+      if (!showUploadProgress(data)) {
         setTimeout(() => {
           checkUploadProgress(taskId); // Continue polling
         }, 1000); // Poll every second
-      } else {
-        alert("Unknown upload status.");
-        resetUploadForm();
       }
     })
     .catch((error) => {